@@ -5,13 +5,20 @@ def get_indicator_data(candles):
     import pandas as pd
     import pandas_ta as ta
     import numpy as np
+    from candle_buffer import has_column, get_column
     
     # Extract the latest candle data
     if not candles or len(candles) == 0:
         return {"signal": "NEUTRAL", "rsi": None, "price": None, "ema_signal": None}
     
-    # Convert candles to DataFrame for EMA calculation
-    df = pd.DataFrame(candles)
+    # Build a DataFrame from only the columns needed for the EMA calculation
+    df = pd.DataFrame({
+        'close': get_column(candles, 'close'),
+        'rsi': get_column(candles, 'rsi')
+    })
+    for ema_column in ('ema9', 'ema20', 'ema50'):
+        if has_column(candles, ema_column):
+            df[ema_column] = get_column(candles, ema_column)
     
     # Calculate EMAs if not already present
     if 'ema9' not in df.columns:
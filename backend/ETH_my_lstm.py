@@ -1,8 +1,7 @@
 import os
 import numpy as np
-import tensorflow as tf
-import joblib
-import pandas as pd
+from candle_buffer import has_column, get_column, get_columns
+from model_registry import model_registry
 
 def get_lstm_output(candles):
     print("LSTM Model Analysis For ETH")
@@ -46,31 +45,27 @@ def get_lstm_output(candles):
         return None
     
     try:
-        # Load the model and scalers
-        model_dir = os.path.join("models", "ETH1min_I60_O10")
-        model_path = os.path.join(model_dir, "ETH_lstm_model_multi_step.h5")
-        feature_scaler_path = os.path.join(model_dir, "ETH_feature_scaler_multi_step.save")
-        close_scaler_path = os.path.join(model_dir, "ETH_close_scaler_multi_step.save")
-        
-        model = tf.keras.models.load_model(model_path)
-        feature_scaler = joblib.load(feature_scaler_path)
-        close_scaler = joblib.load(close_scaler_path)
-        
-        print("\nLSTM Multi-Step Model Loaded Successfully")
+        # Get the cached model and scalers (loaded once, reloaded when the files change)
+        bundle = model_registry.get(os.path.join("models", "ETH1min_I60_O10"),
+                                    "ETH_lstm_model_multi_step.h5",
+                                    "ETH_feature_scaler_multi_step.save",
+                                    "ETH_close_scaler_multi_step.save")
+        model = bundle.model
+        feature_scaler = bundle.feature_scaler
+        close_scaler = bundle.close_scaler
         
         # Extract features needed for prediction (same as used during training)
-        df = pd.DataFrame(candles)
         feature_columns = ['close', 'volume', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume',
                            'rsi', 'macd', 'macd_signal', 'upper_band', 'lower_band']
         
         # Make sure all required columns are available
         for col in feature_columns:
-            if col not in df.columns:
+            if not has_column(candles, col):
                 print(f"Warning: Missing required column '{col}' for prediction")
                 return None
         
         # Get last 60 candles for prediction
-        last_sequence = df[feature_columns].tail(60).values
+        last_sequence = get_columns(candles, feature_columns)[-60:]
         
         # Scale the features
         last_sequence_scaled = feature_scaler.transform(last_sequence)
@@ -122,12 +117,12 @@ def get_lstm_output(candles):
             except Exception as reshape_error:
                 print(f"Error reshaping prediction: {reshape_error}")
                 # As a last resort, just return nominal values
-                last_known_price = df['close'].iloc[-1]
+                last_known_price = get_column(candles, 'close')[-1]
                 predicted_prices.fill(last_known_price)
                 print(f"Fallback to last known price: {last_known_price}")
         
         # Get the last known price for comparison
-        last_known_price = df['close'].iloc[-1]
+        last_known_price = get_column(candles, 'close')[-1]
         
         # Calculate immediate price change (first candle)
         immediate_change = predicted_prices[0] - last_known_price
@@ -1,5 +1,7 @@
 import numpy as np
 import pandas as pd
+from candle_buffer import get_column
+from monte_carlo_kernel import simulate_paths, summarize_paths
 import matplotlib.pyplot as plt
 from scipy.stats import norm
 import time
@@ -17,8 +19,7 @@ def get_monte_carlo_data(candles):
         return None
     
     # Extract close prices and convert to numpy array
-    df = pd.DataFrame(candles)
-    close_prices = np.array(df['close'])
+    close_prices = get_column(candles, 'close')
     
     # Calculate daily returns (percentage change)
     returns = np.diff(close_prices) / close_prices[:-1]
@@ -37,71 +38,27 @@ def get_monte_carlo_data(candles):
     num_simulations = 1000
     forecast_horizon = 10  # Match LSTM's 10-candle forecast
     
-    # Initialize simulation array
-    simulation_results = np.zeros((num_simulations, forecast_horizon))
-    
-    # Run Monte Carlo simulations
+    # Run Monte Carlo simulations (all paths in one vectorized draw)
     print(f"Running {num_simulations} simulations for {forecast_horizon} periods...")
     start_time = time.time()
     
-    for sim in range(num_simulations):
-        # Start with the last known price
-        price = last_price
-        
-        # Store the price path for this simulation
-        prices = np.zeros(forecast_horizon)
-        
-        # Simulate price path
-        for t in range(forecast_horizon):
-            # Generate random return using historical mean and std
-            random_return = np.random.normal(mean_return, std_return)
-            
-            # Update price based on the generated return
-            price = price * (1 + random_return)
-            
-            # Store the simulated price
-            prices[t] = price
-        
-        # Store this simulation path
-        simulation_results[sim] = prices
+    simulation_results = simulate_paths(last_price, mean_return, std_return, num_simulations, forecast_horizon)
     
     end_time = time.time()
     print(f"Simulation completed in {end_time - start_time:.2f} seconds")
     
-    # Calculate statistics from the simulations
-    
-    # Mean path (average of all simulations at each time step)
-    mean_path = np.mean(simulation_results, axis=0)
-    
-    # Confidence intervals (5th and 95th percentiles for 90% CI)
-    lower_bound = np.percentile(simulation_results, 5, axis=0)
-    upper_bound = np.percentile(simulation_results, 95, axis=0)
-    
-    # Calculate median path
-    median_path = np.median(simulation_results, axis=0)
-    
-    # Calculate probabilities
-    final_prices = simulation_results[:, -1]  # All final prices
-    
-    # Probability of price increase
-    prob_increase = np.mean(final_prices > last_price)
-    
-    # Calculate expected price movement
-    expected_price = np.mean(final_prices)
-    expected_change = expected_price - last_price
-    expected_change_pct = (expected_change / last_price) * 100
-    
-    # Generate trading signal based on probabilities
-    if prob_increase > 0.7:
-        signal = "STRONG_BUY"
-    elif prob_increase > 0.6:
-        signal = "BUY"
-    elif prob_increase < 0.3:
-        signal = "STRONG_SELL"
-    elif prob_increase < 0.4:
-        signal = "SELL"
-    else:
-        signal = "NEUTRAL"
+    # Calculate statistics from the simulations (90% CI = 5th and 95th percentiles)
+    stats = summarize_paths(simulation_results, last_price, 90)
+    
+    mean_path = stats["mean_path"]
+    lower_bound = stats["lower_bound"]
+    upper_bound = stats["upper_bound"]
+    median_path = stats["median_path"]
+    prob_increase = stats["prob_increase"]
+    expected_price = stats["expected_price"]
+    expected_change = stats["expected_change"]
+    expected_change_pct = stats["expected_change_pct"]
+    signal = stats["signal"]
     
     # Print results
     print("\nMonte Carlo Simulation Results:")
@@ -2,51 +2,22 @@ import websocket
 import json
 import requests
 import time
-import numpy as np
-import pandas as pd
-import pandas_ta as ta
-from collections import deque
 from ETH_my_lstm import get_lstm_output
 from ETH_my_indicator import get_indicator_data
 from ETH_my_monte_carlo import get_monte_carlo_data
 from ETH_my_order_manager import generate_order
+from incremental_indicators import IncrementalIndicators
+from candle_buffer import CandleRingBuffer
 
 # Global variables to store data:
-# candles - recent 60 candles for display and LSTM
 # historical_data - longer history for accurate indicator calculations
-candles = deque(maxlen=60)
-historical_data = []  # Stores a longer history for calculating indicators
+# candles - view over the recent 60 candles for display and LSTM
+historical_data = CandleRingBuffer(1000)  # Keeps the last 1000 candles for calculations
+candles = historical_data.window(60)
 
-def calculate_indicators(candle_data):
-    """
-    Calculate technical indicators for the candle data using pandas_ta
-    Returns the original data with added indicator columns
-    """
-    # Convert to pandas DataFrame for easier calculations
-    df = pd.DataFrame(candle_data)
-    
-    # Ensure we have a clean DataFrame
-    if len(df) == 0:
-        return []
-    
-    # Calculate RSI (14 periods)
-    df['rsi'] = ta.rsi(df['close'], length=14)
-    
-    # Calculate MACD (12, 26, 9)
-    macd = ta.macd(df['close'], fast=12, slow=26, signal=9)
-    df['macd'] = macd['MACD_12_26_9']
-    df['macd_signal'] = macd['MACDs_12_26_9']
-    
-    # Calculate Bollinger Bands (20 periods, 2 std)
-    bbands = ta.bbands(df['close'], length=20, std=2)
-    df['upper_band'] = bbands['BBU_20_2.0']
-    df['lower_band'] = bbands['BBL_20_2.0']
-    
-    # Convert NaN to None for JSON serialization
-    df = df.replace({np.nan: None})
-    
-    # Convert back to dictionary format
-    return df.to_dict('records')
+# Running RSI(14), MACD(12, 26, 9) and Bollinger Bands(20, 2) state, updated once per closed candle
+indicator_engine = IncrementalIndicators(rsi_period=14, macd_fast=12, macd_slow=26, macd_signal=9,
+                                         bb_period=20, bb_std=2)
 
 def get_historical_candles(symbol, interval, limit=500):
     """
@@ -93,17 +64,14 @@ def on_message(ws, message):
             'taker_buy_quote_asset_volume': float(kline.get('Q'))
         }
         
-        # Add new candle to historical data and limit size to prevent memory issues
-        historical_data.append(current_candle)
-        if len(historical_data) > 1000:  # Keep last 1000 candles for calculations
-            historical_data = historical_data[-1000:]
+        # Fold the new candle into the running indicator state
+        current_candle = indicator_engine.update(current_candle)
         
-        # Calculate indicators on all historical data
-        candles_with_indicators = calculate_indicators(historical_data)
+        # Add new candle to the fixed-size history buffer
+        historical_data.append(current_candle)
         
-        # Update the deque with only the last 60 candles with indicators
-        candles.clear()
-        candles.extend(candles_with_indicators[-60:])
+        # Refresh the view over the last 60 candles with indicators
+        candles = historical_data.window(60)
         
         # Call LSTM function with updated candles
         lstm_response = get_lstm_output(candles)
@@ -135,14 +103,15 @@ def main():
     interval = "1m"
     
     # Get historical candles
-    historical_data = get_historical_candles(symbol, interval)
-    print(f"Fetched {len(historical_data)} historical ETH/USDT candles")
+    warmup_candles = get_historical_candles(symbol, interval)
+    print(f"Fetched {len(warmup_candles)} historical ETH/USDT candles")
     
-    # Calculate indicators using all historical data
-    candles_with_indicators = calculate_indicators(historical_data)
+    # Seed the indicator state from the historical data
+    historical_data.clear()
+    historical_data.extend(indicator_engine.seed(warmup_candles))
     
-    # Initialize the deque with only the last 60 candles that have indicators
-    candles = deque(candles_with_indicators[-60:], maxlen=60)
+    # Initialize the view with only the last 60 candles that have indicators
+    candles = historical_data.window(60)
     print(f"Initialized display with {len(candles)} recent ETH/USDT candles with indicators")
     
     # WebSocket URL for ETH/USDT
@@ -0,0 +1,237 @@
+"""
+In-memory account ledger fed by the user data stream.
+
+Every order used to start with a signed /v3/account request just to read the
+free USDT balance, and the dashboard's /api/balance fetched the whole account
+on each refresh. The ledger takes one account snapshot at startup and then
+applies the balances pushed in outboundAccountPosition events, so a funds
+check is a dictionary read.
+
+Between submitting an order and the account update that reflects it, the
+funds it uses are held as a reservation keyed by order id. The order's
+executionReport marks the reservation as settling, and the next
+outboundAccountPosition (which already contains the order) releases it. A
+periodic REST reconcile replaces the balances with a fresh snapshot and
+reports any drift. It also runs as soon as the user stream (re)connects,
+because events sent before that are lost.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class AccountLedger:
+    """Free and locked balance per asset, kept current from account stream events"""
+    def __init__(self, fetch_account, reconcile_seconds=300, drift_tolerance=1e-8):
+        """
+        Parameters:
+        fetch_account: Callable returning the /v3/account response (snapshot and reconcile)
+        reconcile_seconds: Interval between REST reconciles
+        drift_tolerance: Balance difference reported as drift on reconcile
+        """
+        self.fetch_account = fetch_account
+        self.reconcile_seconds = reconcile_seconds
+        self.drift_tolerance = drift_tolerance
+        self.balances = {}  # asset -> {'free': float, 'locked': float}
+        self.reservations = {}  # order_id -> [asset, amount, settling, reserved_at]
+        self.reserved = {}  # asset -> total reserved amount
+        self.seen_orders = OrderedDict()  # order ids whose executionReport has arrived
+        self.update_time = 0  # Exchange time (ms) of the newest balance state applied
+        self.lock = threading.Lock()
+        self.user_stream = None
+        self.synced_reconnects = 0
+        self.stream_synced = False  # A reconcile has run since the stream last (re)connected
+        self.last_reconcile = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.start_lock = threading.Lock()
+        self.events = 0
+        self.reconciles = 0
+        self.drift_corrections = 0
+
+    def attach(self, user_stream):
+        """Apply account events from a UserDataStream"""
+        self.user_stream = user_stream
+        self.synced_reconnects = user_stream.reconnects
+        user_stream.on('outboundAccountPosition', self.on_account_position)
+        user_stream.on('executionReport', self.on_execution_report)
+
+    def load_snapshot(self, account_info, requested_at=None):
+        """
+        Replace all balances with a /v3/account response; returns the assets that drifted.
+        
+        requested_at is the monotonic time the snapshot was requested: reservations made
+        before it are already part of the snapshot even if their events were missed.
+        """
+        balances = {}
+        for balance in account_info.get('balances', []):
+            balances[balance['asset']] = {'free': float(balance['free']), 'locked': float(balance['locked'])}
+        update_time = account_info.get('updateTime', 0) or 0
+
+        with self.lock:
+            # An event newer than the snapshot has already been applied; keep it
+            if update_time and update_time < self.update_time:
+                return None
+            drifted = [asset for asset in set(balances) | set(self.balances)
+                       if self._differs(self.balances.get(asset), balances.get(asset))]
+            self.balances = balances
+            self.update_time = max(self.update_time, update_time)
+            # The snapshot contains every order placed before it
+            for order_id in [order_id for order_id, reservation in self.reservations.items()
+                             if reservation[2] or (requested_at is not None and reservation[3] < requested_at)]:
+                self._release(order_id)
+            return drifted
+
+    def _differs(self, local, remote):
+        local = local or {'free': 0.0, 'locked': 0.0}
+        remote = remote or {'free': 0.0, 'locked': 0.0}
+        return (abs(local['free'] - remote['free']) > self.drift_tolerance or
+                abs(local['locked'] - remote['locked']) > self.drift_tolerance)
+
+    def snapshot(self):
+        """Fetch the account over REST and replace the balances"""
+        requested_at = time.monotonic()
+        account_info = self.fetch_account()
+        if 'balances' not in account_info:
+            raise ValueError(f"Unexpected account response: {account_info}")
+        return self.load_snapshot(account_info, requested_at)
+
+    def reconcile(self):
+        """Re-read the account over REST and correct any drift from the event-fed balances"""
+        stream = self.user_stream
+        reconnects = stream.reconnects if stream else 0
+        try:
+            drifted = self.snapshot()
+        except Exception as e:
+            print(f"Account reconcile failed, keeping the local ledger: {e}")
+            return False
+
+        self.last_reconcile = time.monotonic()
+        self.reconciles += 1
+        if stream and stream.connected:
+            self.synced_reconnects = reconnects
+            self.stream_synced = True
+        if drifted:
+            self.drift_corrections += 1
+            print(f"Account reconcile corrected drift in {', '.join(sorted(drifted))}")
+        return True
+
+    def on_account_position(self, event):
+        """outboundAccountPosition: absolute balances of the assets that changed"""
+        update_time = event.get('u', 0) or 0
+        with self.lock:
+            self.events += 1
+            if update_time and update_time < self.update_time:
+                return
+            for balance in event.get('B', []):
+                self.balances[balance['a']] = {'free': float(balance['f']), 'locked': float(balance['l'])}
+            self.update_time = max(self.update_time, update_time)
+            # Orders reported before this update are now part of the balances
+            for order_id in [order_id for order_id, reservation in self.reservations.items() if reservation[2]]:
+                self._release(order_id)
+
+    def on_execution_report(self, event):
+        """executionReport: the account update for this order follows, so its reservation can settle"""
+        order_id = event.get('i')
+        with self.lock:
+            self.events += 1
+            self.seen_orders[order_id] = True
+            while len(self.seen_orders) > 1000:
+                self.seen_orders.popitem(last=False)
+
+            reservation = self.reservations.get(order_id)
+            if reservation is None:
+                return
+            if event.get('X') == 'REJECTED':
+                # A rejected order never touches the balances
+                self._release(order_id)
+            else:
+                reservation[2] = True
+
+    def reserve(self, order_id, asset, amount):
+        """Hold funds for an order the exchange accepted until the balances reflect it"""
+        with self.lock:
+            if order_id in self.seen_orders:
+                # The stream beat the REST response; its account update is already applied or on its way
+                return
+            self.reservations[order_id] = [asset, amount, False, time.monotonic()]
+            self.reserved[asset] = self.reserved.get(asset, 0.0) + amount
+
+    def release(self, order_id):
+        with self.lock:
+            self._release(order_id)
+
+    def _release(self, order_id):
+        reservation = self.reservations.pop(order_id, None)
+        if reservation is not None:
+            asset, amount = reservation[0], reservation[1]
+            self.reserved[asset] = max(0.0, self.reserved.get(asset, 0.0) - amount)
+
+    def balance(self, asset):
+        """{'free', 'locked'} for an asset (zeros when the account holds none)"""
+        with self.lock:
+            balance = self.balances.get(asset)
+            return dict(balance) if balance else {'free': 0.0, 'locked': 0.0}
+
+    def available(self, asset):
+        """Free balance minus funds reserved for orders the balances do not reflect yet"""
+        with self.lock:
+            free = self.balances.get(asset, {}).get('free', 0.0)
+            return max(0.0, free - self.reserved.get(asset, 0.0))
+
+    def nonzero_balances(self):
+        """[{'asset', 'free', 'locked'}] for every asset with a balance"""
+        with self.lock:
+            return [{'asset': asset, 'free': balance['free'], 'locked': balance['locked']}
+                    for asset, balance in self.balances.items() if balance['free'] > 0 or balance['locked'] > 0]
+
+    def is_stale(self):
+        """True when events may have been missed and no reconcile has caught up yet"""
+        if self.last_reconcile is None:
+            return True
+        stream = self.user_stream
+        return stream is not None and self._missed_events(stream)
+
+    def _missed_events(self, stream):
+        if not stream.connected:
+            self.stream_synced = False
+        return not stream.connected or not self.stream_synced or stream.reconnects != self.synced_reconnects
+
+    def _reconcile_loop(self):
+        while not self.stop_event.wait(5):
+            stream = self.user_stream
+            # Catch up as soon as the stream is back; events sent while it was down are gone
+            missed_events = stream is not None and self._missed_events(stream) and stream.connected
+            due = self.last_reconcile is None or time.monotonic() - self.last_reconcile >= self.reconcile_seconds
+            if missed_events or due:
+                self.reconcile()
+
+    def start(self, account_info=None):
+        """Take the startup snapshot (or use account_info) and start the periodic reconcile"""
+        with self.start_lock:
+            if self.thread is not None:
+                return
+            if account_info is not None:
+                self.load_snapshot(account_info)
+                self.last_reconcile = time.monotonic()
+            else:
+                self.reconcile()
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._reconcile_loop, name="account-reconcile", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def stats(self):
+        return {
+            'assets': len(self.balances),
+            'events': self.events,
+            'reconciles': self.reconciles,
+            'drift_corrections': self.drift_corrections,
+            'reservations': len(self.reservations),
+            'stale': self.is_stale()
+        }
@@ -0,0 +1,220 @@
+"""
+Per-candle analysis stage for the live trading loop.
+
+The LSTM, indicator and Monte Carlo analyzers only meet again in
+generate_order, so the stage runs them concurrently on a bounded thread pool
+and fans their results back in. Candle-close-to-decision latency becomes the
+slowest analyzer instead of the sum of all three. Each analyzer has its own
+deadline; a result that misses it is dropped for that candle (None), which
+generate_order already treats as missing data. The deadline only abandons the
+result: a Python thread cannot be stopped, so the overrunning call keeps its
+pool thread until it returns. Until then that analyzer is not submitted
+again, so a hung analyzer costs one thread instead of backing up the pool for
+every later candle. With lazy() the analyzers are
+instead run one at a time, only when generate_order asks for their signal.
+
+CandleAnalysisWorker moves all of that off the websocket-client callback
+thread: the socket thread only parses and enqueues closed candles, and one
+worker per symbol drains the queue. When the worker falls behind it still
+folds every queued candle into the history but only analyzes the newest one,
+so decisions are made on fresh data and the feed keeps up. Candles are never
+dropped: the incremental indicators and the history buffer must see every
+bar, and a candle is a small dict, so a long backlog is only reported.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class AnalysisStage:
+    """Runs a fixed set of analyzers on the same candle window concurrently"""
+    def __init__(self, analyzers, max_workers=None, deadlines=None, default_deadline=None):
+        """
+        Parameters:
+        analyzers: Dictionary of name -> function(candles) returning that analyzer's response
+        max_workers: Size of the thread pool (defaults to one thread per analyzer)
+        deadlines: Dictionary of name -> seconds allowed after the candle is submitted
+        default_deadline: Seconds allowed for analyzers without an entry in deadlines (None waits forever)
+        """
+        self.analyzers = dict(analyzers)
+        self.deadlines = dict(deadlines or {})
+        self.default_deadline = default_deadline
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or len(self.analyzers),
+                                           thread_name_prefix="analysis")
+        self.last_timings = {}
+        self.in_flight = {}  # name -> future of the analyzer's newest call
+        self.in_flight_lock = threading.Lock()
+        self.overruns = 0
+
+    def _submit(self, name, candles):
+        """Submit an analyzer unless its previous call is still running (returns None then)"""
+        with self.in_flight_lock:
+            previous = self.in_flight.get(name)
+            if previous is not None and not previous.done():
+                self.overruns += 1
+                print(f"{name} analyzer is still running from an earlier candle. Skipping it for this candle.")
+                return None
+            future = self.executor.submit(self._timed, name, self.analyzers[name], candles)
+            self.in_flight[name] = future
+            return future
+
+    def _timed(self, name, analyzer, candles):
+        start = time.perf_counter()
+        try:
+            return analyzer(candles)
+        finally:
+            self.last_timings[name] = time.perf_counter() - start
+
+    def _collect(self, name, future, submitted_at):
+        if future is None:
+            return None
+        deadline = self.deadlines.get(name, self.default_deadline)
+        remaining = None if deadline is None else max(0.0, submitted_at + deadline - time.perf_counter())
+
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeoutError:
+            # Only drops a call that has not started; a running one finishes in the background
+            future.cancel()
+            print(f"{name} analyzer missed its {deadline:.1f}s deadline. Skipping its result for this candle.")
+            return None
+        except Exception as e:
+            print(f"Error in {name} analyzer: {e}")
+            return None
+
+    def run(self, candles):
+        """Run every analyzer on the candle window and return {name: response or None}"""
+        submitted_at = time.perf_counter()
+        self.last_timings = {}
+        futures = {name: self._submit(name, candles) for name in self.analyzers}
+
+        results = {name: self._collect(name, future, submitted_at) for name, future in futures.items()}
+
+        elapsed = time.perf_counter() - submitted_at
+        timings = ", ".join(f"{name}: {seconds:.2f}s" for name, seconds in self.last_timings.items())
+        print(f"\nAnalysis stage completed in {elapsed:.2f} seconds ({timings})")
+
+        return results
+
+    def run_one(self, name, candles):
+        """Run a single analyzer under its deadline and return its response or None"""
+        submitted_at = time.perf_counter()
+        future = self._submit(name, candles)
+        return self._collect(name, future, submitted_at)
+
+    def lazy(self, candles):
+        """Return {name: LazyAnalysis} so only the analyzers a decision actually needs are run"""
+        self.last_timings = {}
+        return {name: LazyAnalysis(self, name, candles) for name in self.analyzers}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LazyAnalysis:
+    """One analyzer's response for a candle window, computed on the first call and then reused"""
+    def __init__(self, stage, name, candles):
+        self.stage = stage
+        self.name = name
+        self.candles = candles
+        self.evaluated = False
+        self.value = None
+
+    def __call__(self):
+        if not self.evaluated:
+            self.value = self.stage.run_one(self.name, self.candles)
+            self.evaluated = True
+        return self.value
+
+
+class CoalescingCandleQueue:
+    """FIFO of closed candles drained in batches; warns when more than maxsize are waiting"""
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.candles = deque()
+        self.condition = threading.Condition()
+        self.overflowed = 0  # Candles queued while more than maxsize were already waiting
+
+    def put(self, candle):
+        with self.condition:
+            if len(self.candles) >= self.maxsize:
+                if self.overflowed == 0 or len(self.candles) % self.maxsize == 0:
+                    print(f"Candle queue backlog: {len(self.candles)} closed candles waiting for analysis")
+                self.overflowed += 1
+            self.candles.append(candle)
+            self.condition.notify()
+
+    def drain(self, timeout=None):
+        """Wait for at least one candle and return everything queued, oldest first ([] on timeout)"""
+        with self.condition:
+            if not self.candles:
+                self.condition.wait(timeout)
+            batch = list(self.candles)
+            self.candles.clear()
+            return batch
+
+    def __len__(self):
+        with self.condition:
+            return len(self.candles)
+
+
+class CandleAnalysisWorker:
+    """
+    Background worker that owns the analysis for one symbol.
+
+    process_candles(batch) receives every queued candle, oldest first, and is
+    expected to fold all of them into the history but analyze only the last.
+    """
+    def __init__(self, symbol, process_candles, maxsize=100):
+        self.symbol = symbol
+        self.process_candles = process_candles
+        self.queue = CoalescingCandleQueue(maxsize)
+        self.running = False
+        self.thread = None
+        self.processed = 0
+        self.skipped = 0
+
+    def submit(self, candle):
+        """Called from the websocket thread; never blocks on analysis"""
+        self.queue.put(candle)
+
+    def _run(self):
+        while self.running:
+            batch = self.queue.drain(timeout=1.0)
+            if not batch:
+                continue
+
+            if len(batch) > 1:
+                self.skipped += len(batch) - 1
+                print(f"{self.symbol} analysis fell behind: coalesced {len(batch)} candles into the newest one "
+                      f"(skipped so far: {self.skipped}, queued past the backlog limit: {self.queue.overflowed})")
+
+            try:
+                self.process_candles(batch)
+            except Exception as e:
+                print(f"Error in {self.symbol} analysis worker: {e}")
+            self.processed += 1
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name=f"analysis-{self.symbol}", daemon=True)
+            self.thread.start()
+            print(f"{self.symbol} analysis worker started")
+
+    def stop(self):
+        if self.running:
+            self.running = False
+            if self.thread:
+                self.thread.join(timeout=5)
+            print(f"{self.symbol} analysis worker stopped")
+
+    def stats(self):
+        return {
+            'symbol': self.symbol,
+            'queued': len(self.queue),
+            'processed': self.processed,
+            'skipped': self.skipped,
+            'overflowed': self.queue.overflowed
+        }
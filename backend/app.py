@@ -8,9 +8,14 @@ import time
 from datetime import datetime
 from binance.client import Client
 from binance.enums import *
-import pandas as pd
 from stock_analyzer import stock_analyzer
 from crypto_analyzer import crypto_analyzer
+from account_ledger import AccountLedger
+from binance_client import BinanceTestnetClient
+from market_streams import UserDataStream
+from rate_limiter import shared_limiter
+from config import (USER_STREAM_URL, LISTEN_KEY_KEEPALIVE_SECONDS, ACCOUNT_RECONCILE_SECONDS, ACCOUNT_DRIFT_TOLERANCE,
+                    RATE_LIMIT_RESERVES, RATE_LIMIT_MAX_WAITS)
 
 load_dotenv()
 api_key = os.getenv("api_key")
@@ -19,6 +24,17 @@ api_secret = os.getenv("api_secret")
 # Initialize Binance client for testnet
 client = Client('GiSEgThuzY1dnDTXiAEzQOp1BCmKWfrZnqNBvKypwQVd9sJoqtpyP9dripSiKk7Z', 'OA4HIvrcLe96UGgtnXgXksKghrLKyhHRqnxa93Fy6ulnfsppFD0MBGfD6OE39x5K', testnet=True)
 
+# Rate-limited REST client for the ledger and its user stream. Its limiter is this process's
+# shared_limiter(); the trading bot runs in its own process, and both limiters follow the
+# per-IP weight Binance reports in X-MBX-USED-WEIGHT, so each sees what the other spends
+rest_client = BinanceTestnetClient(client.API_KEY, client.API_SECRET,
+                                   rate_limiter=shared_limiter(RATE_LIMIT_RESERVES, RATE_LIMIT_MAX_WAITS))
+
+# Balances for /api/balance: one snapshot, then account events from the user data stream
+user_stream = UserDataStream(rest_client, USER_STREAM_URL, LISTEN_KEY_KEEPALIVE_SECONDS)
+account_ledger = AccountLedger(rest_client.get_account_info, ACCOUNT_RECONCILE_SECONDS, ACCOUNT_DRIFT_TOLERANCE)
+account_ledger.attach(user_stream)
+
 # Trading parameters - configurable via API
 trading_config = {
     'symbol': 'BTCUSDT',
@@ -67,13 +83,13 @@ def analyze_crypto():
 
 def get_account_balance():
     """Get account balance for specific assets"""
-    account_info = client.get_account()
-    balances = account_info['balances']
-    df = pd.DataFrame(balances)
-    df['free'] = pd.to_numeric(df['free'])
-    df['locked'] = pd.to_numeric(df['locked'])
-    df = df[(df['free'] > 0) | (df['locked'] > 0)]
-    return df.to_dict('records')
+    # Started on first use, so only the serving process (not the debug reloader) opens the stream
+    account_ledger.start()
+    user_stream.start()
+    if account_ledger.last_reconcile is None:
+        # No successful snapshot yet: read the account directly and let a failure reach /api/balance
+        account_ledger.snapshot()
+    return account_ledger.nonzero_balances()
 
 def get_current_price(symbol):
     """Get current price of a symbol"""
@@ -0,0 +1,366 @@
+"""
+asyncio variant of BinanceTestnetClient.
+
+AsyncBinanceClient mirrors the synchronous client's API (signing, orders,
+OCO, order status, klines, ticker, account, balances, my_trades, listenKeys)
+as coroutines on one pooled aiohttp session. Independent requests can then run
+concurrently on a single event loop instead of one blocking call after
+another, e.g. get_order_statuses for every open trade or get_tickers for
+several symbols. Responses are returned as parsed JSON exactly like the
+synchronous client, including Binance's {'code', 'msg'} error bodies.
+Prices and quantities are formatted locally with the same SymbolRules.
+
+    python async_binance_client.py check
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import time
+from urllib.parse import urlencode
+
+import aiohttp
+
+from binance_client import format_candles
+from rate_limiter import shared_limiter
+from symbol_rules import SymbolRules, FILTER_ERROR_CODES
+
+
+class AsyncBinanceClient:
+    """Coroutine counterpart of BinanceTestnetClient on a pooled keep-alive aiohttp session"""
+    def __init__(self, api_key, api_secret, base_url="https://testnet.binance.vision/api", pool_limit=20,
+                 connect_timeout=3.05, read_timeout=10, get_retries=2, retry_backoff=0.2, rate_limiter=None):
+        """
+        Parameters:
+        api_key, api_secret: Testnet API credentials
+        base_url: REST base URL including the /api prefix
+        pool_limit: Connections open at once (concurrent requests beyond it wait for a free one)
+        connect_timeout, read_timeout: Seconds before a request gives up
+        get_retries: Retries for GETs on connection errors and 5xx responses (orders are never retried)
+        retry_backoff: Backoff factor between GET retries (0.2 -> 0.2s, 0.4s, ...)
+        rate_limiter: RateLimiter scheduling the requests (the process-wide shared_limiter() when None)
+        """
+        self.API_KEY = api_key
+        self.API_SECRET = api_secret
+        self.BASE_URL = base_url
+        self.pool_limit = pool_limit
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.get_retries = get_retries
+        self.retry_backoff = retry_backoff
+        self.session = None
+        self.symbol_rules = {}  # symbol -> SymbolRules
+        self.rate_limiter = rate_limiter or shared_limiter()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get_session(self):
+        # Created on first use so the session belongs to the running event loop
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_limit, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    def _generate_signature(self, params):
+        """Generate HMAC SHA256 signature for API authentication"""
+        query_string = urlencode(params)
+        return hmac.new(self.API_SECRET.encode('utf-8'), query_string.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def _get_timestamp(self):
+        """Get current timestamp in milliseconds"""
+        return int(time.time() * 1000)
+
+    async def _request(self, method, endpoint, params=None, signed=False, api_key=False):
+        """Send a request and return the parsed JSON body; GETs are retried with backoff, all are rate limited"""
+        headers = {'X-MBX-APIKEY': self.API_KEY} if signed or api_key else {}
+        url = f"{self.BASE_URL}{endpoint}"
+        attempts = self.get_retries + 1 if method == 'GET' else 1
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            await self.rate_limiter.acquire_async(method, endpoint)
+            # Signed after any rate limit wait so the timestamp stays inside recvWindow
+            request_params = dict(params or {})
+            if signed:
+                request_params['timestamp'] = self._get_timestamp()
+                request_params['signature'] = self._generate_signature(request_params)
+            try:
+                async with self._get_session().request(method, url, params=request_params, headers=headers) as response:
+                    self.rate_limiter.record(response.status, response.headers)
+                    if response.status >= 500 and not last_attempt:
+                        await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+                        continue
+                    return await response.json(content_type=None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if last_attempt:
+                    raise
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+
+    async def get_account_info(self):
+        """Get account information including balances"""
+        return await self._request('GET', "/v3/account", signed=True)
+
+    async def get_balance(self, asset):
+        """Get specific asset balance"""
+        return (await self.get_balances([asset]))[asset]
+
+    async def get_balances(self, assets):
+        """{asset: {'free', 'locked'}} for several assets from one account request"""
+        account_info = await self.get_account_info()
+        balances = {balance['asset']: balance for balance in account_info.get('balances', [])}
+        return {asset: {'free': float(balances[asset]['free']), 'locked': float(balances[asset]['locked'])}
+                if asset in balances else {'free': 0.0, 'locked': 0.0}
+                for asset in assets}
+
+    async def get_exchange_info(self, symbol=None):
+        """Get exchange information including symbol filters"""
+        exchange_info = await self._request('GET', "/v3/exchangeInfo", {'symbol': symbol} if symbol else None)
+        if exchange_info.get('rateLimits'):
+            self.rate_limiter.configure(exchange_info['rateLimits'])
+        return exchange_info
+
+    async def get_symbol_rules(self, symbol, refresh=False):
+        """Compiled price/quantity filters for a symbol, downloaded once"""
+        if refresh or symbol not in self.symbol_rules:
+            exchange_info = await self.get_exchange_info(symbol)
+            for info in exchange_info.get('symbols', []):
+                if info.get('symbol') == symbol:
+                    self.symbol_rules[symbol] = SymbolRules(symbol, info.get('filters', []))
+                    break
+            else:
+                raise ValueError(f"No exchangeInfo for {symbol}: {exchange_info}")
+        return self.symbol_rules[symbol]
+
+    async def format_price(self, price, symbol):
+        return (await self.get_symbol_rules(symbol)).format_price(price)
+
+    async def format_quantity(self, quantity, symbol, price=None):
+        """Quantity on the LOT_SIZE step, raised to the minimum notional when a price is given"""
+        rules = await self.get_symbol_rules(symbol)
+        formatted_qty = rules.format_quantity(quantity)
+        if price is not None and rules.notional_shortfall(formatted_qty, price) is not None:
+            formatted_qty = format(rules.min_quantity_for_notional(price), 'f')
+            print(f"Adjusted quantity to meet minimum notional {rules.min_notional}: {formatted_qty}")
+        return formatted_qty
+
+    async def _send_order(self, endpoint, symbol, params):
+        result = await self._request('POST', endpoint, params, signed=True)
+        if 'code' in result and 'msg' in result:
+            print(f"Order Error: {result['msg']} (Code: {result['code']})")
+            if result['code'] in FILTER_ERROR_CODES:
+                # The exchange may have changed the symbol's filters since they were loaded
+                self.symbol_rules.pop(symbol, None)
+        return result
+
+    async def place_order(self, symbol, side, order_type, quantity, price=None, time_in_force="GTC"):
+        """Place a new order with quantity and price on the symbol's filters"""
+        params = {'symbol': symbol, 'side': side, 'type': order_type}
+
+        if order_type == "LIMIT":
+            if not price:
+                raise ValueError("Price is required for LIMIT orders")
+            params['price'] = await self.format_price(float(price), symbol)
+            params['quantity'] = await self.format_quantity(float(quantity), symbol, params['price'])
+            params['timeInForce'] = time_in_force
+        else:
+            params['quantity'] = await self.format_quantity(float(quantity), symbol)
+            if price:
+                params['price'] = await self.format_price(float(price), symbol)
+                params['timeInForce'] = time_in_force
+
+        print(f"Placing order with params: {params}")
+        return await self._send_order("/v3/order", symbol, params)
+
+    async def place_oco_order(self, symbol, side, quantity, price, stop_price, stop_limit_price):
+        """Place OCO (One-Cancels-the-Other) order for stop loss and take profit"""
+        params = {
+            'symbol': symbol,
+            'side': side,
+            'quantity': await self.format_quantity(float(quantity), symbol),
+            'price': await self.format_price(float(price), symbol),
+            'stopPrice': await self.format_price(float(stop_price), symbol),
+            'stopLimitPrice': await self.format_price(float(stop_limit_price), symbol),
+            'stopLimitTimeInForce': 'GTC'
+        }
+        print(f"Placing OCO order with params: {params}")
+        return await self._send_order("/v3/order/oco", symbol, params)
+
+    async def place_market_sell_order(self, symbol, quantity):
+        """Place a market sell order"""
+        return await self.place_order(symbol, 'SELL', 'MARKET', quantity)
+
+    async def get_order_status(self, symbol, order_id):
+        """Get status of a specific order"""
+        return await self._request('GET', "/v3/order", {'symbol': symbol, 'orderId': order_id}, signed=True)
+
+    async def get_order_statuses(self, symbol, order_ids):
+        """{order_id: status response} for many orders, requested concurrently"""
+        results = await asyncio.gather(*(self.get_order_status(symbol, order_id) for order_id in order_ids))
+        return dict(zip(order_ids, results))
+
+    async def get_open_orders(self, symbol=None):
+        """Get all open orders"""
+        return await self._request('GET', "/v3/openOrders", {'symbol': symbol} if symbol else None, signed=True)
+
+    async def cancel_order(self, symbol, order_id):
+        """Cancel an open order"""
+        return await self._request('DELETE', "/v3/order", {'symbol': symbol, 'orderId': order_id}, signed=True)
+
+    async def create_listen_key(self):
+        """Start a user data stream and return its listenKey"""
+        return (await self._request('POST', "/v3/userDataStream", api_key=True)).get('listenKey')
+
+    async def keepalive_listen_key(self, listen_key):
+        """Extend a listenKey's validity for another 60 minutes"""
+        return await self._request('PUT', "/v3/userDataStream", {'listenKey': listen_key}, api_key=True)
+
+    async def close_listen_key(self, listen_key):
+        """Close a user data stream"""
+        return await self._request('DELETE', "/v3/userDataStream", {'listenKey': listen_key}, api_key=True)
+
+    async def get_historical_candles(self, symbol, interval, limit=500):
+        """Fetch historical candle data"""
+        data = await self._request('GET', "/v3/klines", {'symbol': symbol.upper(), 'interval': interval, 'limit': limit})
+        return format_candles(data)
+
+    async def get_symbol_ticker(self, symbol):
+        """Get latest price for a symbol"""
+        return await self._request('GET', "/v3/ticker/price", {'symbol': symbol})
+
+    async def get_tickers(self, symbols):
+        """{symbol: ticker response} for several symbols, requested concurrently"""
+        results = await asyncio.gather(*(self.get_symbol_ticker(symbol) for symbol in symbols))
+        return dict(zip(symbols, results))
+
+    async def get_my_trades(self, symbol, limit=500):
+        """Get historical trades for the account"""
+        return await self._request('GET', "/v3/myTrades", {'symbol': symbol, 'limit': limit}, signed=True)
+
+
+def check(orders=20, delay=0.05):
+    """
+    Exercise the client against a local aiohttp stand-in of the REST API.
+
+    The stand-in verifies every signature, answers each order status after
+    `delay` seconds, and fails the first ticker request with a 503. The check
+    confirms that order statuses for many trades run concurrently (about one
+    delay in total instead of one per order), that GETs are retried and orders
+    are not, and that orders are formatted on the symbol's filters.
+    """
+    from aiohttp import web
+
+    api_key, api_secret = "standin-key", "standin-secret"
+    counts = {'exchangeInfo': 0, 'ticker': 0, 'order_post': 0, 'bad_signature': 0}
+    in_flight = [0, 0]  # current, peak concurrent order status requests
+    filters = [
+        {'filterType': 'PRICE_FILTER', 'minPrice': '0.01', 'maxPrice': '1000000', 'tickSize': '0.01'},
+        {'filterType': 'LOT_SIZE', 'minQty': '0.00001', 'maxQty': '9000', 'stepSize': '0.00001'},
+        {'filterType': 'NOTIONAL', 'minNotional': '5', 'maxNotional': '9000000'},
+    ]
+
+    def verified(request):
+        query = [(key, value) for key, value in request.query.items() if key != 'signature']
+        expected = hmac.new(api_secret.encode(), urlencode(query).encode(), hashlib.sha256).hexdigest()
+        ok = request.query.get('signature') == expected and request.headers.get('X-MBX-APIKEY') == api_key
+        if not ok:
+            counts['bad_signature'] += 1
+        return ok
+
+    async def exchange_info(request):
+        counts['exchangeInfo'] += 1
+        return web.json_response({'symbols': [{'symbol': 'BTCUSDT', 'filters': filters}]})
+
+    async def ticker(request):
+        counts['ticker'] += 1
+        if counts['ticker'] == 1:
+            return web.json_response({'code': -1001, 'msg': 'Internal error'}, status=503)
+        return web.json_response({'symbol': request.query['symbol'], 'price': '60000.00'})
+
+    async def order_status(request):
+        verified(request)
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight[1], in_flight[0])
+        await asyncio.sleep(delay)
+        in_flight[0] -= 1
+        return web.json_response({'orderId': int(request.query['orderId']), 'status': 'NEW'})
+
+    async def new_order(request):
+        verified(request)
+        counts['order_post'] += 1
+        return web.json_response({'orderId': 1, 'status': 'NEW', 'price': request.query.get('price'),
+                                  'origQty': request.query.get('quantity')})
+
+    async def account(request):
+        verified(request)
+        return web.json_response({'balances': [{'asset': 'USDT', 'free': '1000.0', 'locked': '0.0'},
+                                               {'asset': 'BTC', 'free': '0.5', 'locked': '0.1'}]})
+
+    async def klines(request):
+        return web.json_response([[0, '1', '2', '0.5', '1.5', '10', 59999, '15', 3, '5', '7.5']])
+
+    async def run():
+        app = web.Application()
+        app.router.add_get('/api/v3/exchangeInfo', exchange_info)
+        app.router.add_get('/api/v3/ticker/price', ticker)
+        app.router.add_get('/api/v3/order', order_status)
+        app.router.add_post('/api/v3/order', new_order)
+        app.router.add_get('/api/v3/account', account)
+        app.router.add_get('/api/v3/klines', klines)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        try:
+            async with AsyncBinanceClient(api_key, api_secret, f"http://127.0.0.1:{port}/api",
+                                          retry_backoff=0.01) as client:
+                order_ids = list(range(100, 100 + orders))
+                start = time.perf_counter()
+                statuses = await client.get_order_statuses('BTCUSDT', order_ids)
+                concurrent_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for order_id in order_ids[:5]:
+                    await client.get_order_status('BTCUSDT', order_id)
+                sequential_time = (time.perf_counter() - start) / 5 * orders
+
+                ticker_result, balances, candles, order = await asyncio.gather(
+                    client.get_symbol_ticker('BTCUSDT'),
+                    client.get_balances(['USDT', 'BTC', 'ETH']),
+                    client.get_historical_candles('BTCUSDT', '1m', 1),
+                    client.place_order('BTCUSDT', 'BUY', 'LIMIT', 0.00005, 60000.126))
+        finally:
+            await runner.cleanup()
+
+        print(f"{orders} order statuses: {concurrent_time * 1000:.0f} ms concurrently "
+              f"(peak {in_flight[1]} in flight) vs ~{sequential_time * 1000:.0f} ms one after another")
+        print(f"Ticker after one 503: {ticker_result} ({counts['ticker']} requests)")
+        print(f"Balances: {balances}")
+        print(f"Order sent with price {order['price']} and quantity {order['origQty']} "
+              f"({counts['order_post']} POST, {counts['exchangeInfo']} exchangeInfo)")
+        return (len(statuses) == orders and in_flight[1] == orders and concurrent_time < sequential_time / 4
+                and ticker_result.get('price') == '60000.00' and counts['ticker'] == 2
+                and balances['BTC'] == {'free': 0.5, 'locked': 0.1} and balances['ETH']['free'] == 0.0
+                and candles[0]['close'] == 1.5 and order['price'] == '60000.13' and order['origQty'] == '0.00009'
+                and counts['order_post'] == 1 and counts['bad_signature'] == 0)
+
+    passed = asyncio.run(run())
+    print("Async client check passed" if passed else "Async client check FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Async Binance client utilities')
+    parser.add_argument('command', choices=['check'], help='check: run the client against a local stand-in server')
+    parser.add_argument('--orders', type=int, default=20, help='Order statuses requested concurrently')
+    args = parser.parse_args()
+
+    if not check(args.orders):
+        raise SystemExit(1)
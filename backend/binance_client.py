@@ -1,13 +1,60 @@
+"""
+Binance Spot testnet REST client.
+
+All calls go through one pooled requests.Session, so consecutive calls (an
+order placement does several) reuse a kept-alive TLS connection instead of
+paying a TCP and TLS handshake each. Idempotent GETs are retried with
+backoff on connection errors and 5xx responses; orders are never retried.
+
+    python binance_client.py bench --calls 50
+"""
+import argparse
 import requests
 import time
 import hmac
 import hashlib
 import json
 from urllib.parse import urlencode
-import math
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from symbol_rules import SymbolRulesCache, FILTER_ERROR_CODES
+from rate_limiter import shared_limiter
+
+def format_candles(data):
+    """Convert /v3/klines rows into candle dicts"""
+    formatted_candles = []
+    for candle in data:
+        formatted_candle = {
+            'open_time': candle[0],
+            'open': float(candle[1]),
+            'high': float(candle[2]),
+            'low': float(candle[3]),
+            'close': float(candle[4]),
+            'volume': float(candle[5]),
+            'close_time': candle[6],
+            'quote_asset_volume': float(candle[7]),
+            'number_of_trades': candle[8],
+            'taker_buy_base_asset_volume': float(candle[9]),
+            'taker_buy_quote_asset_volume': float(candle[10])
+        }
+        formatted_candles.append(formatted_candle)
+    
+    return formatted_candles
 
 class BinanceTestnetClient:
-    def __init__(self, api_key, api_secret):
+    def __init__(self, api_key, api_secret, pool_connections=2, pool_maxsize=10, connect_timeout=3.05,
+                 read_timeout=10, get_retries=2, retry_backoff=0.2, rules_refresh_seconds=3600, rate_limiter=None):
+        """
+        Parameters:
+        api_key, api_secret: Testnet API credentials
+        pool_connections: Hosts with their own connection pool
+        pool_maxsize: Kept-alive connections per host (threads calling at once)
+        connect_timeout, read_timeout: Seconds before a request gives up
+        get_retries: Retries for GETs on connection errors and 5xx responses (0 disables)
+        retry_backoff: Backoff factor between GET retries (0.2 -> 0.2s, 0.4s, ...)
+        rules_refresh_seconds: Interval between background refreshes of the cached symbol rules
+        rate_limiter: RateLimiter scheduling this client's requests (the process-wide shared_limiter() when None)
+        """
         self.API_KEY = api_key
         self.API_SECRET = api_secret
         self.BASE_URL = "https://testnet.binance.vision/api"
@@ -15,6 +62,58 @@ class BinanceTestnetClient:
         self.exchange_info_cache = None
         self.exchange_info_timestamp = 0
         
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = self._create_session(pool_connections, pool_maxsize, get_retries, retry_backoff)
+        # Request weight and order budgets with priority lanes (orders > account > history)
+        self.rate_limiter = rate_limiter or shared_limiter()
+        # Price/quantity filters compiled once, so formatting an order needs no exchangeInfo download
+        self.symbol_rules = SymbolRulesCache(self, rules_refresh_seconds)
+        
+    def _create_session(self, pool_connections, pool_maxsize, get_retries, retry_backoff):
+        """Keep-alive session; only GETs are retried so an order is never sent twice"""
+        retry = Retry(
+            total=get_retries,
+            connect=get_retries,
+            read=get_retries,
+            status=get_retries,
+            backoff_factor=retry_backoff,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+            respect_retry_after_header=False  # 429/418 go back to the rate limiter, which holds every lane
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def _request(self, method, url, **kwargs):
+        """
+        Send a request on the pooled session with the client's timeouts.
+        
+        The rate limiter may defer the request, or raise RequestShed for a
+        low-priority one, and is corrected from the response's X-MBX-* headers.
+        """
+        endpoint = url[len(self.BASE_URL):] if url.startswith(self.BASE_URL) else url
+        self.rate_limiter.acquire(method, endpoint)
+        
+        params = kwargs.get('params')
+        if isinstance(params, dict) and 'signature' in params:
+            # Re-signed after any rate limit wait so the timestamp stays inside recvWindow
+            params = {key: value for key, value in params.items() if key != 'signature'}
+            params['timestamp'] = self._get_timestamp()
+            params['signature'] = self._generate_signature(params)
+            kwargs['params'] = params
+        
+        kwargs.setdefault('timeout', self.timeout)
+        response = self.session.request(method, url, **kwargs)
+        self.rate_limiter.record(response.status_code, response.headers)
+        return response
+    
+    def close(self):
+        self.session.close()
+        
     def _generate_signature(self, params):
         """Generate HMAC SHA256 signature for API authentication"""
         query_string = urlencode(params)
@@ -42,7 +141,7 @@ class BinanceTestnetClient:
             'X-MBX-APIKEY': self.API_KEY
         }
         
-        response = requests.get(f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
+        response = self._request('GET', f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
         return response.json()
     
     def get_balance(self, asset):
@@ -72,9 +171,11 @@ class BinanceTestnetClient:
             if symbol:
                 params['symbol'] = symbol
                 
-            response = requests.get(f"{self.BASE_URL}{endpoint}", params=params)
+            response = self._request('GET', f"{self.BASE_URL}{endpoint}", params=params)
             self.exchange_info_cache = response.json()
             self.exchange_info_timestamp = current_time
+            if self.exchange_info_cache.get('rateLimits'):
+                self.rate_limiter.configure(self.exchange_info_cache['rateLimits'])
             
         return self.exchange_info_cache
     
@@ -89,199 +190,52 @@ class BinanceTestnetClient:
         return []
     
     def format_price(self, price, symbol):
-        """Format price according to symbol's price filter rules"""
-        filters = self.get_symbol_filters(symbol)
-        
-        for filter in filters:
-            if filter['filterType'] == 'PRICE_FILTER':
-                min_price = float(filter['minPrice'])
-                max_price = float(filter['maxPrice'])
-                tick_size = float(filter['tickSize'])
-                
-                # Ensure price is within min/max bounds
-                price = max(min_price, min(max_price, price))
-                
-                # Calculate decimal places based on tick size
-                tick_str = str(tick_size)
-                if '.' in tick_str:
-                    decimal_places = len(tick_str.split('.')[1].rstrip('0'))
-                    if decimal_places == 0:
-                        decimal_places = len(tick_str.split('.')[1])
-                else:
-                    decimal_places = 0
-                
-                # Calculate the correct price according to tick size
-                # Step 1: Divide by tick size
-                quotient = price / tick_size
-                # Step 2: Round to nearest integer
-                rounded = round(quotient)
-                # Step 3: Multiply back by tick size
-                adjusted_price = rounded * tick_size
-                # Format price to proper decimal places
-                formatted_price = f"{adjusted_price:.{decimal_places}f}"
-                
-                print(f"Price formatting: Original: {price}, Tick size: {tick_size}, " +
-                      f"Decimal places: {decimal_places}, Formatted: {formatted_price}")
-                
-                return formatted_price
-                
-        # Default format if no filter found
-        return f"{price:.2f}"
+        """Format price according to symbol's price filter rules (cached, no network I/O)"""
+        return self.symbol_rules.get(symbol).format_price(price)
     
-    def format_quantity(self, quantity, symbol):
-        """Format quantity according to symbol's LOT_SIZE and MIN_NOTIONAL filters"""
+    def format_quantity(self, quantity, symbol, price=None):
+        """
+        Format quantity according to symbol's LOT_SIZE filter (cached, no network I/O).
+        
+        With a price, the quantity is also raised to meet the NOTIONAL / MIN_NOTIONAL minimum.
+        """
         try:
             quantity = float(quantity)
         except (ValueError, TypeError):
             print(f"ERROR: Invalid quantity value: {quantity}. Using minimum quantity.")
-            return self.get_minimum_quantity(symbol)
+            return self.get_minimum_quantity(symbol, price)
             
         # Hard minimum check before any other processing
         if quantity <= 0:
             print(f"ERROR: Quantity {quantity} is <= 0. Using minimum quantity.")
-            return self.get_minimum_quantity(symbol)
-            
-        filters = self.get_symbol_filters(symbol)
-        lot_size_filter = None
-        min_notional_filter = None
-        price_info = None
-        
-        # First identify the filters we need
-        for filter in filters:
-            if filter['filterType'] == 'LOT_SIZE':
-                lot_size_filter = filter
-            elif filter['filterType'] == 'MIN_NOTIONAL':
-                min_notional_filter = filter
-            elif filter['filterType'] == 'PRICE_FILTER':
-                price_info = filter
-                
-        if not lot_size_filter:
-            print(f"WARNING: No LOT_SIZE filter found for {symbol}")
-            return f"{quantity:.5f}" if symbol == 'BTCUSDT' else f"{quantity:.2f}"
+            return self.get_minimum_quantity(symbol, price)
         
-        # Extract LOT_SIZE parameters
-        min_qty = float(lot_size_filter['minQty'])
-        max_qty = float(lot_size_filter['maxQty'])
-        step_size = float(lot_size_filter['stepSize'])
+        rules = self.symbol_rules.get(symbol)
+        formatted_qty = rules.format_quantity(quantity)
         
-        # Ensure quantity is at least the minimum quantity
-        quantity = max(min_qty, quantity)
-        
-        # Ensure quantity is within min/max bounds
-        quantity = min(max_qty, quantity)
-        
-        # Calculate decimal places based on step size
-        decimal_places = self._get_decimal_places(step_size)
-        
-        # Floor to the nearest step
-        quantity_scaled = quantity / step_size
-        quantity_floored = math.floor(quantity_scaled)
-        adjusted_qty = quantity_floored * step_size
-        
-        # Ensure we're not below minimum
-        if adjusted_qty < min_qty:
-            adjusted_qty = min_qty
-        
-        # Format to the correct number of decimal places
-        formatted_qty = f"{adjusted_qty:.{decimal_places}f}"
-        
-        # Cross-check with MIN_NOTIONAL filter if available
-        if min_notional_filter:
-            min_notional = float(min_notional_filter.get('minNotional', 0))
-            
-            # Get the last price for the symbol to check notional value
-            try:
-                ticker_price = None
-                if price_info:
-                    ticker_price = float(price_info.get('avgPrice', 0)) or float(price_info.get('lastPrice', 0))
-                
-                if not ticker_price:
-                    ticker_response = requests.get(f"{self.BASE_URL}/v3/ticker/price", params={"symbol": symbol})
-                    ticker_data = ticker_response.json()
-                    ticker_price = float(ticker_data.get('price', 0))
-                
-                if ticker_price > 0:
-                    # Calculate the notional value (quantity * price)
-                    notional_value = float(formatted_qty) * ticker_price
-                    
-                    # If notional value is too small, increase quantity
-                    if notional_value < min_notional:
-                        min_required_qty = min_notional / ticker_price
-                        
-                        # Round up to the nearest step size
-                        steps_needed = math.ceil(min_required_qty / step_size)
-                        min_valid_qty = steps_needed * step_size
-                        
-                        # Format with correct decimal places
-                        formatted_qty = f"{min_valid_qty:.{decimal_places}f}"
-                        print(f"Adjusted quantity to meet MIN_NOTIONAL: {formatted_qty} (value: {min_valid_qty * ticker_price:.2f} > {min_notional})")
-            except Exception as e:
-                print(f"Error checking MIN_NOTIONAL filter: {e}")
-        
-        print(f"Quantity formatting: Original: {quantity}, Min qty: {min_qty}, Step size: {step_size}, " +
-              f"Decimal places: {decimal_places}, Adjusted: {adjusted_qty}, Formatted: {formatted_qty}")
+        if price is not None and rules.notional_shortfall(formatted_qty, price) is not None:
+            formatted_qty = format(rules.min_quantity_for_notional(price), 'f')
+            print(f"Adjusted quantity to meet minimum notional {rules.min_notional}: {formatted_qty}")
         
         return formatted_qty
-
-    def _get_decimal_places(self, value):
-        """Correctly determine decimal places even for scientific notation"""
-        value_str = f"{value:.10f}".rstrip('0').rstrip('.') if value < 0.1 else str(value)
-        
-        if '.' in value_str:
-            return len(value_str.split('.')[1])
-        return 0
     
-    def get_minimum_quantity(self, symbol):
-        """Get the minimum valid quantity that meets MIN_NOTIONAL requirements"""
-        filters = self.get_symbol_filters(symbol)
-        min_qty = 0.00001 if symbol == 'BTCUSDT' else 0.01
-        min_notional = 10  # Default safe value
-        
-        # Find the minimum quantity and notional filters
-        for filter in filters:
-            if filter['filterType'] == 'LOT_SIZE':
-                min_qty = float(filter['minQty'])
-            elif filter['filterType'] == 'MIN_NOTIONAL':
-                min_notional = float(filter['minNotional'])
-        
-        # Get current price
+    def get_minimum_quantity(self, symbol, price=None):
+        """Get the minimum valid quantity that meets the minimum notional (fetches the ticker when no price is given)"""
         try:
-            ticker_response = requests.get(f"{self.BASE_URL}/v3/ticker/price", params={"symbol": symbol})
-            ticker_data = ticker_response.json()
+            if price is None:
+                ticker_response = self._request('GET', f"{self.BASE_URL}/v3/ticker/price", params={"symbol": symbol})
+                price = float(ticker_response.json()['price'])
             
-            if 'price' in ticker_data:
-                current_price = float(ticker_data['price'])
-                
-                # Calculate minimum quantity to satisfy min_notional
-                required_qty = min_notional / current_price
-                
-                # Round up to the nearest valid step
-                lot_size_filter = None
-                for filter in filters:
-                    if filter['filterType'] == 'LOT_SIZE':
-                        lot_size_filter = filter
-                        break
-                
-                if lot_size_filter:
-                    step_size = float(lot_size_filter['stepSize'])
-                    decimal_places = self._get_decimal_places(step_size)
-                    
-                    # Round up to nearest step
-                    steps = math.ceil(required_qty / step_size)
-                    valid_qty = max(steps * step_size, min_qty)
-                    
-                    print(f"Calculated minimum valid quantity: {valid_qty:.{decimal_places}f} to meet MIN_NOTIONAL {min_notional}")
-                    return f"{valid_qty:.{decimal_places}f}"
-                
-                # Fallback if no step size is found
-                return f"{max(required_qty, min_qty):.5f}"
+            valid_qty = self.symbol_rules.get(symbol).min_quantity_for_notional(price)
+            print(f"Calculated minimum valid quantity: {valid_qty} at price {price}")
+            return format(valid_qty, 'f')
         except Exception as e:
             print(f"Error calculating minimum quantity: {e}")
         
         # Default safe value
         return "0.001" if symbol == 'BTCUSDT' else "0.1"
 
-    def place_order(self, symbol, side, order_type, quantity, price=None, time_in_force="GTC"):
+    def place_order(self, symbol, side, order_type, quantity, price=None, time_in_force="GTC", retry_filter_error=True):
         """Place a new order on Binance testnet with proper handling of filters"""
         endpoint = "/v3/order"
         
@@ -290,11 +244,11 @@ class BinanceTestnetClient:
             float_qty = float(quantity)
             if float_qty <= 0:
                 print(f"ERROR: Attempt to place order with invalid quantity: {quantity}")
-                quantity = self.get_minimum_quantity(symbol)
+                quantity = self.get_minimum_quantity(symbol, price)
                 print(f"Setting quantity to minimum safe value: {quantity}")
         except (ValueError, TypeError):
             print(f"ERROR: Invalid quantity format: {quantity}")
-            quantity = self.get_minimum_quantity(symbol)
+            quantity = self.get_minimum_quantity(symbol, price)
             print(f"Setting quantity to minimum safe value: {quantity}")
         
         # Format quantity according to LOT_SIZE filter
@@ -322,31 +276,14 @@ class BinanceTestnetClient:
             params['price'] = formatted_price
             params['timeInForce'] = time_in_force
             
-            # Pre-check MIN_NOTIONAL filter
-            try:
-                notional_value = float(formatted_quantity) * float(formatted_price)
-                filters = self.get_symbol_filters(symbol)
-                for filter in filters:
-                    if filter['filterType'] == 'MIN_NOTIONAL':
-                        min_notional = float(filter['minNotional'])
-                        if notional_value < min_notional:
-                            print(f"WARNING: Order value {notional_value} is below MIN_NOTIONAL {min_notional}")
-                            # Increase quantity to meet MIN_NOTIONAL
-                            required_qty = min_notional / float(formatted_price)
-                            # Get the correct step size from LOT_SIZE filter
-                            for f in filters:
-                                if f['filterType'] == 'LOT_SIZE':
-                                    step_size = float(f['stepSize'])
-                                    # Round up to nearest step
-                                    steps_needed = math.ceil(required_qty / step_size)
-                                    min_valid_qty = steps_needed * step_size
-                                    decimal_places = self._get_decimal_places(step_size)
-                                    formatted_quantity = f"{min_valid_qty:.{decimal_places}f}"
-                                    params['quantity'] = formatted_quantity
-                                    print(f"Adjusted quantity to {formatted_quantity} to meet MIN_NOTIONAL")
-                                    break
-            except Exception as e:
-                print(f"Error pre-checking MIN_NOTIONAL: {e}")
+            # Pre-check the minimum notional locally
+            rules = self.symbol_rules.get(symbol)
+            min_notional = rules.notional_shortfall(formatted_quantity, formatted_price)
+            if min_notional is not None:
+                print(f"WARNING: Order value {float(formatted_quantity) * float(formatted_price)} is below minimum notional {min_notional}")
+                formatted_quantity = format(rules.min_quantity_for_notional(formatted_price), 'f')
+                params['quantity'] = formatted_quantity
+                print(f"Adjusted quantity to {formatted_quantity} to meet minimum notional")
         elif order_type == "MARKET":
             params['quantity'] = formatted_quantity
         else:
@@ -370,28 +307,23 @@ class BinanceTestnetClient:
         print(f"Placing order with params: {params}")
         
         # Make request and handle response
-        response = requests.post(f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
+        response = self._request('POST', f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
         
         if response.status_code != 200:
             print(f"Error response from Binance: Status Code {response.status_code}")
             print(f"Response text: {response.text}")
             error_data = response.json()
             
-            if error_data.get('code') == -1013 and 'NOTIONAL' in error_data.get('msg', ''):
-                print("MIN_NOTIONAL filter triggered. Trying again with higher quantity.")
+            if error_data.get('code') in FILTER_ERROR_CODES:
+                # The exchange may have changed the symbol's filters since they were cached
+                self.symbol_rules.invalidate(symbol)
                 
-                # Try to extract the minimum notional from error message or use a safe value
-                min_notional = 10  # Default safe value for BTC
-                
-                # Update quantity and retry
-                if price:
-                    required_qty = min_notional / float(price)
-                    # Get a valid quantity that's greater than required_qty
-                    new_quantity = self.get_minimum_quantity(symbol)
+                if retry_filter_error and price and 'NOTIONAL' in error_data.get('msg', ''):
+                    print("Minimum notional filter triggered. Trying again with higher quantity.")
+                    new_quantity = self.get_minimum_quantity(symbol, float(price))
                     print(f"Retrying with minimum safe quantity: {new_quantity}")
-                    
-                    # Recursive call with new quantity
-                    return self.place_order(symbol, side, order_type, new_quantity, price, time_in_force)
+                    return self.place_order(symbol, side, order_type, new_quantity, price, time_in_force,
+                                            retry_filter_error=False)
         
         return response.json()
     
@@ -423,7 +355,7 @@ class BinanceTestnetClient:
         }
         
         print(f"Placing OCO order with params: {params}")
-        response = requests.post(f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
+        response = self._request('POST', f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
         result = response.json()
         
         if 'code' in result and 'msg' in result:
@@ -461,7 +393,7 @@ class BinanceTestnetClient:
         }
         
         print(f"Placing stop loss order with params: {params}")
-        response = requests.post(f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
+        response = self._request('POST', f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
         result = response.json()
         
         if 'code' in result and 'msg' in result:
@@ -508,7 +440,7 @@ class BinanceTestnetClient:
         }
         
         print(f"Placing take profit order with params: {params}")
-        response = requests.post(f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
+        response = self._request('POST', f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
         result = response.json()
         
         if 'code' in result and 'msg' in result:
@@ -531,7 +463,7 @@ class BinanceTestnetClient:
             'X-MBX-APIKEY': self.API_KEY
         }
         
-        response = requests.get(f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
+        response = self._request('GET', f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
         return response.json()
     
     def get_open_orders(self, symbol=None):
@@ -550,7 +482,7 @@ class BinanceTestnetClient:
             'X-MBX-APIKEY': self.API_KEY
         }
         
-        response = requests.get(f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
+        response = self._request('GET', f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
         return response.json()
         
     def cancel_order(self, symbol, order_id):
@@ -568,7 +500,40 @@ class BinanceTestnetClient:
             'X-MBX-APIKEY': self.API_KEY
         }
         
-        response = requests.delete(f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
+        response = self._request('DELETE', f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
+        return response.json()
+    
+    def create_listen_key(self):
+        """Start a user data stream and return its listenKey"""
+        endpoint = "/v3/userDataStream"
+        
+        headers = {
+            'X-MBX-APIKEY': self.API_KEY
+        }
+        
+        response = self._request('POST', f"{self.BASE_URL}{endpoint}", headers=headers)
+        return response.json().get('listenKey')
+    
+    def keepalive_listen_key(self, listen_key):
+        """Extend a listenKey's validity for another 60 minutes"""
+        endpoint = "/v3/userDataStream"
+        
+        headers = {
+            'X-MBX-APIKEY': self.API_KEY
+        }
+        
+        response = self._request('PUT', f"{self.BASE_URL}{endpoint}", params={'listenKey': listen_key}, headers=headers)
+        return response.json()
+    
+    def close_listen_key(self, listen_key):
+        """Close a user data stream"""
+        endpoint = "/v3/userDataStream"
+        
+        headers = {
+            'X-MBX-APIKEY': self.API_KEY
+        }
+        
+        response = self._request('DELETE', f"{self.BASE_URL}{endpoint}", params={'listenKey': listen_key}, headers=headers)
         return response.json()
     
     def get_historical_candles(self, symbol, interval, limit=500):
@@ -580,27 +545,8 @@ class BinanceTestnetClient:
             'limit': limit
         }
         
-        response = requests.get(f"{self.BASE_URL}{endpoint}", params=params)
-        data = response.json()
-        
-        formatted_candles = []
-        for candle in data:
-            formatted_candle = {
-                'open_time': candle[0],
-                'open': float(candle[1]),
-                'high': float(candle[2]),
-                'low': float(candle[3]),
-                'close': float(candle[4]),
-                'volume': float(candle[5]),
-                'close_time': candle[6],
-                'quote_asset_volume': float(candle[7]),
-                'number_of_trades': candle[8],
-                'taker_buy_base_asset_volume': float(candle[9]),
-                'taker_buy_quote_asset_volume': float(candle[10])
-            }
-            formatted_candles.append(formatted_candle)
-        
-        return formatted_candles
+        response = self._request('GET', f"{self.BASE_URL}{endpoint}", params=params)
+        return format_candles(response.json())
 
     def get_symbol_ticker(self, symbol):
         """Get latest price for a symbol"""
@@ -609,7 +555,7 @@ class BinanceTestnetClient:
             'symbol': symbol
         }
         
-        response = requests.get(f"{self.BASE_URL}{endpoint}", params=params)
+        response = self._request('GET', f"{self.BASE_URL}{endpoint}", params=params)
         return response.json()
     
     def place_market_sell_order(self, symbol, quantity):
@@ -635,7 +581,7 @@ class BinanceTestnetClient:
         }
         
         print(f"Placing market sell order with params: {params}")
-        response = requests.post(f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
+        response = self._request('POST', f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
         
         if response.status_code != 200:
             print(f"Error response from Binance: Status Code {response.status_code}")
@@ -658,5 +604,87 @@ class BinanceTestnetClient:
             'X-MBX-APIKEY': self.API_KEY
         }
         
-        response = requests.get(f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
+        response = self._request('GET', f"{self.BASE_URL}{endpoint}", params=params, headers=headers)
         return response.json()
+
+
+def benchmark(calls=50):
+    """
+    Per-call latency of the old per-call requests.get against the pooled session.
+
+    A local HTTPS stand-in (self-signed certificate made with the openssl CLI,
+    HTTP/1.1 keep-alive) answers /v3/ticker/price, so every old-style call
+    pays a TCP connect and TLS handshake while the session reuses one
+    connection.
+    """
+    import os
+    import ssl
+    import subprocess
+    import tempfile
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class TickerHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True  # headers and body are separate writes
+
+        def do_GET(self):
+            payload = json.dumps({'symbol': 'BTCUSDT', 'price': '60000.00'}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    with tempfile.TemporaryDirectory() as cert_dir:
+        cert_file = os.path.join(cert_dir, 'cert.pem')
+        key_file = os.path.join(cert_dir, 'key.pem')
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                        '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1',
+                        '-keyout', key_file, '-out', cert_file], check=True, capture_output=True)
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), TickerHandler)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_file, key_file)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"https://127.0.0.1:{server.server_address[1]}/api"
+
+        def measure(get):
+            get()  # warm up (imports, first handshake)
+            timings = []
+            for _ in range(calls):
+                start = time.perf_counter()
+                get()
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            return timings[len(timings) // 2], sum(timings) / len(timings)
+
+        url = f"{base_url}/v3/ticker/price"
+        params = {'symbol': 'BTCUSDT'}
+        before = measure(lambda: requests.get(url, params=params, verify=cert_file, timeout=10).json())
+
+        client = BinanceTestnetClient("standin-key", "standin-secret")
+        client.BASE_URL = base_url
+        client.session.verify = cert_file
+        client.session.trust_env = False  # a CA bundle from the environment would override verify
+        after = measure(lambda: client.get_symbol_ticker('BTCUSDT'))
+        client.close()
+        server.shutdown()
+
+    print(f"{calls} ticker calls against a local HTTPS stand-in")
+    print(f"requests.get per call: p50 {before[0] * 1000:.2f} ms, mean {before[1] * 1000:.2f} ms")
+    print(f"Pooled session:        p50 {after[0] * 1000:.2f} ms, mean {after[1] * 1000:.2f} ms "
+          f"({before[1] / after[1]:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Binance client utilities')
+    parser.add_argument('command', choices=['bench'], help='bench: per-call latency with and without the pooled session')
+    parser.add_argument('--calls', type=int, default=50)
+    args = parser.parse_args()
+
+    benchmark(args.calls)
@@ -0,0 +1,144 @@
+"""
+Fixed-capacity columnar ring buffer for candle history.
+
+Each column (open_time, OHLCV, taker volumes and the indicator columns) lives
+in one row of a float64 array that is twice the capacity long. Every candle is
+written to both halves, so the newest N rows of any column are always one
+contiguous slice and windows can be handed to the analysis modules as views
+without copying or building per-candle dicts.
+"""
+import numpy as np
+
+from incremental_indicators import INDICATOR_COLUMNS
+
+CANDLE_COLUMNS = [
+    'open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time',
+    'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume'
+] + INDICATOR_COLUMNS
+
+# Columns handed back as ints when a window is turned into candle dicts
+INTEGER_COLUMNS = {'open_time', 'close_time'}
+
+
+class CandleWindow:
+    """Read-only view over the newest rows of a CandleRingBuffer"""
+    def __init__(self, data, column_index):
+        self.data = data
+        self.column_index = column_index
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    def has_column(self, name):
+        return name in self.column_index
+
+    def column(self, name):
+        """Zero-copy 1-D view of one column"""
+        return self.data[self.column_index[name]]
+
+    def columns(self, names):
+        """(rows, len(names)) matrix of the requested columns, e.g. an LSTM feature window"""
+        return self.data[[self.column_index[name] for name in names]].T
+
+    def record(self, index):
+        """Candle dict for one row, with NaN turned back into None"""
+        record = {}
+        for name, i in self.column_index.items():
+            value = self.data[i, index]
+            if np.isnan(value):
+                record[name] = None
+            elif name in INTEGER_COLUMNS:
+                record[name] = int(value)
+            else:
+                record[name] = float(value)
+        return record
+
+    def __getitem__(self, index):
+        return self.record(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.record(index)
+
+    def records(self):
+        return list(self)
+
+    def copy(self):
+        """Detach the window from the buffer so later appends cannot change it"""
+        return CandleWindow(self.data.copy(), self.column_index)
+
+
+class CandleRingBuffer:
+    """Fixed-capacity candle history with zero-copy windows over the newest rows"""
+    def __init__(self, capacity, columns=CANDLE_COLUMNS):
+        self.capacity = capacity
+        self.columns = list(columns)
+        self.column_index = {name: i for i, name in enumerate(self.columns)}
+        self.data = np.full((len(self.columns), 2 * capacity), np.nan)
+        self.row = np.empty(len(self.columns))
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, candle):
+        """Write one candle dict; missing or None values are stored as NaN"""
+        for i, name in enumerate(self.columns):
+            value = candle.get(name)
+            self.row[i] = np.nan if value is None else value
+
+        slot = self.count % self.capacity
+        self.data[:, slot] = self.row
+        self.data[:, slot + self.capacity] = self.row
+        self.count += 1
+
+    def extend(self, candles):
+        for candle in candles:
+            self.append(candle)
+
+    def clear(self):
+        self.data.fill(np.nan)
+        self.count = 0
+
+    def window(self, size=None):
+        """
+        View of the newest `size` rows (all stored rows by default).
+
+        The view shares memory with the buffer, so take window(...).copy() when
+        the rows must survive a later append that could wrap around onto them.
+        """
+        stored = len(self)
+        size = stored if size is None else min(size, stored)
+        end = self.count % self.capacity + self.capacity
+        return CandleWindow(self.data[:, end - size:end], self.column_index)
+
+    def column(self, name, size=None):
+        """Zero-copy view of the newest `size` values of one column"""
+        return self.window(size).column(name)
+
+    def latest(self):
+        """Candle dict for the newest row, or None when empty"""
+        if self.count == 0:
+            return None
+        return self.window(1).record(0)
+
+
+def has_column(candles, name):
+    """Whether a CandleWindow or a list of candle dicts carries the given column"""
+    if isinstance(candles, CandleWindow):
+        return candles.has_column(name)
+    return len(candles) > 0 and name in candles[-1]
+
+
+def get_column(candles, name):
+    """Float array for one column of a CandleWindow (as a view) or a list of candle dicts (as a copy)"""
+    if isinstance(candles, CandleWindow):
+        return candles.column(name)
+    return np.array([candle.get(name) for candle in candles], dtype=float)
+
+
+def get_columns(candles, names):
+    """(rows, len(names)) float matrix for a CandleWindow or a list of candle dicts"""
+    if isinstance(candles, CandleWindow):
+        return candles.columns(names)
+    return np.array([[candle.get(name) for name in names] for candle in candles], dtype=float)
@@ -19,6 +19,8 @@ TRADING_SYMBOL = "BTCUSDT"  # Trading pair
 TRADING_INTERVAL = "1m"  # Candle interval (1m, 5m, 15m, 1h, etc.)
 TRADING_AMOUNT = 1000.0  # Amount in USD to trade with
 MAX_RISK_PERCENT = 1.0   # Maximum risk per trade (percentage of trading amount)
+EXIT_MODE = "local"  # local: monitor market-sells at TP/SL; oco: one exchange-side OCO sell once the entry fills
+OCO_STOP_LIMIT_OFFSET_PERCENT = 0.1  # Stop-limit price this far below the stop price so the stop leg still fills in a fast drop
 
 # Data Storage Configuration
 MAX_CANDLES = 60  # Number of candles to keep in memory for display and analysis
@@ -28,6 +30,27 @@ MAX_HISTORICAL_DATA = 1000  # Longer history for accurate calculations
 WS_SERVER_HOST = 'localhost'  # WebSocket server host
 WS_SERVER_PORT = 8765  # WebSocket server port
 
+# HTTP Client Configuration
+HTTP_POOL_MAXSIZE = 10  # Kept-alive connections to the exchange REST API
+HTTP_CONNECT_TIMEOUT = 3.05  # Seconds to establish a connection
+HTTP_READ_TIMEOUT = 10  # Seconds to wait for a response
+HTTP_GET_RETRIES = 2  # Retries for GETs on connection errors and 5xx (orders are never retried)
+HTTP_RETRY_BACKOFF = 0.2  # Backoff factor between GET retries (0.2s, 0.4s, ...)
+RATE_LIMIT_RESERVES = {"orders": 0.0, "account": 0.1, "history": 0.3}  # Share of the request weight budget a lane leaves to higher-priority lanes
+RATE_LIMIT_MAX_WAITS = {"orders": 30, "account": 10, "history": 2}  # Seconds a request may be deferred for rate limit budget before it is shed
+SYMBOL_RULES_REFRESH_SECONDS = 60 * 60  # Background refresh of cached price/lot/notional filters (also reloaded on filter rejections)
+
+# Exchange Stream Configuration
+KLINE_STREAM_URL = "wss://stream.binance.com:9443"  # Candle stream feeding the analysis
+MARKET_STREAM_URL = "wss://testnet.binance.vision"  # Price stream for the trade monitor (same exchange as the orders)
+USER_STREAM_URL = "wss://testnet.binance.vision"  # User data (listenKey) stream delivering fills
+USE_EXCHANGE_STREAMS = True  # Trade monitor runs on the price/user streams and only polls REST while they are stale
+PRICE_STREAM_TYPE = "bookTicker"  # bookTicker (best bid) or trade (last trade price)
+PRICE_STREAM_STALE_SECONDS = 5  # Seconds without a price update before the monitor falls back to the REST ticker
+LISTEN_KEY_KEEPALIVE_SECONDS = 30 * 60  # listenKeys expire after 60 minutes without a keepalive
+ACCOUNT_RECONCILE_SECONDS = 5 * 60  # REST account snapshot that corrects drift in the stream-fed balance ledger
+ACCOUNT_DRIFT_TOLERANCE = 1e-8  # Balance difference reported as drift on reconcile
+
 # Indicator Configuration
 RSI_OVERBOUGHT = 65  # RSI level considered overbought
 RSI_OVERSOLD = 35  # RSI level considered oversold
@@ -45,8 +68,45 @@ EMA_LONG = 50  # Long EMA period
 MC_SIMULATIONS = 1000  # Number of Monte Carlo simulations
 MC_FORECAST_PERIODS = 10  # Number of periods to forecast
 MC_CONFIDENCE_LEVEL = 90  # Confidence interval (5th to 95th percentile = 90%)
+MC_SEED = None  # Seed for the Monte Carlo generator (None draws fresh randomness every candle)
+MC_SAMPLING = "plain"  # Path sampling scheme: plain, antithetic or sobol (see monte_carlo_kernel.py bench)
+MC_ADAPTIVE = False  # Simulate in chunks and stop early once the signal or the bands are settled
+MC_CHUNK_SIZE = 250  # Paths per chunk in adaptive mode (MC_SIMULATIONS is the cap)
+MC_MIN_SIMULATIONS = 250  # Paths simulated before adaptive mode may stop
+MC_ADAPTIVE_Z = 2.58  # z-score of the prob_increase confidence interval checked against the signal thresholds
+MC_BAND_TOLERANCE = 0.0005  # Relative band change between chunks that counts as converged
+MC_USE_POOL = True  # Pre-draw normal blocks on a background thread in the live loop (fixed mode only)
+MC_POOL_BLOCKS = 4  # Blocks of MC_SIMULATIONS x MC_FORECAST_PERIODS normals kept ready
+MC_STREAMING = False  # Summarize paths chunk by chunk through a percentile sketch (memory independent of MC_SIMULATIONS)
+MC_STREAM_CHUNK_SIZE = 4096  # Paths simulated at once in streaming mode
+MC_SKETCH_ACCURACY = 0.0001  # Relative accuracy of the streamed percentile bands (quantile_sketch.py check)
 
 # LSTM Configuration
 LSTM_INPUT_SEQUENCE = 60  # Number of candles used for prediction input
 LSTM_OUTPUT_SEQUENCE = 10  # Number of future candles to predict
 LSTM_MODEL_DIR = os.path.join("models", "BTC1min_I60_O10")  # LSTM model directory
+LSTM_BACKEND = "keras"  # Inference backend: keras, tflite or onnx (see lstm_backends.py to export)
+LSTM_BATCH_SIZE = 512  # Windows per predict call when backtests evaluate the LSTM in batches
+MODEL_RELOAD_CHECK_SECONDS = 30  # How often the cached LSTM model files are checked for changes
+PREDICTION_CACHE_DIR = "prediction_cache"  # On-disk cache of backtest LSTM forecasts
+PREDICTION_CACHE_MAX_MB = 500  # Least recently used cache files are removed beyond this size
+
+# Analysis Stage Configuration
+ANALYSIS_QUEUE_SIZE = 100  # Closed candles waiting per symbol before a backlog warning (none are dropped)
+ANALYSIS_MAX_WORKERS = 3  # Threads shared by the LSTM, indicator and Monte Carlo analyzers
+ANALYSIS_DEADLINES = {  # Seconds each analyzer may take per candle before its result is skipped
+    'lstm': 20.0,
+    'indicators': 5.0,
+    'monte_carlo': 10.0
+}
+LAZY_SIGNAL_EVALUATION = False  # Run analyzers one at a time, cheapest first, skipping those that cannot lift the score over the buy threshold (slower than the concurrent fan-out while Monte Carlo always runs)
+
+# Justification Configuration
+JUSTIFICATION_TIMEOUT_SECONDS = 20.0  # Seconds to wait for Gemini before sending the template justification
+JUSTIFICATION_MAX_WORKERS = 1  # Concurrent Gemini requests (later orders queue and time out into the template)
+JUSTIFICATION_CACHE_FILE = "justification_cache.json"  # Justifications reused across restarts for similar signal setups
+JUSTIFICATION_CACHE_MAX_ENTRIES = 500  # Cached justifications kept before the least recently used are dropped
+JUSTIFICATION_CACHE_TTL_SECONDS = 6 * 60 * 60  # Age after which a cached justification is regenerated
+JUSTIFICATION_STRENGTH_STEP = 0.25  # LSTM trend strength bucket width in the cache fingerprint
+JUSTIFICATION_RISK_REWARD_STEP = 0.5  # Risk/reward ratio bucket width in the cache fingerprint
+JUSTIFICATION_RATE_LIMIT_COOLDOWN = 60  # Seconds to use templates only after Gemini reports a rate limit
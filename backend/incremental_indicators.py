@@ -0,0 +1,298 @@
+"""
+Incremental technical indicators for the live trading loop.
+
+The engine keeps the running state behind RSI, MACD and Bollinger Bands so
+each closed candle is folded in with constant work, instead of rebuilding a
+DataFrame and rerunning pandas_ta over the whole history. The recurrences
+mirror the pandas_ta definitions (Wilder RSI via ewm, SMA-seeded EMAs,
+population-std Bollinger Bands) so values match the previous full recompute.
+
+Check parity against pandas_ta on a synthetic candle series, or on recorded CSVs:
+    python incremental_indicators.py check
+    python incremental_indicators.py check --file ../processed_btc.csv
+"""
+import argparse
+import math
+from collections import deque
+
+from config import RSI_PERIOD, MACD_FAST, MACD_SLOW, MACD_SIGNAL, BB_PERIOD, BB_STD
+
+INDICATOR_COLUMNS = ['rsi', 'macd', 'macd_signal', 'upper_band', 'lower_band']
+
+
+class EwmState:
+    """Running exponentially weighted mean using the same recurrence as pandas ewm().mean()"""
+    def __init__(self, alpha, adjust, min_periods=0):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = min_periods
+        self.old_wt_factor = 1.0 - alpha
+        self.new_wt = 1.0 if adjust else alpha
+        self.old_wt = 1.0
+        self.weighted = None
+        self.nobs = 0
+
+    def update(self, value):
+        """Fold in one observation and return the current mean (None until min_periods is reached)"""
+        self.nobs += 1
+        if self.weighted is None:
+            self.weighted = value
+        else:
+            self.old_wt *= self.old_wt_factor
+            if self.weighted != value:
+                self.weighted = ((self.old_wt * self.weighted) + (self.new_wt * value)) / (self.old_wt + self.new_wt)
+            if self.adjust:
+                self.old_wt += self.new_wt
+            else:
+                self.old_wt = 1.0
+
+        if self.nobs < max(self.min_periods, 1):
+            return None
+        return self.weighted
+
+
+class EmaState:
+    """SMA-seeded EMA matching pandas_ta.ema (sma=True, adjust=False)"""
+    def __init__(self, length):
+        self.length = length
+        self.seed_values = []
+        self.ewm = EwmState(alpha=2.0 / (length + 1.0), adjust=False)
+
+    def update(self, value):
+        if self.ewm.weighted is None:
+            self.seed_values.append(value)
+            if len(self.seed_values) < self.length:
+                return None
+            seed = sum(self.seed_values) / self.length
+            self.seed_values = []
+            return self.ewm.update(seed)
+        return self.ewm.update(value)
+
+
+class RollingMoments:
+    """Fixed-length rolling mean and variance updated by adding and removing single values"""
+    def __init__(self, length, ddof=0):
+        self.length = length
+        self.ddof = ddof
+        self.window = deque()
+        self.mean = 0.0
+        self.ssqdm = 0.0
+        self.anchor_countdown = length
+
+    def _add(self, value):
+        nobs = len(self.window)
+        prev_mean = self.mean
+        self.mean += (value - prev_mean) / nobs
+        self.ssqdm += (value - prev_mean) * (value - self.mean)
+
+    def _remove(self, value):
+        nobs = len(self.window)
+        if nobs == 0:
+            self.mean = 0.0
+            self.ssqdm = 0.0
+            return
+        prev_mean = self.mean
+        self.mean -= (value - prev_mean) / nobs
+        self.ssqdm -= (value - prev_mean) * (value - self.mean)
+
+    def update(self, value):
+        """Push a value and return (mean, variance) once the window is full, otherwise (None, None)"""
+        self.window.append(value)
+        self._add(value)
+        if len(self.window) > self.length:
+            self._remove(self.window.popleft())
+
+        if len(self.window) < self.length:
+            return None, None
+
+        # Re-anchor on a full pass through the window so add/remove rounding cannot drift
+        self.anchor_countdown -= 1
+        if self.anchor_countdown <= 0:
+            self.anchor_countdown = self.length
+            self.mean = sum(self.window) / self.length
+            self.ssqdm = sum((v - self.mean) ** 2 for v in self.window)
+
+        variance = max(self.ssqdm / (self.length - self.ddof), 0.0)
+        return self.mean, variance
+
+
+class IncrementalIndicators:
+    """
+    Stateful RSI / MACD / Bollinger Bands engine.
+
+    seed() warms the state from a batch of historical candles (the REST warmup),
+    update() folds in one closed candle. Both return candle dicts carrying the
+    same indicator columns calculate_indicators used to add.
+    """
+    def __init__(self, rsi_period=RSI_PERIOD, macd_fast=MACD_FAST, macd_slow=MACD_SLOW,
+                 macd_signal=MACD_SIGNAL, bb_period=BB_PERIOD, bb_std=BB_STD):
+        self.rsi_period = rsi_period
+        self.macd_fast = macd_fast
+        self.macd_slow = macd_slow
+        self.macd_signal = macd_signal
+        self.bb_period = bb_period
+        self.bb_std = float(bb_std)
+        self.reset()
+
+    def reset(self):
+        """Drop all indicator state"""
+        self.last_close = None
+        self.avg_gain = EwmState(alpha=1.0 / self.rsi_period, adjust=True, min_periods=self.rsi_period)
+        self.avg_loss = EwmState(alpha=1.0 / self.rsi_period, adjust=True, min_periods=self.rsi_period)
+        self.fast_ema = EmaState(self.macd_fast)
+        self.slow_ema = EmaState(self.macd_slow)
+        self.signal_ema = EmaState(self.macd_signal)
+        self.bands = RollingMoments(self.bb_period, ddof=0)
+        self.candles_seen = 0
+
+    def _update_rsi(self, close):
+        if self.last_close is None:
+            return None
+
+        change = close - self.last_close
+        gain = self.avg_gain.update(change if change > 0 else 0.0)
+        loss = self.avg_loss.update(change if change < 0 else 0.0)
+
+        if gain is None or loss is None:
+            return None
+        denominator = gain + abs(loss)
+        if denominator == 0:
+            return None
+        return 100.0 * gain / denominator
+
+    def _update_macd(self, close):
+        fast = self.fast_ema.update(close)
+        slow = self.slow_ema.update(close)
+
+        if fast is None or slow is None:
+            return None, None
+
+        macd = fast - slow
+        signal = self.signal_ema.update(macd)
+        return macd, signal
+
+    def _update_bands(self, close):
+        mid, variance = self.bands.update(close)
+        if mid is None:
+            return None, None
+
+        deviation = self.bb_std * math.sqrt(variance)
+        return mid + deviation, mid - deviation
+
+    def update(self, candle):
+        """Fold one closed candle into the state and return it with indicator columns added"""
+        close = float(candle['close'])
+
+        rsi = self._update_rsi(close)
+        macd, macd_signal = self._update_macd(close)
+        upper_band, lower_band = self._update_bands(close)
+
+        self.last_close = close
+        self.candles_seen += 1
+
+        enriched = dict(candle)
+        enriched['rsi'] = rsi
+        enriched['macd'] = macd
+        enriched['macd_signal'] = macd_signal
+        enriched['upper_band'] = upper_band
+        enriched['lower_band'] = lower_band
+        return enriched
+
+    def seed(self, candles):
+        """Reset the state and warm it up from historical candles, returning them with indicators"""
+        self.reset()
+        return [self.update(candle) for candle in candles]
+
+
+def _pandas_ta_reference(df, engine):
+    """Full pandas_ta recompute, as calculate_indicators in main.py used to do it"""
+    import pandas_ta as ta
+
+    reference = df[['close']].copy()
+    reference['rsi'] = ta.rsi(df['close'], length=engine.rsi_period)
+
+    macd = ta.macd(df['close'], fast=engine.macd_fast, slow=engine.macd_slow, signal=engine.macd_signal)
+    reference['macd'] = macd.iloc[:, 0]
+    reference['macd_signal'] = macd.iloc[:, 2]
+
+    bbands = ta.bbands(df['close'], length=engine.bb_period, std=engine.bb_std)
+    reference['upper_band'] = bbands.filter(like='BBU').iloc[:, 0]
+    reference['lower_band'] = bbands.filter(like='BBL').iloc[:, 0]
+
+    return reference
+
+
+def synthetic_candles(num_candles=5000, seed=42, start_price=60000.0, volatility=0.002):
+    """Random-walk OHLCV candles standing in for a recorded market feed"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0, volatility, num_candles)))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    spread = np.abs(rng.normal(0.0, volatility / 2, num_candles)) * close
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.gamma(2.0, 5.0, num_candles)
+    })
+
+
+def check_parity(df, label, tolerance=1e-8):
+    """Compare the incremental engine with pandas_ta on a candle DataFrame and print the deviations"""
+    import numpy as np
+    import pandas as pd
+
+    df = df.rename(columns={'Close': 'close'})
+
+    engine = IncrementalIndicators()
+    incremental = pd.DataFrame(engine.seed(df[['close']].to_dict('records')))
+    reference = _pandas_ta_reference(df, engine)
+
+    print(f"Parity check on {label} ({len(df)} candles)")
+    passed = True
+    for column in INDICATOR_COLUMNS:
+        ours = incremental[column].astype(float).to_numpy()
+        theirs = reference[column].astype(float).to_numpy()
+
+        nan_mismatch = int(np.sum(np.isnan(ours) != np.isnan(theirs)))
+        both = ~np.isnan(ours) & ~np.isnan(theirs)
+        abs_diff = np.abs(ours[both] - theirs[both])
+        max_abs = float(abs_diff.max()) if abs_diff.size else 0.0
+        max_rel = float((abs_diff / np.maximum(np.abs(theirs[both]), 1e-12)).max()) if abs_diff.size else 0.0
+
+        ok = nan_mismatch == 0 and max_rel <= tolerance
+        passed = passed and ok
+        print(f"- {column:<12} max abs diff: {max_abs:.3e}  max rel diff: {max_rel:.3e}  "
+              f"warmup mismatches: {nan_mismatch}  {'OK' if ok else 'FAIL'}")
+
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check incremental indicators against pandas_ta')
+    parser.add_argument('command', nargs='?', choices=['check'], default='check',
+                        help='check: parity with a full pandas_ta recompute')
+    parser.add_argument('--file', type=str, nargs='+', default=[],
+                        help='Candle CSV files with a Close/close column (a synthetic series when omitted)')
+    parser.add_argument('--candles', type=int, default=5000, help='Length of the synthetic series')
+    parser.add_argument('--seed', type=int, default=42, help='Seed of the synthetic series')
+    parser.add_argument('--tolerance', type=float, default=1e-8,
+                        help='Maximum relative difference allowed')
+    args = parser.parse_args()
+
+    try:
+        import pandas_ta  # noqa: F401
+    except ImportError:
+        print("pandas_ta is not installed; skipping the parity check (pip install pandas_ta to run it)")
+        raise SystemExit(0)
+
+    if args.file:
+        import pandas as pd
+        results = [check_parity(pd.read_csv(path), path, args.tolerance) for path in args.file]
+    else:
+        results = [check_parity(synthetic_candles(args.candles, args.seed),
+                                f"a synthetic series (seed {args.seed})", args.tolerance)]
+    raise SystemExit(0 if all(results) else 1)
@@ -0,0 +1,146 @@
+"""
+Cache of Gemini trade justifications keyed on a quantized signal fingerprint.
+
+Most candles produce nearly the same setup: the same LSTM/RSI/EMA/Monte Carlo
+signals and a similar risk/reward ratio. The fingerprint keeps only those
+labels plus bucketed trend strength and risk/reward, so similar setups share
+one justification instead of paying an LLM round trip each time.
+
+Entries expire after a TTL, the least recently used ones are dropped past
+max_entries, and the cache is written to a JSON file so it survives restarts.
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import (JUSTIFICATION_CACHE_FILE, JUSTIFICATION_CACHE_MAX_ENTRIES, JUSTIFICATION_CACHE_TTL_SECONDS,
+                    JUSTIFICATION_STRENGTH_STEP, JUSTIFICATION_RISK_REWARD_STEP)
+
+
+def _bucket(value, step):
+    if value is None or step <= 0:
+        return value
+    try:
+        return math.floor(float(value) / step) * step
+    except (TypeError, ValueError):
+        return None
+
+
+class JustificationCache:
+    """LRU + TTL map from signal fingerprints to justification text, persisted as JSON"""
+    def __init__(self, path, max_entries=500, ttl_seconds=6 * 3600, strength_step=0.25, risk_reward_step=0.5):
+        """
+        Parameters:
+        path: JSON file the cache is loaded from and saved to (None keeps it in memory only)
+        max_entries: Entries kept before the least recently used are evicted
+        ttl_seconds: Age after which an entry is no longer served
+        strength_step: Bucket width for the LSTM trend strength in the fingerprint
+        risk_reward_step: Bucket width for the order's risk/reward ratio in the fingerprint
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.strength_step = strength_step
+        self.risk_reward_step = risk_reward_step
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def fingerprint(self, lstm_data, indicator_data, monte_carlo_data, order_data):
+        """Quantized signal tuple for a decision, as a string key"""
+        risk_reward = None
+        if order_data and order_data.get("price") != order_data.get("stopLoss"):
+            risk_reward = ((order_data.get("takeProfit") - order_data.get("price")) /
+                           (order_data.get("price") - order_data.get("stopLoss")))
+
+        parts = (
+            "BUY" if order_data else "NO TRADE",
+            lstm_data.get("signal"),
+            lstm_data.get("trend"),
+            _bucket(lstm_data.get("trend_strength"), self.strength_step),
+            indicator_data.get("rsi_signal"),
+            indicator_data.get("ema_signal"),
+            monte_carlo_data.get("signal"),
+            _bucket(risk_reward, self.risk_reward_step)
+        )
+        return "|".join(str(part) for part in parts)
+
+    def _expired(self, entry, now):
+        return now - entry['created'] > self.ttl_seconds
+
+    def get(self, key):
+        """Cached text for a fingerprint, or None when missing or expired"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            entry['last_used'] = now
+            self.hits += 1
+            return entry['text']
+
+    def put(self, key, text):
+        with self.lock:
+            now = time.time()
+            self.entries[key] = {'text': text, 'created': now, 'last_used': now}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._save()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable justification cache {self.path}: {e}")
+            return
+
+        now = time.time()
+        entries = [(key, entry) for key, entry in stored.items() if not self._expired(entry, now)]
+        for key, entry in sorted(entries, key=lambda item: item[1]['last_used'])[-self.max_entries:]:
+            self.entries[key] = entry
+        print(f"Loaded {len(self.entries)} cached justifications from {self.path}")
+
+    def _save(self):
+        if not self.path:
+            return
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"Error saving justification cache: {e}")
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self._save()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.entries)
+        }
+
+
+justification_cache = JustificationCache(JUSTIFICATION_CACHE_FILE, JUSTIFICATION_CACHE_MAX_ENTRIES,
+                                         JUSTIFICATION_CACHE_TTL_SECONDS, JUSTIFICATION_STRENGTH_STEP,
+                                         JUSTIFICATION_RISK_REWARD_STEP)
@@ -0,0 +1,167 @@
+"""
+Background generation of trade justifications.
+
+The Gemini request used to run inside generate_order, so a limit order was
+only submitted seconds after the price it was computed at. The order path now
+returns and executes immediately and hands the justification to this worker.
+Each job gets the LLM text if it arrives within the timeout and otherwise a
+template built from the same analysis values, so every order gets exactly one
+justification and callers never wait on the API.
+
+With a JustificationCache, setups that match a cached fingerprint are
+answered from the cache without an API call. After a rate-limit error the
+worker skips the API for a cooldown period and sends templates straight away.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def is_rate_limit_error(error):
+    """True for Gemini quota errors (HTTP 429 / ResourceExhausted)"""
+    text = f"{type(error).__name__} {error}"
+    return "429" in text or "ResourceExhausted" in text or "quota" in text.lower()
+
+
+class JustificationWorker:
+    """Runs a justification generator off the order path with a timeout and a fallback"""
+    def __init__(self, generate, fallback, timeout, max_workers=1, cache=None, rate_limit_cooldown=60):
+        """
+        Parameters:
+        generate: function(lstm_data, indicator_data, monte_carlo_data, order) returning the justification text
+        fallback: Function with the same arguments used when generate fails or misses the timeout
+        timeout: Seconds allowed from submit until the fallback is used
+        max_workers: Concurrent generate calls
+        cache: Optional JustificationCache consulted before generate and filled with its results
+        rate_limit_cooldown: Seconds to skip generate after a rate-limit error
+        """
+        self.generate = generate
+        self.fallback = fallback
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="justification")
+        self.cooldown_until = 0.0
+        self.generated = 0
+        self.cached = 0
+        self.fallbacks = 0
+        self.api_calls = 0
+        self.api_errors = 0
+        self.rate_limited = 0
+        self.latencies = deque(maxlen=200)
+
+    def _call_api(self, key, args):
+        """Run generate, record its latency and keep its text in the cache (even if it arrives late)"""
+        # Jobs queued before a rate-limit error must not hit the API either
+        if time.time() < self.cooldown_until:
+            raise RuntimeError("Gemini rate-limit cooldown")
+
+        self.api_calls += 1
+        start = time.perf_counter()
+        try:
+            text = self.generate(*args)
+        except Exception as e:
+            self.api_errors += 1
+            if is_rate_limit_error(e):
+                self.rate_limited += 1
+                self.cooldown_until = time.time() + self.rate_limit_cooldown
+                print(f"Gemini rate limit hit. Using template justifications for {self.rate_limit_cooldown}s")
+            raise
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+        if self.cache is not None and key is not None:
+            self.cache.put(key, text)
+        return text
+
+    def _fallback_text(self, args):
+        try:
+            return self.fallback(*args)
+        except Exception as e:
+            return f"Justification unavailable: {e}"
+
+    @staticmethod
+    def _notify(on_ready, text, source):
+        try:
+            on_ready(text, source)
+        except Exception as e:
+            print(f"Error delivering justification: {e}")
+
+    def submit(self, lstm_data, indicator_data, monte_carlo_data, order, on_ready):
+        """
+        Start generating a justification and return immediately.
+
+        on_ready(text, source) is called exactly once with source 'cache',
+        'llm' or 'template'; cache hits and cooldown templates are delivered
+        from the calling thread, everything else from a worker or timer thread.
+        """
+        args = (lstm_data, indicator_data, monte_carlo_data, order)
+
+        key = None
+        if self.cache is not None and all([lstm_data, indicator_data, monte_carlo_data]):
+            key = self.cache.fingerprint(*args)
+            text = self.cache.get(key)
+            if text is not None:
+                self.cached += 1
+                self._notify(on_ready, text, 'cache')
+                return
+
+        if time.time() < self.cooldown_until:
+            self.fallbacks += 1
+            self._notify(on_ready, self._fallback_text(args), 'template')
+            return
+
+        lock = threading.Lock()
+        delivered = []
+
+        def deliver(text, source):
+            with lock:
+                if delivered:
+                    return
+                delivered.append(source)
+            timer.cancel()
+            if source == 'llm':
+                self.generated += 1
+            else:
+                self.fallbacks += 1
+            self._notify(on_ready, text, source)
+
+        def use_fallback(reason):
+            print(f"Using template justification ({reason})")
+            deliver(self._fallback_text(args), 'template')
+
+        def on_done(future):
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                use_fallback(f"generation failed: {error}")
+            else:
+                deliver(future.result(), 'llm')
+
+        timer = threading.Timer(self.timeout, use_fallback, args=(f"no response within {self.timeout:.0f}s",))
+        timer.daemon = True
+        timer.start()
+        self.executor.submit(self._call_api, key, args).add_done_callback(on_done)
+
+    def stats(self):
+        latencies = np.array(self.latencies)
+        stats = {
+            'generated': self.generated,
+            'cached': self.cached,
+            'fallbacks': self.fallbacks,
+            'api_calls': self.api_calls,
+            'api_errors': self.api_errors,
+            'rate_limited': self.rate_limited,
+            'api_latency_p50': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'api_latency_p95': float(np.percentile(latencies, 95)) if len(latencies) else None
+        }
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+        return stats
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,251 @@
+"""
+Inference backends for the LSTM models.
+
+On CPU-only hosts a single 60x9 window through model.predict is dominated by
+Keras overhead, so get_lstm_output runs through a small backend interface
+instead of a raw Keras model. Three backends are available:
+
+- keras:  the original .h5 model through tf.keras (default)
+- tflite: a converted .tflite flatbuffer through the TFLite interpreter
+- onnx:   a converted .onnx graph through ONNX Runtime's CPU provider
+
+Converted files sit next to the .h5 model with the same name and a
+.tflite / .onnx extension. The command line covers exporting, checking
+numeric parity against Keras and benchmarking single-window latency:
+
+    python lstm_backends.py export --model-dir models/BTC1min_I60_O10
+    python lstm_backends.py parity --model-dir models/BTC1min_I60_O10
+    python lstm_backends.py bench --model-dir models/BTC1min_I60_O10 --runs 500
+"""
+import argparse
+import glob
+import os
+import threading
+import time
+
+import numpy as np
+
+BACKEND_EXTENSIONS = {
+    'keras': '.h5',
+    'tflite': '.tflite',
+    'onnx': '.onnx'
+}
+
+
+def backend_model_path(model_path, backend):
+    """Path of the model file a backend loads, derived from the .h5 model path"""
+    if backend not in BACKEND_EXTENSIONS:
+        raise ValueError(f"Unknown LSTM backend '{backend}'. Choose from: {', '.join(BACKEND_EXTENSIONS)}")
+    stem, _ = os.path.splitext(model_path)
+    return stem + BACKEND_EXTENSIONS[backend]
+
+
+class KerasBackend:
+    """The original tf.keras model"""
+    name = 'keras'
+
+    def __init__(self, model_path):
+        import tensorflow as tf
+        self.model = tf.keras.models.load_model(model_path)
+        self.input_shape = tuple(self.model.input_shape)
+
+    def predict(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+
+class TFLiteBackend:
+    """A converted .tflite model run through the TFLite interpreter"""
+    name = 'tflite'
+
+    def __init__(self, model_path):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path)
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.input_shape = tuple(self.interpreter.get_input_details()[0]['shape'])
+        self.batch_size = self.input_shape[0]
+        # The interpreter holds per-invocation state, so calls are serialized
+        self.lock = threading.Lock()
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        with self.lock:
+            if batch.shape[0] == self.batch_size:
+                return self._invoke(batch)
+            # The fused LSTM kernels are built for a fixed batch size, so larger
+            # batches are fed through in slices of that size
+            return np.concatenate([self._invoke(batch[i:i + self.batch_size])
+                                   for i in range(0, batch.shape[0], self.batch_size)])
+
+    def _invoke(self, batch):
+        self.interpreter.set_tensor(self.input_index, batch)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index).copy()
+
+
+class OnnxBackend:
+    """A converted .onnx model run through ONNX Runtime on CPU"""
+    name = 'onnx'
+
+    def __init__(self, model_path):
+        import onnxruntime as ort
+        self.session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_shape = tuple(dim if isinstance(dim, int) else None for dim in model_input.shape)
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+BACKENDS = {
+    'keras': KerasBackend,
+    'tflite': TFLiteBackend,
+    'onnx': OnnxBackend
+}
+
+
+def load_backend(model_path, backend='keras'):
+    """Load the given backend for an .h5 model path (using the converted file for tflite/onnx)"""
+    path = backend_model_path(model_path, backend)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found. Run 'python lstm_backends.py export' to create it.")
+    return BACKENDS[backend](path)
+
+
+def export_model(model_path, formats=('tflite', 'onnx')):
+    """Convert an .h5 model to the requested formats and return the written paths"""
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    written = []
+
+    if 'tflite' in formats:
+        # A fixed batch of one lets the converter fuse the LSTM layers into builtin kernels
+        single_input = tf.keras.Input(batch_shape=(1,) + tuple(model.input_shape[1:]))
+        converter = tf.lite.TFLiteConverter.from_keras_model(tf.keras.Model(single_input, model(single_input)))
+        # Fall back to TF ops for any pieces that have no builtin TFLite kernel
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS,
+            tf.lite.OpsSet.SELECT_TF_OPS
+        ]
+        tflite_path = backend_model_path(model_path, 'tflite')
+        with open(tflite_path, 'wb') as f:
+            f.write(converter.convert())
+        written.append(tflite_path)
+
+    if 'onnx' in formats:
+        try:
+            import tf2onnx
+        except ImportError:
+            print("tf2onnx is not installed (pip install tf2onnx). Skipping ONNX export.")
+        else:
+            onnx_path = backend_model_path(model_path, 'onnx')
+            input_signature = [tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name='input')]
+            tf2onnx.convert.from_keras(model, input_signature=input_signature, opset=13, output_path=onnx_path)
+            written.append(onnx_path)
+
+    return written
+
+
+def _find_models(model_dir):
+    return sorted(glob.glob(os.path.join(model_dir, '**', '*.h5'), recursive=True))
+
+
+def _sample_windows(backend, count, seed=42):
+    """Random windows in the scaled feature space the models were trained on"""
+    _, timesteps, features = backend.input_shape
+    rng = np.random.default_rng(seed)
+    return rng.random((count, timesteps, features), dtype=np.float32)
+
+
+def _available_backends(model_path, names):
+    backends = {}
+    for name in names:
+        try:
+            backends[name] = load_backend(model_path, name)
+        except Exception as e:
+            print(f"- {name}: unavailable ({e})")
+    return backends
+
+
+def check_parity(model_path, backends=('tflite', 'onnx'), windows=64, tolerance=1e-4):
+    """Compare each backend's predictions with Keras on the same windows"""
+    reference = load_backend(model_path, 'keras')
+    batch = _sample_windows(reference, windows)
+    expected = reference.predict(batch).reshape(windows, -1)
+
+    print(f"Parity check for {model_path} on {windows} windows (tolerance {tolerance})")
+    passed = True
+    for name, backend in _available_backends(model_path, backends).items():
+        actual = np.concatenate([backend.predict(batch[i:i + 1]) for i in range(windows)]).reshape(windows, -1)
+        max_diff = float(np.max(np.abs(actual - expected)))
+        ok = max_diff <= tolerance
+        passed = passed and ok
+        print(f"- {name}: max abs diff vs keras {max_diff:.2e} {'OK' if ok else 'FAIL'}")
+
+    return passed
+
+
+def benchmark(model_path, backends=('keras', 'tflite', 'onnx'), runs=200, warmup=10):
+    """Report p50/p99 single-window latency for each available backend"""
+    print(f"Single-window latency for {model_path} ({runs} runs)")
+    results = {}
+    for name, backend in _available_backends(model_path, backends).items():
+        window = _sample_windows(backend, 1)
+        for _ in range(warmup):
+            backend.predict(window)
+
+        timings = np.empty(runs)
+        for i in range(runs):
+            start = time.perf_counter()
+            backend.predict(window)
+            timings[i] = (time.perf_counter() - start) * 1000
+
+        results[name] = {
+            'p50_ms': float(np.percentile(timings, 50)),
+            'p99_ms': float(np.percentile(timings, 99))
+        }
+        print(f"- {name:<6} p50: {results[name]['p50_ms']:.3f} ms  p99: {results[name]['p99_ms']:.3f} ms")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export, verify and benchmark LSTM inference backends')
+    parser.add_argument('command', choices=['export', 'parity', 'bench'])
+    parser.add_argument('--model-dir', type=str, default='models',
+                        help='Directory searched (recursively) for .h5 models')
+    parser.add_argument('--formats', type=str, nargs='+', default=['tflite', 'onnx'],
+                        help='Backends to export or compare against keras')
+    parser.add_argument('--runs', type=int, default=200, help='Timed predictions per backend for bench')
+    parser.add_argument('--tolerance', type=float, default=1e-4, help='Maximum abs difference for parity')
+    args = parser.parse_args()
+
+    model_paths = _find_models(args.model_dir)
+    if not model_paths:
+        print(f"No .h5 models found under {args.model_dir}")
+        return 1
+
+    failed = False
+    for model_path in model_paths:
+        if args.command == 'export':
+            for path in export_model(model_path, args.formats):
+                print(f"Exported {path}")
+        elif args.command == 'parity':
+            failed = not check_parity(model_path, args.formats, tolerance=args.tolerance) or failed
+        else:
+            benchmark(model_path, ['keras'] + [name for name in args.formats if name != 'keras'], runs=args.runs)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
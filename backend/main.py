@@ -2,17 +2,25 @@ import websocket
 import json
 import requests
 import time
-import pandas as pd
-import numpy as np
-import pandas_ta as ta
-from collections import deque
+from collections import OrderedDict
 import os
 from dotenv import load_dotenv
 from my_lstm import get_lstm_output
 from my_indicator import get_indicator_data
 from my_monte_carlo import get_monte_carlo_data
+from mc_rng_pool import normal_pool
 from my_order_manager import generate_order
+from my_justification import get_justification, template_justification
+from justification_worker import JustificationWorker
+from justification_cache import justification_cache
 from binance_client import BinanceTestnetClient
+from market_streams import PriceStream, UserDataStream
+from account_ledger import AccountLedger
+from rate_limiter import shared_limiter
+from trigger_book import TriggerBook, TAKE_PROFIT, STOP_LOSS
+from incremental_indicators import IncrementalIndicators
+from candle_buffer import CandleRingBuffer
+from analysis_pipeline import AnalysisStage, CandleAnalysisWorker
 from trade_tracker import log_trade, generate_performance_summary, initialize_csv
 import math
 import threading
@@ -25,20 +33,64 @@ import threading
 from config import *
 
 # Initialize Binance Testnet client
-client = BinanceTestnetClient(API_KEY, API_SECRET)
+client = BinanceTestnetClient(API_KEY, API_SECRET, pool_maxsize=HTTP_POOL_MAXSIZE,
+                              connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                              get_retries=HTTP_GET_RETRIES, retry_backoff=HTTP_RETRY_BACKOFF,
+                              rules_refresh_seconds=SYMBOL_RULES_REFRESH_SECONDS,
+                              rate_limiter=shared_limiter(RATE_LIMIT_RESERVES, RATE_LIMIT_MAX_WAITS))
 
 # Global variables to store data
-candles = deque(maxlen=MAX_CANDLES)
-historical_data = []  # Stores a longer history for calculating indicators
+historical_data = CandleRingBuffer(MAX_HISTORICAL_DATA)  # Stores a longer history for calculating indicators
+candles = historical_data.window(MAX_CANDLES)  # View over the newest MAX_CANDLES rows of historical_data
+indicator_engine = IncrementalIndicators()  # Running RSI/MACD/BB state, updated once per closed candle
+
+# Runs the three analyzers concurrently for each closed candle
+analysis_stage = AnalysisStage(
+    analyzers={
+        'lstm': get_lstm_output,
+        'indicators': get_indicator_data,
+        'monte_carlo': get_monte_carlo_data
+    },
+    max_workers=ANALYSIS_MAX_WORKERS,
+    deadlines=ANALYSIS_DEADLINES
+)
+
+# Generates trade justifications off the order path (template text if Gemini is slow or failing)
+justification_worker = JustificationWorker(
+    get_justification,
+    template_justification,
+    timeout=JUSTIFICATION_TIMEOUT_SECONDS,
+    max_workers=JUSTIFICATION_MAX_WORKERS,
+    cache=justification_cache,
+    rate_limit_cooldown=JUSTIFICATION_RATE_LIMIT_COOLDOWN
+)
+JUSTIFICATION_PENDING = "Justification is being generated..."
+
+# Pushed prices and fill events for the trade monitor (REST polling only while a stream is stale)
+price_stream = PriceStream(MARKET_STREAM_URL, TRADING_SYMBOL, PRICE_STREAM_TYPE, PRICE_STREAM_STALE_SECONDS)
+user_stream = UserDataStream(client, USER_STREAM_URL, LISTEN_KEY_KEEPALIVE_SECONDS)
+
+# Balances from one startup snapshot plus account events; funds checks read it instead of /v3/account
+account_ledger = AccountLedger(client.get_account_info, ACCOUNT_RECONCILE_SECONDS, ACCOUNT_DRIFT_TOLERANCE)
+if USE_EXCHANGE_STREAMS:
+    account_ledger.attach(user_stream)
 
 # Active trades tracking
-active_trades = []
+active_trades = {}  # order_id -> trade record
+pending_entries = {}  # order_id -> trade whose entry order has not filled yet
+trigger_book = TriggerBook()  # Filled trades indexed by take-profit and stop-loss price
+exit_retries = {}  # order_id -> (monotonic time, trade) for exits whose market sell failed
+exit_brackets = {}  # order_id -> trade protected by an exchange-side OCO (EXIT_MODE "oco")
+bracket_legs = {}  # OCO leg order id -> order_id of the trade it closes
+unmatched_reports = OrderedDict()  # order id -> newest executionReport received before the order was tracked
+trades_lock = threading.RLock()  # Shared by the user stream thread and the threads that add or settle trades
 trade_monitor_running = False
 trade_monitor_thread = None
 
 # WebSocket server configuration
 connected_clients = set()
 websocket_server_running = False
+latest_analysis_timestamp = None  # Timestamp of the newest analysis payload sent to dashboard clients
 
 async def handle_client_connection(websocket, path):
     global connected_clients
@@ -90,15 +142,23 @@ def start_websocket_server():
     ws_thread.start()
     print("WebSocket server thread started")
 
-def send_analysis_data(lstm_data, indicator_data, monte_carlo_data, order):
+def send_analysis_data(lstm_data, indicator_data, monte_carlo_data, order, decision_factors=None):
+    global latest_analysis_timestamp
     analysis_data = {
         'timestamp': int(time.time() * 1000),
         'lstm': lstm_data,
         'indicators': indicator_data,
         'monte_carlo': monte_carlo_data,
-        'order': order
+        'order': order,
+        'decision_factors': decision_factors,
+        'rate_limits': client.rate_limiter.usage()
     }
+    latest_analysis_timestamp = analysis_data['timestamp']
     
+    broadcast_analysis(analysis_data)
+    return analysis_data
+
+def broadcast_analysis(analysis_data):
     def broadcast():
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
@@ -106,31 +166,38 @@ def send_analysis_data(lstm_data, indicator_data, monte_carlo_data, order):
     
     threading.Thread(target=broadcast, daemon=True).start()
 
-def calculate_indicators(candle_data):
-    df = pd.DataFrame(candle_data)
-    
-    if len(df) == 0:
-        return []
-    
-    df['rsi'] = ta.rsi(df['close'], length=RSI_PERIOD)
+def attach_justification(analysis_data, order_id, justification, source):
+    """Store a finished justification on the trade record and push the completed analysis to the dashboard"""
+    print("\n============ TRADE JUSTIFICATION ============")
+    print(f"Order ID: {order_id} (source: {source})")
+    print(justification)
     
-    macd = ta.macd(df['close'], fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL)
-    df['macd'] = macd[f'MACD_{MACD_FAST}_{MACD_SLOW}_{MACD_SIGNAL}']
-    df['macd_signal'] = macd[f'MACDs_{MACD_FAST}_{MACD_SLOW}_{MACD_SIGNAL}']
+    stats = justification_worker.stats()
+    cache_stats = stats.get('cache', {})
+    latency = f"{stats['api_latency_p50']:.2f}s" if stats['api_latency_p50'] is not None else "n/a"
+    print(f"Justifications: {stats['generated']} generated, {stats['cached']} cached, {stats['fallbacks']} templates | "
+          f"cache hit rate {cache_stats.get('hit_rate', 0.0):.0%} | {stats['api_calls']} API calls "
+          f"({stats['api_errors']} errors, {stats['rate_limited']} rate limited), p50 latency {latency}")
     
-    bbands = ta.bbands(df['close'], length=BB_PERIOD, std=BB_STD)
-    df['upper_band'] = bbands[f'BBU_{BB_PERIOD}_{BB_STD}.0']
-    df['lower_band'] = bbands[f'BBL_{BB_PERIOD}_{BB_STD}.0']
+    trade = active_trades.get(order_id)
+    if trade is not None:
+        trade['justification'] = justification
+        trade['justification_source'] = source
     
-    df = df.replace({np.nan: None})
+    analysis_data['order']['justification'] = justification
+    analysis_data['order']['justification_source'] = source
+    analysis_data['justification_stats'] = stats
     
-    return df.to_dict('records')
+    # A newer candle's analysis has replaced this one on the dashboard
+    if analysis_data['timestamp'] != latest_analysis_timestamp:
+        return
+    broadcast_analysis(analysis_data)
 
 def get_historical_candles(symbol, interval, limit=500):
     return client.get_historical_candles(symbol, interval, limit)
 
 def get_account_balance(asset="USDT"):
-    balance = client.get_balance(asset)
+    balance = account_ledger.balance(asset)
     print(f"\n============ {asset} BALANCE ============")
     print(f"Free: {balance['free']:.2f} {asset}")
     print(f"Locked: {balance['locked']:.2f} {asset}")
@@ -139,7 +206,7 @@ def get_account_balance(asset="USDT"):
 def initialize_active_trades():
     print("\n============ CHECKING BTC BALANCE ============")
     try:
-        btc_balance = client.get_balance("BTC")
+        btc_balance = account_ledger.balance("BTC")
         btc_free = btc_balance['free']
         btc_locked = btc_balance['locked']
         total_btc = btc_free + btc_locked
@@ -169,144 +236,363 @@ def initialize_active_trades():
     except Exception as e:
         print(f"Error checking BTC balance: {e}")
 
+def add_active_trade(trade):
+    """Track a new trade: pending until its entry fills, then armed in the trigger book"""
+    with trades_lock:
+        active_trades[trade['order_id']] = trade
+        # The stream can report the order before its REST response returns
+        report = unmatched_reports.pop(trade['order_id'], None)
+        if trade.get('confirmed_filled', False) or trade.get('existing_position', False):
+            arm_trade(trade)
+        else:
+            pending_entries[trade['order_id']] = trade
+            if report is not None:
+                apply_entry_report(trade, report)
+
+def arm_trade(trade):
+    """Protect a filled trade with an OCO on the exchange, or watch its take profit and stop loss locally"""
+    order_id = trade['order_id']
+    with trades_lock:
+        # The stream and the monitor's REST poll can both see the fill; only the first one arms the exit
+        if order_id not in active_trades or order_id in exit_brackets or order_id in trigger_book:
+            return
+        trade['confirmed_filled'] = True
+        pending_entries.pop(order_id, None)
+        if EXIT_MODE == "oco" and not trade.get('bracket_failed', False) and place_exit_bracket(trade):
+            return
+        trigger_book.add(order_id, trade['take_profit'], trade['stop_loss'], trade)
+
+def place_exit_bracket(trade):
+    """Place the take profit (limit) and stop loss (stop-limit) as one OCO sell; False if it was rejected"""
+    order_id = trade['order_id']
+    stop_limit_price = trade['stop_loss'] * (1 - OCO_STOP_LIMIT_OFFSET_PERCENT / 100)
+    
+    try:
+        result = client.place_oco_order(
+            symbol=TRADING_SYMBOL,
+            side='SELL',
+            quantity=trade['quantity'],
+            price=trade['take_profit'],
+            stop_price=trade['stop_loss'],
+            stop_limit_price=stop_limit_price
+        )
+    except Exception as e:
+        print(f"Error placing OCO exit for order {order_id}: {e}")
+        result = {}
+    
+    if 'orderListId' not in result or 'code' in result:
+        # e.g. the price already moved past a level while the entry filled; the local monitor handles it
+        trade['bracket_failed'] = True
+        print(f"OCO exit for order {order_id} was not placed. Watching take profit and stop loss locally.")
+        return False
+    
+    trade['oco_order_list_id'] = result['orderListId']
+    trade['exit_order_ids'] = [leg['orderId'] for leg in result.get('orders', [])]
+    for leg_id in trade['exit_order_ids']:
+        bracket_legs[leg_id] = order_id
+    exit_brackets[order_id] = trade
+    
+    print(f"\n============ OCO EXIT PLACED ============")
+    print(f"Order ID: {order_id} - Order list: {trade['oco_order_list_id']} - Legs: {trade['exit_order_ids']}")
+    print(f"Take Profit: ${trade['take_profit']} - Stop: ${trade['stop_loss']} (limit ${stop_limit_price:.2f})")
+    
+    # A leg can fill before the OCO response returns
+    for leg_id in trade['exit_order_ids']:
+        report = unmatched_reports.pop(leg_id, None)
+        if report is not None:
+            on_execution_report(report)
+    return True
+
+def remove_active_trade(order_id):
+    with trades_lock:
+        trade = active_trades.pop(order_id, None)
+        pending_entries.pop(order_id, None)
+        exit_retries.pop(order_id, None)
+        exit_brackets.pop(order_id, None)
+        if trade is not None:
+            for leg_id in trade.get('exit_order_ids', []):
+                bracket_legs.pop(leg_id, None)
+        trigger_book.remove(order_id)
+
+def finish_bracket_exit(trade, order_type, exit_price):
+    """Record a trade closed by one leg of its OCO exit"""
+    order_id = trade['order_id']
+    with trades_lock:
+        # The stream and the REST fallback can both report the fill; only the first one records it
+        if order_id not in exit_brackets:
+            return
+        
+        exit_type = STOP_LOSS if order_type.startswith('STOP_LOSS') else TAKE_PROFIT
+        
+        if exit_type == TAKE_PROFIT:
+            print(f"\n============ TAKE PROFIT FILLED ============")
+        else:
+            print(f"\n============ STOP LOSS FILLED ============")
+        print(f"Order ID: {order_id} - Exit: ${exit_price:.2f} (OCO {trade['oco_order_list_id']})")
+        
+        log_trade(
+            order_id=order_id,
+            symbol=TRADING_SYMBOL,
+            entry_price=trade['entry_price'],
+            exit_price=exit_price,
+            quantity=trade['quantity'],
+            take_profit_price=trade['take_profit'],
+            stop_loss_price=trade['stop_loss'],
+            exit_type=exit_type,
+            entry_time=datetime.fromtimestamp(trade['entry_time'])
+        )
+        
+        remove_active_trade(order_id)
+        print(f"Trade {order_id} removed from monitoring ({'take profit' if exit_type == TAKE_PROFIT else 'stop loss'})")
+
+def average_fill_price(quote_quantity, executed_quantity, fallback):
+    executed_quantity = float(executed_quantity or 0)
+    if executed_quantity > 0:
+        return float(quote_quantity) / executed_quantity
+    return float(fallback)
+
+def check_exit_bracket(trade):
+    """Ask the exchange whether either OCO leg filled (only while fill events are unavailable)"""
+    for leg_id in list(trade.get('exit_order_ids', [])):
+        leg = client.get_order_status(TRADING_SYMBOL, leg_id)
+        if leg.get('status') == 'FILLED':
+            exit_price = average_fill_price(leg.get('cummulativeQuoteQty', 0), leg.get('executedQty'), leg.get('price'))
+            finish_bracket_exit(trade, leg.get('type', ''), exit_price)
+            return
+
+def on_execution_report(event):
+    """Track entry orders and OCO exit legs from the user data stream instead of polling each order"""
+    order_id = event.get('i')
+    status = event.get('X')
+    
+    with trades_lock:
+        bracket_order_id = bracket_legs.get(order_id)
+        if bracket_order_id is not None:
+            # The other leg's cancellation needs nothing: the fill of this one closes the trade
+            trade = exit_brackets.get(bracket_order_id)
+            if trade is not None and status == 'FILLED':
+                exit_price = average_fill_price(event.get('Z', 0), event.get('z'), event.get('L') or event.get('p'))
+                finish_bracket_exit(trade, event.get('o', ''), exit_price)
+            return
+        
+        trade = pending_entries.get(order_id)
+        if trade is None:
+            if order_id not in active_trades:
+                # Possibly an entry whose placement has not returned yet; add_active_trade replays it
+                unmatched_reports[order_id] = event
+                while len(unmatched_reports) > 100:
+                    unmatched_reports.popitem(last=False)
+            return
+        apply_entry_report(trade, event)
+
+def apply_entry_report(trade, event):
+    """Apply an executionReport to a trade whose entry order has not filled yet"""
+    order_id = trade['order_id']
+    status = event.get('X')
+    trade['order_status'] = status
+    if status == 'FILLED':
+        print(f"Order {order_id} is now filled. Monitoring stop loss and take profit.")
+        arm_trade(trade)
+    elif status in ('CANCELED', 'EXPIRED', 'REJECTED') and not trade.get('being_processed', False):
+        remove_active_trade(order_id)
+        print(f"Trade {order_id} removed from monitoring (order {status.lower()} on the exchange)")
+
+user_stream.on('executionReport', on_execution_report)
+
+def check_pending_entry(trade, user_events, log_status):
+    """Arm a trade once its entry order fills, or cancel the entry after 10 minutes"""
+    order_id = trade['order_id']
+    if trade.get('being_processed', False):
+        return
+    
+    if user_events:
+        status = trade.get('order_status')
+    else:
+        order_status = client.get_order_status(TRADING_SYMBOL, order_id)
+        status = order_status.get('status', 'Unknown')
+        trade['order_status'] = status
+    
+    if status == 'FILLED':
+        print(f"Order {order_id} is now filled. Monitoring stop loss and take profit.")
+        arm_trade(trade)
+        return
+    
+    if log_status:
+        print(f"Order {order_id} is not filled yet. Status: {status}")
+    
+    if status == 'NEW':
+        order_age_minutes = (time.time() - trade['entry_time']) / 60
+        
+        if order_age_minutes > 10:
+            print(f"\n============ ORDER EXPIRATION ============")
+            print(f"Order {order_id} has not been filled after {order_age_minutes:.1f} minutes. Cancelling.")
+            
+            trade['being_processed'] = True
+            
+            try:
+                cancel_result = client.cancel_order(
+                    symbol=TRADING_SYMBOL,
+                    order_id=order_id
+                )
+                
+                print(f"Order cancellation result: {cancel_result}")
+                
+                if not 'code' in cancel_result:
+                    remove_active_trade(order_id)
+                    print(f"Trade {order_id} removed from monitoring (expired after 10 minutes)")
+                else:
+                    print(f"Failed to cancel order {order_id}: {cancel_result}")
+                    recheck_entry_after_cancel(trade)
+            except Exception as e:
+                print(f"Error cancelling expired order: {e}")
+                recheck_entry_after_cancel(trade)
+
+def recheck_entry_after_cancel(trade):
+    """Read the entry's status over REST after a failed cancel; it has usually filled in the meantime"""
+    order_id = trade['order_id']
+    try:
+        status = client.get_order_status(TRADING_SYMBOL, order_id).get('status')
+    except Exception as e:
+        print(f"Error checking order {order_id} after the failed cancel: {e}")
+        status = None
+    
+    trade['being_processed'] = False
+    if status is None:
+        return
+    trade['order_status'] = status
+    if status == 'FILLED':
+        print(f"Order {order_id} filled before it could be cancelled. Monitoring stop loss and take profit.")
+        arm_trade(trade)
+    elif status in ('CANCELED', 'EXPIRED', 'REJECTED'):
+        remove_active_trade(order_id)
+        print(f"Trade {order_id} removed from monitoring (order {status.lower()} on the exchange)")
+
+def close_position(trade, exit_type, current_price):
+    """Market-sell a trade whose take profit or stop loss triggered; re-arm it if the sell fails"""
+    order_id = trade['order_id']
+    is_take_profit = exit_type == TAKE_PROFIT
+    
+    if is_take_profit:
+        print(f"\n============ TAKE PROFIT HIT ============")
+        print(f"Order ID: {order_id} - Target: ${trade['take_profit']} - Current: ${current_price}")
+    else:
+        print(f"\n============ STOP LOSS HIT ============")
+        print(f"Order ID: {order_id} - Stop Loss: ${trade['stop_loss']} - Current: ${current_price}")
+    
+    trade['being_processed'] = True
+    
+    try:
+        sell_result = client.place_market_sell_order(
+            symbol=TRADING_SYMBOL,
+            quantity=trade['quantity']
+        )
+        print(f"{'Take profit' if is_take_profit else 'Stop loss'} sell executed: {sell_result}")
+        
+        log_trade(
+            order_id=order_id,
+            symbol=TRADING_SYMBOL,
+            entry_price=trade['entry_price'],
+            exit_price=current_price, 
+            quantity=trade['quantity'],
+            take_profit_price=trade['take_profit'],
+            stop_loss_price=trade['stop_loss'],
+            exit_type=exit_type,
+            entry_time=datetime.fromtimestamp(trade['entry_time'])
+        )
+        
+        if 'orderId' in sell_result and not 'code' in sell_result:
+            remove_active_trade(order_id)
+            print(f"Trade {order_id} removed from monitoring ({'take profit' if is_take_profit else 'stop loss'})")
+            return
+    except Exception as e:
+        print(f"Error executing {'take profit' if is_take_profit else 'stop loss'}: {e}")
+    
+    # Re-armed by the monitor after a second, as the polling loop used to retry
+    with trades_lock:
+        trade['being_processed'] = False
+        exit_retries[order_id] = (time.monotonic() + 1, trade)
+
 def monitor_active_trades():
-    global active_trades, trade_monitor_running
+    global trade_monitor_running
     
     print("\n============ TRADE MONITOR STARTED ============")
     
+    price_seq = 0
+    synced_reconnects = 0
+    last_status_log = 0
+    
     while trade_monitor_running:
         if not active_trades:
             time.sleep(5)
             continue
             
         try:
-            ticker = client.get_symbol_ticker(TRADING_SYMBOL)
-            current_price = float(ticker['price'])
+            # Only locally watched exits need prices; OCO exits and entries are settled by the exchange
+            watching_prices = len(trigger_book) > 0 or bool(exit_retries)
+            current_price = None
+            polled = False
             
-            trades_to_check = active_trades.copy()
+            if not watching_prices:
+                time.sleep(1)
+            elif USE_EXCHANGE_STREAMS and not price_stream.is_stale():
+                # Wake up on the next pushed price instead of polling once a second
+                price_seq = price_stream.wait(price_seq, timeout=1.0)
             
-            for trade in trades_to_check:
-                order_id = trade['order_id']
-                entry_price = trade['entry_price']
-                quantity = trade['quantity']
-                take_profit = trade['take_profit']
-                stop_loss = trade['stop_loss']
-                entry_time = datetime.strptime(trade['time'], "%Y-%m-%d %H:%M:%S") if 'time' in trade else None
-                
-                if trade.get('being_processed', False):
-                    continue
-                
-                print(f"Checking trade: ID={order_id}, Entry=${entry_price:.2f}, "
-                      f"Current=${current_price:.2f}, TP=${take_profit:.2f}, SL=${stop_loss:.2f}")
-                
-                if not trade.get('existing_position', False) and not trade.get('confirmed_filled', False):
-                    order_status = client.get_order_status(TRADING_SYMBOL, order_id)
-                    
-                    if 'status' in order_status and order_status['status'] == 'FILLED':
-                        print(f"Order {order_id} is now filled. Monitoring stop loss and take profit.")
-                        trade['confirmed_filled'] = True
-                    else:
-                        print(f"Order {order_id} is not filled yet. Status: {order_status.get('status', 'Unknown')}")
-                        
-                        if order_status.get('status') == 'NEW' and entry_time:
-                            current_time = datetime.now()
-                            order_age_minutes = (current_time - entry_time).total_seconds() / 60
-                            
-                            if order_age_minutes > 10:
-                                print(f"\n============ ORDER EXPIRATION ============")
-                                print(f"Order {order_id} has not been filled after {order_age_minutes:.1f} minutes. Cancelling.")
-                                
-                                trade['being_processed'] = True
-                                
-                                try:
-                                    cancel_result = client.cancel_order(
-                                        symbol=TRADING_SYMBOL,
-                                        order_id=order_id
-                                    )
-                                    
-                                    print(f"Order cancellation result: {cancel_result}")
-                                    
-                                    if not 'code' in cancel_result:
-                                        active_trades.remove(trade)
-                                        print(f"Trade {order_id} removed from monitoring (expired after 10 minutes)")
-                                    else:
-                                        trade['being_processed'] = False
-                                        print(f"Failed to cancel order {order_id}: {cancel_result}")
-                                except Exception as e:
-                                    print(f"Error cancelling expired order: {e}")
-                                    trade['being_processed'] = False
-                        
-                        continue
-                
-                if current_price >= take_profit:
-                    print(f"\n============ TAKE PROFIT HIT ============")
-                    print(f"Order ID: {order_id} - Target: ${take_profit} - Current: ${current_price}")
-                    
-                    trade['being_processed'] = True
-                    
-                    try:
-                        sell_result = client.place_market_sell_order(
-                            symbol=TRADING_SYMBOL,
-                            quantity=quantity
-                        )
-                        print(f"Take profit sell executed: {sell_result}")
-                        
-                        log_trade(
-                            order_id=order_id,
-                            symbol=TRADING_SYMBOL,
-                            entry_price=entry_price,
-                            exit_price=current_price, 
-                            quantity=quantity,
-                            take_profit_price=take_profit,
-                            stop_loss_price=stop_loss,
-                            exit_type='TAKE_PROFIT',
-                            entry_time=entry_time
-                        )
-                        
-                        if 'orderId' in sell_result and not 'code' in sell_result:
-                            active_trades.remove(trade)
-                            print(f"Trade {order_id} removed from monitoring (take profit)")
-                        else:
-                            trade['being_processed'] = False
-                    except Exception as e:
-                        print(f"Error executing take profit: {e}")
-                        trade['being_processed'] = False
-                
-                elif current_price <= stop_loss:
-                    print(f"\n============ STOP LOSS HIT ============")
-                    print(f"Order ID: {order_id} - Stop Loss: ${stop_loss} - Current: ${current_price}")
-                    
-                    trade['being_processed'] = True
-                    
-                    try:
-                        sell_result = client.place_market_sell_order(
-                            symbol=TRADING_SYMBOL,
-                            quantity=quantity
-                        )
-                        print(f"Stop loss sell executed: {sell_result}")
-                        
-                        log_trade(
-                            order_id=order_id,
-                            symbol=TRADING_SYMBOL,
-                            entry_price=entry_price,
-                            exit_price=current_price, 
-                            quantity=quantity,
-                            take_profit_price=take_profit,
-                            stop_loss_price=stop_loss,
-                            exit_type='STOP_LOSS',
-                            entry_time=entry_time
-                        )
-                        
-                        if 'orderId' in sell_result and not 'code' in sell_result:
-                            active_trades.remove(trade)
-                            print(f"Trade {order_id} removed from monitoring (stop loss)")
-                        else:
-                            trade['being_processed'] = False
-                    except Exception as e:
-                        print(f"Error executing stop loss: {e}")
-                        trade['being_processed'] = False
+            if watching_prices:
+                polled = not USE_EXCHANGE_STREAMS or price_stream.is_stale()
+                if polled:
+                    if USE_EXCHANGE_STREAMS:
+                        age = price_stream.age()
+                        last_update = f"{age:.1f}s ago" if age is not None else "none yet"
+                        print(f"Price stream stale (last update: {last_update}). Polling REST ticker.")
+                    ticker = client.get_symbol_ticker(TRADING_SYMBOL)
+                    current_price = float(ticker['price'])
+                else:
+                    current_price = price_stream.price
+            
+            # Fill events only cover the time the user stream was connected, so poll once after each reconnect
+            user_events = USE_EXCHANGE_STREAMS and not user_stream.is_stale() and user_stream.reconnects == synced_reconnects
+            
+            # Pushed prices can arrive many times a second; keep the status log at about once a second
+            log_status = polled or time.monotonic() - last_status_log >= 1
+            if log_status:
+                last_status_log = time.monotonic()
+                status = (f"Monitoring {len(trigger_book)} open positions, {len(exit_brackets)} OCO exits and "
+                          f"{len(pending_entries)} pending entries (REST weight {client.rate_limiter.weight_pct():.0f}%)")
+                if current_price is not None:
+                    nearest_take_profit, nearest_stop_loss = trigger_book.nearest()
+                    status += (f" at ${current_price:.2f} (nearest TP: {nearest_take_profit}, "
+                               f"nearest SL: {nearest_stop_loss})")
+                print(status)
+            
+            # The user stream thread changes these dictionaries too; iterate over snapshots
+            with trades_lock:
+                pending = list(pending_entries.values())
+                brackets = list(exit_brackets.values())
+            
+            for trade in pending:
+                check_pending_entry(trade, user_events, log_status)
+            
+            if not user_events:
+                for trade in brackets:
+                    check_exit_bracket(trade)
+            
+            with trades_lock:
+                for order_id, (retry_at, trade) in list(exit_retries.items()):
+                    if time.monotonic() >= retry_at:
+                        del exit_retries[order_id]
+                        arm_trade(trade)
+            
+            # Only the positions whose level was crossed come out of the book
+            if current_price is not None:
+                for order_id, exit_type, trade in trigger_book.pop_triggered(current_price):
+                    close_position(trade, exit_type, current_price)
             
-            time.sleep(1)
+            if USE_EXCHANGE_STREAMS and not user_stream.is_stale():
+                synced_reconnects = user_stream.reconnects
+            
+            if polled:
+                time.sleep(1)
             
         except Exception as e:
             print(f"Error in trade monitor: {e}")
@@ -345,10 +631,12 @@ def execute_order(order):
         print("No order to execute.")
         return None
     
-    justification = order.pop("justification", "No justification provided")
+    # Without fill events (or while they are interrupted) the ledger is refreshed over REST first
+    if not USE_EXCHANGE_STREAMS or account_ledger.is_stale():
+        account_ledger.reconcile()
     
-    balance = get_account_balance("USDT")
-    available_funds = balance['free']
+    get_account_balance("USDT")
+    available_funds = account_ledger.available("USDT")
     
     order_value = order['position_value']
     if order_value > available_funds:
@@ -402,14 +690,16 @@ def execute_order(order):
         
         if 'code' in main_order_result:
             print(f"Order placement error: {main_order_result.get('msg')} (Code: {main_order_result.get('code')})")
-            print("\n============ TRADE JUSTIFICATION ============")
-            print(justification)
             return results
         
         if main_order_result.get('orderId'):
             start_trade_monitor()
             
             if order['side'] == 'BUY':
+                # Held until the account update for this order reaches the ledger
+                account_ledger.reserve(main_order_result['orderId'], "USDT",
+                                       float(order['quantity']) * float(order['price']))
+                
                 new_trade = {
                     'order_id': main_order_result.get('orderId'),
                     'symbol': order['symbol'],
@@ -417,36 +707,72 @@ def execute_order(order):
                     'quantity': order['quantity'],
                     'take_profit': float(order['takeProfit']),
                     'stop_loss': float(order['stopLoss']),
-                    'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    'entry_time': time.time(),
                     'being_processed': False,
-                    'confirmed_filled': main_order_result.get('status') == 'FILLED'
+                    'confirmed_filled': main_order_result.get('status') == 'FILLED',
+                    'order_status': main_order_result.get('status')
                 }
                 
                 expiration_time = (datetime.now() + timedelta(minutes=10)).strftime("%Y-%m-%d %H:%M:%S")
                 print(f"Order will expire if not filled by: {expiration_time}")
                 
-                active_trades.append(new_trade)
+                add_active_trade(new_trade)
                 print(f"\n============ TRADE ADDED TO MONITORING ============")
                 print(f"Order ID: {new_trade['order_id']}")
                 print(f"Entry: ${new_trade['entry_price']}")
                 print(f"Target: ${new_trade['take_profit']}")
                 print(f"Stop Loss: ${new_trade['stop_loss']}")
         
-        print("\n============ TRADE JUSTIFICATION ============")
-        print(justification)
-        
         return results
     except Exception as e:
         print(f"Error executing order: {e}")
         
-        print("\n============ TRADE JUSTIFICATION ============")
-        print(justification)
-        
         results['error'] = str(e)
         return results
 
+def process_closed_candles(new_candles):
+    global candles
+    
+    for new_candle in new_candles:
+        historical_data.append(indicator_engine.update(new_candle))
+    
+    candles = historical_data.window(MAX_CANDLES)
+    
+    decision_factors = {}
+    if LAZY_SIGNAL_EVALUATION:
+        # Analyzers run on demand inside generate_order; skipped ones stay None
+        analysis = analysis_stage.lazy(candles)
+        order = generate_order(analysis['lstm'], analysis['indicators'], analysis['monte_carlo'], decision_factors)
+        analysis = {name: result.value for name, result in analysis.items()}
+    else:
+        analysis = analysis_stage.run(candles)
+        order = generate_order(analysis['lstm'], analysis['indicators'], analysis['monte_carlo'], decision_factors)
+    
+    lstm_response = analysis['lstm']
+    indicator_response = analysis['indicators']
+    monte_carlo_response = analysis['monte_carlo']
+    
+    order_copy = order.copy() if order else None
+    if order_copy:
+        order_copy['justification'] = JUSTIFICATION_PENDING
+    
+    analysis_data = send_analysis_data(lstm_response, indicator_response, monte_carlo_response, order_copy,
+                                       decision_factors)
+    
+    if order:
+        execution_result = execute_order(order)
+        
+        # The justification is produced after the order is on its way and pushed again when ready
+        main_order = (execution_result or {}).get('main_order') or {}
+        justification_worker.submit(
+            lstm_response, indicator_response, monte_carlo_response, order_copy,
+            on_ready=lambda text, source: attach_justification(analysis_data, main_order.get('orderId'), text, source)
+        )
+
+# Ingest and analysis are split: on_message only parses and enqueues closed candles
+analysis_worker = CandleAnalysisWorker(TRADING_SYMBOL, process_closed_candles, maxsize=ANALYSIS_QUEUE_SIZE)
+
 def on_message(ws, message):
-    global candles, historical_data
     data = json.loads(message)
     kline = data.get('k', {})
     
@@ -463,29 +789,7 @@ def on_message(ws, message):
             'taker_buy_quote_asset_volume': float(kline.get('Q'))
         }
         
-        historical_data.append(current_candle)
-        if len(historical_data) > MAX_HISTORICAL_DATA:
-            historical_data = historical_data[-MAX_HISTORICAL_DATA:]
-        
-        candles_with_indicators = calculate_indicators(historical_data)
-        
-        candles.clear()
-        candles.extend(candles_with_indicators[-MAX_CANDLES:])
-        
-        lstm_response = get_lstm_output(candles)
-        
-        indicator_response = get_indicator_data(candles)
-        
-        monte_carlo_response = get_monte_carlo_data(candles)
-        
-        order = generate_order(lstm_response, indicator_response, monte_carlo_response)
-        
-        order_copy = order.copy() if order else None
-        
-        send_analysis_data(lstm_response, indicator_response, monte_carlo_response, order_copy)
-        
-        if order:
-            execution_result = execute_order(order)
+        analysis_worker.submit(current_candle)
         
         return data
 
@@ -507,12 +811,19 @@ def main():
         account_info = client.get_account_info()
         print("Successfully connected to Binance Testnet")
         print(f"Account Status: {account_info.get('status')}")
+        account_ledger.start(account_info)
         
         get_account_balance("USDT")
         get_account_balance("BTC")
         
+        # Trading rules are loaded here, so formatting an order never downloads exchangeInfo
+        client.symbol_rules.start([TRADING_SYMBOL])
+        
         initialize_active_trades()
         
+        if USE_EXCHANGE_STREAMS:
+            price_stream.start()
+            user_stream.start()
         start_trade_monitor()
         
         start_websocket_server()
@@ -521,15 +832,19 @@ def main():
         symbol = TRADING_SYMBOL.lower()
         interval = TRADING_INTERVAL
         
-        historical_data = get_historical_candles(symbol, interval)
-        print(f"Fetched {len(historical_data)} historical candles")
+        warmup_candles = get_historical_candles(symbol, interval)
+        print(f"Fetched {len(warmup_candles)} historical candles")
         
-        candles_with_indicators = calculate_indicators(historical_data)
+        historical_data.clear()
+        historical_data.extend(indicator_engine.seed(warmup_candles))
         
-        candles = deque(candles_with_indicators[-MAX_CANDLES:], maxlen=MAX_CANDLES)
+        candles = historical_data.window(MAX_CANDLES)
+        if MC_USE_POOL:
+            normal_pool.start()
+        analysis_worker.start()
         print(f"Initialized display with {len(candles)} recent candles with indicators")
         
-        ws_url = f"wss://stream.binance.com:9443/ws/{symbol}@kline_{interval}"
+        ws_url = f"{KLINE_STREAM_URL}/ws/{symbol}@kline_{interval}"
         ws = websocket.WebSocketApp(ws_url,
                                     on_message=on_message,
                                     on_error=on_error,
@@ -540,10 +855,28 @@ def main():
     except KeyboardInterrupt:
         print("Shutting down gracefully...")
         stop_trade_monitor()
+        price_stream.stop()
+        user_stream.stop()
+        analysis_worker.stop()
+        analysis_stage.shutdown()
+        justification_worker.shutdown()
+        normal_pool.stop()
+        account_ledger.stop()
+        client.symbol_rules.stop()
+        client.close()
         websocket_server_running = False
     except Exception as e:
         print(f"Unexpected error: {e}")
         stop_trade_monitor()
+        price_stream.stop()
+        user_stream.stop()
+        analysis_worker.stop()
+        analysis_stage.shutdown()
+        justification_worker.shutdown()
+        normal_pool.stop()
+        account_ledger.stop()
+        client.symbol_rules.stop()
+        client.close()
         websocket_server_running = False
 
 if __name__ == "__main__":
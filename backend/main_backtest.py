@@ -9,7 +9,7 @@ import argparse
 import csv
 
 # Import existing modules
-from my_lstm import get_lstm_output
+from my_lstm import get_lstm_output, get_lstm_outputs
 from my_indicator import get_indicator_data
 from my_monte_carlo import get_monte_carlo_data
 from my_order_manager import generate_order
@@ -18,6 +18,7 @@ from my_order_manager import generate_order
 INITIAL_CAPITAL = 10000.0  # Starting capital
 CSV_FILE_PATH = "../processed_eth1.csv"  # Default path
 WARMUP_CANDLES = 60  # Number of candles needed for indicators and LSTM
+ANALYSIS_INTERVAL = 5  # Generate new signals every N candles
 OUTPUT_DIR = "backtest_results"  # Directory to save results
 
 class Trade:
@@ -191,7 +192,11 @@ def load_data(file_path):
         print(f"Error loading data: {e}")
         return None
 
-def run_backtest(data, initial_capital):
+def analysis_indices(data, start_idx):
+    """Candle indices the backtest analyzes (every ANALYSIS_INTERVAL candles)"""
+    return [i for i in range(start_idx, len(data)) if i % ANALYSIS_INTERVAL == 0]
+
+def run_backtest(data, initial_capital, batch_lstm=True, use_cache=True):
     """Run the backtest on the provided data"""
     # Create portfolio to track performance
     portfolio = Portfolio(initial_capital)
@@ -211,6 +216,9 @@ def run_backtest(data, initial_capital):
         candle = data.iloc[i].to_dict()
         candles.append(candle)
     
+    # Predict every analysis window up front in batches instead of one predict per step
+    lstm_outputs = get_lstm_outputs(data, analysis_indices(data, start_idx), use_cache=use_cache) if batch_lstm else None
+    
     # Prepare results storage
     results = {
         "timestamps": [],
@@ -248,7 +256,7 @@ def run_backtest(data, initial_capital):
         
         # Only generate new signals every 5 candles to avoid excessive trading
         # and to better simulate real-world conditions
-        if i % 5 == 0:
+        if i % ANALYSIS_INTERVAL == 0:
             # Convert deque to list for analysis
             candles_list = list(candles)
             
@@ -258,7 +266,10 @@ def run_backtest(data, initial_capital):
             
             # Call analysis modules
             try:
-                lstm_response = get_lstm_output(candles_list)
+                if lstm_outputs is not None:
+                    lstm_response = lstm_outputs.get(i)
+                else:
+                    lstm_response = get_lstm_output(candles_list)
                 indicator_response = get_indicator_data(candles_list)
                 monte_carlo_response = get_monte_carlo_data(candles_list)
                 
@@ -526,6 +537,10 @@ def main():
                        help='Initial capital for backtest')
     parser.add_argument('--output', type=str, default=OUTPUT_DIR,
                        help='Directory to save results')
+    parser.add_argument('--scalar-lstm', action='store_true',
+                       help='Run the LSTM one window at a time instead of in precomputed batches')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Ignore the on-disk prediction cache and recompute every LSTM forecast')
     args = parser.parse_args()
     
     # Create output directory if it doesn't exist
@@ -542,7 +557,8 @@ def main():
     
     # Run backtest
     start_time = time.time()
-    portfolio, results = run_backtest(data, args.capital)
+    portfolio, results = run_backtest(data, args.capital, batch_lstm=not args.scalar_lstm,
+                                      use_cache=not args.no_cache)
     end_time = time.time()
     
     # Calculate performance metrics
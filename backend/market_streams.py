@@ -0,0 +1,373 @@
+"""
+Exchange websocket streams for the trade monitor.
+
+The monitor used to poll the REST ticker every second and ask for the status
+of every unfilled order on every loop, so REST weight grew with the number of
+open trades and stop reactions lagged by up to a second. PriceStream keeps
+the latest bookTicker (or trade) price pushed by the exchange and lets the
+monitor wake up on every update; UserDataStream delivers executionReport
+events for our own orders over a listenKey stream. Both reconnect on their
+own, and both report when they are stale so the monitor can fall back to REST
+until they recover.
+
+    python market_streams.py check
+"""
+import argparse
+import json
+import threading
+import time
+
+import websocket
+
+
+class _ReconnectingStream:
+    """Runs a websocket-client connection on a daemon thread and reconnects with backoff"""
+    name = "stream"
+
+    def __init__(self, reconnect_delay=1.0, max_reconnect_delay=30.0):
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.running = False
+        self.connected = False
+        self.thread = None
+        self.ws = None
+        self.messages = 0
+        self.reconnects = 0
+
+    def _url(self):
+        raise NotImplementedError
+
+    def _handle(self, data):
+        raise NotImplementedError
+
+    def _on_open(self, ws):
+        self.connected = True
+        print(f"{self.name} connected")
+
+    def _on_message(self, ws, message):
+        self.messages += 1
+        try:
+            data = json.loads(message)
+        except ValueError:
+            print(f"{self.name}: ignoring malformed message")
+            return
+        # Combined streams wrap each event as {"stream": ..., "data": {...}}
+        if isinstance(data, dict) and 'data' in data and 'stream' in data:
+            data = data['data']
+        self._handle(data)
+
+    def _on_error(self, ws, error):
+        print(f"{self.name} error: {error}")
+
+    def _on_close(self, ws, close_status_code, close_msg):
+        self.connected = False
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while self.running:
+            started = time.monotonic()
+            try:
+                url = self._url()
+                if url:
+                    self.ws = websocket.WebSocketApp(url,
+                                                     on_open=self._on_open,
+                                                     on_message=self._on_message,
+                                                     on_error=self._on_error,
+                                                     on_close=self._on_close)
+                    self.ws.run_forever(ping_interval=60, ping_timeout=10)
+            except Exception as e:
+                print(f"{self.name} connection failed: {e}")
+            self.connected = False
+
+            if not self.running:
+                break
+            # A connection that stayed up for a while resets the backoff
+            if time.monotonic() - started > self.max_reconnect_delay:
+                delay = self.reconnect_delay
+            self.reconnects += 1
+            print(f"{self.name} disconnected, reconnecting in {delay:.0f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.running:
+            self.running = False
+            if self.ws:
+                self.ws.close()
+            if self.thread:
+                self.thread.join(timeout=5)
+            print(f"{self.name} stopped")
+
+
+class PriceStream(_ReconnectingStream):
+    """Latest price of one symbol pushed from a bookTicker or trade stream"""
+    name = "price-stream"
+
+    def __init__(self, base_url, symbol, kind='bookTicker', stale_after=5.0, **kwargs):
+        """
+        Parameters:
+        base_url: Websocket base URL, e.g. wss://testnet.binance.vision
+        symbol: Trading pair, e.g. BTCUSDT
+        kind: 'bookTicker' (price is the best bid, what a market sell fills at) or 'trade' (last trade price)
+        stale_after: Seconds without an update after which the price is considered stale
+        """
+        super().__init__(**kwargs)
+        if kind not in ('bookTicker', 'trade'):
+            raise ValueError(f"Unknown price stream kind: {kind}")
+        self.base_url = base_url.rstrip('/')
+        self.symbol = symbol
+        self.kind = kind
+        self.stale_after = stale_after
+        self.condition = threading.Condition()
+        self.price = None
+        self.bid = None
+        self.ask = None
+        self.updated_at = None
+        self.seq = 0
+
+    def _url(self):
+        return f"{self.base_url}/ws/{self.symbol.lower()}@{self.kind}"
+
+    def _handle(self, data):
+        if self.kind == 'bookTicker':
+            if 'b' not in data:
+                return
+            bid, ask = float(data['b']), float(data['a'])
+            price = bid
+        else:
+            if data.get('e') != 'trade':
+                return
+            bid, ask = self.bid, self.ask
+            price = float(data['p'])
+
+        with self.condition:
+            self.price = price
+            self.bid = bid
+            self.ask = ask
+            self.updated_at = time.monotonic()
+            self.seq += 1
+            self.condition.notify_all()
+
+    def age(self):
+        """Seconds since the last price update (None before the first one)"""
+        return None if self.updated_at is None else time.monotonic() - self.updated_at
+
+    def is_stale(self):
+        age = self.age()
+        return not self.connected or age is None or age > self.stale_after
+
+    def wait(self, after_seq, timeout):
+        """Block until an update newer than after_seq arrives (or timeout) and return the latest seq"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.seq > after_seq or not self.running, timeout)
+            return self.seq
+
+    def stats(self):
+        return {'messages': self.messages, 'reconnects': self.reconnects, 'age': self.age(), 'price': self.price}
+
+
+class UserDataStream(_ReconnectingStream):
+    """Account events (executionReport, outboundAccountPosition, ...) from a listenKey stream"""
+    name = "user-data-stream"
+
+    def __init__(self, client, base_url, keepalive_seconds=1800, **kwargs):
+        """
+        Parameters:
+        client: BinanceTestnetClient used to create, keep alive and close the listenKey
+        base_url: Websocket base URL, e.g. wss://testnet.binance.vision
+        keepalive_seconds: Interval between listenKey keepalives (keys expire after 60 minutes)
+        """
+        super().__init__(**kwargs)
+        self.client = client
+        self.base_url = base_url.rstrip('/')
+        self.keepalive_seconds = keepalive_seconds
+        self.listen_key = None
+        self.handlers = {}
+        self.keepalive_thread = None
+        self.stop_event = threading.Event()
+
+    def on(self, event_type, handler):
+        """Call handler(event) for every event whose 'e' field equals event_type"""
+        self.handlers.setdefault(event_type, []).append(handler)
+
+    def _url(self):
+        self.listen_key = self.client.create_listen_key()
+        if not self.listen_key:
+            print(f"{self.name}: could not create a listenKey")
+            return None
+        return f"{self.base_url}/ws/{self.listen_key}"
+
+    def _handle(self, data):
+        event_type = data.get('e')
+        if event_type == 'listenKeyExpired':
+            print(f"{self.name}: listenKey expired, reconnecting with a new one")
+            if self.ws:
+                self.ws.close()
+            return
+        for handler in self.handlers.get(event_type, []):
+            try:
+                handler(data)
+            except Exception as e:
+                print(f"Error handling {event_type} event: {e}")
+
+    def _keepalive(self):
+        while not self.stop_event.wait(self.keepalive_seconds):
+            if self.listen_key:
+                try:
+                    self.client.keepalive_listen_key(self.listen_key)
+                except Exception as e:
+                    print(f"{self.name}: listenKey keepalive failed: {e}")
+
+    def is_stale(self):
+        # Account streams are silent while nothing happens, so only a lost connection makes them stale
+        return not self.connected
+
+    def start(self):
+        if not self.running:
+            self.stop_event.clear()
+            self.keepalive_thread = threading.Thread(target=self._keepalive, name="listen-key-keepalive", daemon=True)
+            self.keepalive_thread.start()
+        super().start()
+
+    def stop(self):
+        self.stop_event.set()
+        super().stop()
+        if self.listen_key:
+            try:
+                self.client.close_listen_key(self.listen_key)
+            except Exception as e:
+                print(f"{self.name}: could not close listenKey: {e}")
+
+    def stats(self):
+        return {'messages': self.messages, 'reconnects': self.reconnects, 'connected': self.connected}
+
+
+def check(updates=200):
+    """
+    Run both streams against local stand-in servers.
+
+    A websocket server plays the exchange: it pushes bookTicker updates and
+    then an executionReport on the listenKey stream, and a small HTTP server
+    answers the userDataStream REST calls. The check measures push-to-wake
+    latency of PriceStream.wait and confirms fills arrive on the user stream.
+    """
+    import asyncio
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from websockets.asyncio.server import serve
+
+    from binance_client import BinanceTestnetClient
+
+    listen_key = "standin-listen-key"
+    sent_at = {}
+
+    class ListenKeyHandler(BaseHTTPRequestHandler):
+        def _reply(self, body):
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            self._reply({'listenKey': listen_key})
+
+        def do_PUT(self):
+            self._reply({})
+
+        def do_DELETE(self):
+            self._reply({})
+
+        def log_message(self, *args):
+            pass
+
+    http_server = HTTPServer(('127.0.0.1', 0), ListenKeyHandler)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+
+    ready = threading.Event()
+    go = threading.Event()
+    ws_port = []
+
+    async def handler(connection):
+        path = connection.request.path
+        if path.endswith('@bookTicker'):
+            await asyncio.get_running_loop().run_in_executor(None, go.wait)
+            for i in range(updates):
+                sent_at[i + 1] = time.perf_counter()
+                price = 60000 + i
+                await connection.send(json.dumps({'u': i, 's': 'BTCUSDT', 'b': f"{price:.2f}", 'B': '1',
+                                                  'a': f"{price + 0.01:.2f}", 'A': '1'}))
+                await asyncio.sleep(0.002)
+        elif path.endswith(listen_key):
+            await asyncio.get_running_loop().run_in_executor(None, go.wait)
+            await connection.send(json.dumps({'e': 'executionReport', 's': 'BTCUSDT', 'i': 42, 'X': 'FILLED',
+                                              'x': 'TRADE', 'z': '0.001', 'L': '60000.00'}))
+        await connection.wait_closed()
+
+    def run_ws_server():
+        async def main():
+            async with serve(handler, '127.0.0.1', 0) as server:
+                ws_port.append(server.sockets[0].getsockname()[1])
+                ready.set()
+                await asyncio.get_running_loop().run_in_executor(None, stop_servers.wait)
+        asyncio.run(main())
+
+    stop_servers = threading.Event()
+    threading.Thread(target=run_ws_server, daemon=True).start()
+    ready.wait(5)
+    base_url = f"ws://127.0.0.1:{ws_port[0]}"
+
+    client = BinanceTestnetClient("standin-key", "standin-secret")
+    client.BASE_URL = f"http://127.0.0.1:{http_server.server_address[1]}"
+
+    prices = PriceStream(base_url, 'BTCUSDT', 'bookTicker', stale_after=1.0)
+    user = UserDataStream(client, base_url, keepalive_seconds=60)
+    fills = []
+    user.on('executionReport', lambda event: fills.append((event['i'], event['X'])))
+    prices.start()
+    user.start()
+
+    deadline = time.monotonic() + 5
+    while not (prices.connected and user.connected) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    go.set()
+
+    latencies = []
+    seq = 0
+    while seq < updates:
+        seq = prices.wait(seq, timeout=2.0)
+        if seq in sent_at:
+            latencies.append(time.perf_counter() - sent_at[seq])
+        if prices.is_stale():
+            break
+    time.sleep(0.2)
+
+    prices.stop()
+    user.stop()
+    stop_servers.set()
+    http_server.shutdown()
+
+    latencies.sort()
+    passed = prices.price == 60000 + updates - 1 and fills == [(42, 'FILLED')] and bool(latencies)
+    if latencies:
+        print(f"Price updates: {prices.messages}, last price {prices.price}, wake latency "
+              f"p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+    print(f"Fill events: {fills}")
+    print("Stream check passed" if passed else "Stream check FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Exchange stream utilities')
+    parser.add_argument('command', choices=['check'], help='check: run both streams against local stand-in servers')
+    parser.add_argument('--updates', type=int, default=200, help='Price updates pushed by the stand-in server')
+    args = parser.parse_args()
+
+    if not check(args.updates):
+        raise SystemExit(1)
@@ -0,0 +1,153 @@
+"""
+Background pool of pre-drawn standard-normal blocks for the Monte Carlo step.
+
+Drawing sims x horizon normals is the largest single cost of
+get_monte_carlo_data and it happens right after a candle closes. The pool
+keeps a ring of ready (sims x horizon) blocks in one pre-allocated array and
+a producer thread refills it between candles, so at candle close the
+simulation only scales, shifts and accumulates a block that already exists.
+
+Blocks are numbered and block k is always drawn from its own generator seeded
+with (entropy, k). The consumer takes blocks in order, and when the producer
+has fallen behind it draws block k inline instead of waiting. Either way the
+sequence of blocks handed out is the same for a given seed, whatever the
+thread timing; an empty pool only costs latency, and is counted.
+"""
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from config import MC_SIMULATIONS, MC_FORECAST_PERIODS, MC_SAMPLING, MC_SEED, MC_POOL_BLOCKS
+from monte_carlo_kernel import draw_normals
+
+
+class NormalBlockPool:
+    """Ring of pre-drawn (sims x horizon) normal blocks refilled by a producer thread"""
+    def __init__(self, num_simulations, horizon, blocks=4, seed=None, scheme='plain'):
+        """
+        Parameters:
+        num_simulations: Rows per block (one per simulated path)
+        horizon: Columns per block (one per forecast period)
+        blocks: Ring capacity in blocks
+        seed: Seed for the block sequence (None picks fresh entropy once)
+        scheme: Sampling scheme passed to draw_normals
+        """
+        self.shape = (num_simulations, horizon)
+        self.capacity = blocks
+        self.scheme = scheme
+        self.entropy = np.random.SeedSequence(seed).entropy
+        self.buffer = np.empty((blocks,) + self.shape)
+        self.slot_seq = [-1] * blocks
+        self.busy_slot = None
+        self.next_consume = 0
+        self.next_produce = 0
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+        self.served = 0
+        self.empty_events = 0
+
+    def _draw(self, seq, out=None):
+        """Draw block `seq` (into `out` when given); the same seq always gives the same block"""
+        rng = np.random.default_rng([self.entropy, seq])
+        if self.scheme == 'plain' and out is not None:
+            return rng.standard_normal(self.shape, out=out)
+        block = draw_normals(rng, self.shape[0], self.shape[1], self.scheme)
+        if out is not None:
+            out[...] = block
+            return out
+        return block
+
+    def _slot_free(self):
+        ahead = self.next_produce - self.next_consume
+        return ahead < self.capacity and self.next_produce % self.capacity != self.busy_slot
+
+    def _produce(self):
+        while True:
+            with self.condition:
+                while self.running and not self._slot_free():
+                    self.condition.wait()
+                if not self.running:
+                    return
+                seq = self.next_produce
+                slot = seq % self.capacity
+                self.next_produce += 1
+                self.slot_seq[slot] = -1
+
+            self._draw(seq, out=self.buffer[slot])
+
+            with self.condition:
+                # The consumer may have drawn this block inline while it was being produced
+                if seq >= self.next_consume:
+                    self.slot_seq[slot] = seq
+                self.condition.notify_all()
+
+    @contextmanager
+    def block(self):
+        """
+        Hand out the next block of normals.
+
+        Use as `with pool.block() as normals:`; the block is read-only and only
+        valid inside the with statement, after which its slot is refilled.
+        """
+        with self.condition:
+            seq = self.next_consume
+            self.next_consume += 1
+            # Never produce a block the consumer has already moved past
+            self.next_produce = max(self.next_produce, self.next_consume)
+            slot = seq % self.capacity
+            ready = self.slot_seq[slot] == seq
+            if ready:
+                self.slot_seq[slot] = -1
+                self.busy_slot = slot
+            else:
+                self.empty_events += 1
+            self.served += 1
+
+        if not ready:
+            print(f"Monte Carlo normal pool empty, drawing block {seq} inline "
+                  f"(empty {self.empty_events} of {self.served} blocks)")
+            try:
+                yield self._draw(seq)
+            finally:
+                with self.condition:
+                    self.condition.notify_all()
+            return
+
+        try:
+            yield self.buffer[slot]
+        finally:
+            with self.condition:
+                self.busy_slot = None
+                self.condition.notify_all()
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._produce, name="mc-normal-pool", daemon=True)
+            self.thread.start()
+            print(f"Monte Carlo normal pool started ({self.capacity} blocks of {self.shape[0]}x{self.shape[1]})")
+
+    def stop(self):
+        if self.running:
+            with self.condition:
+                self.running = False
+                self.condition.notify_all()
+            if self.thread:
+                self.thread.join(timeout=5)
+            print("Monte Carlo normal pool stopped")
+
+    def stats(self):
+        with self.condition:
+            ready = sum(1 for seq in self.slot_seq if seq >= self.next_consume)
+            return {
+                'served': self.served,
+                'empty_pool': self.empty_events,
+                'ready': ready,
+                'capacity': self.capacity
+            }
+
+
+normal_pool = NormalBlockPool(MC_SIMULATIONS, MC_FORECAST_PERIODS, blocks=MC_POOL_BLOCKS,
+                              seed=MC_SEED, scheme=MC_SAMPLING)
@@ -0,0 +1,142 @@
+"""
+Process-wide cache of LSTM models and their scalers.
+
+get_lstm_output used to call tf.keras.models.load_model and joblib.load on
+every candle. The registry loads each model directory once, warms the model
+up with a dummy batch so the predict graph is traced before the first real
+candle, and hands back the cached bundle afterwards. When the files on disk
+change (mtime/size, confirmed by checksum) the new bundle is loaded and
+warmed in full before being swapped in, so callers never see a half-loaded
+model.
+
+The cached model is an inference backend from lstm_backends (Keras, TFLite
+or ONNX Runtime); all of them expose the same predict(batch) call.
+"""
+import hashlib
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+
+from config import MODEL_RELOAD_CHECK_SECONDS
+from lstm_backends import backend_model_path, load_backend
+
+
+class ModelBundle:
+    """A loaded inference backend with its scalers and the file state it was loaded from"""
+    def __init__(self, model, feature_scaler, close_scaler, file_stats, checksum):
+        self.model = model
+        self.feature_scaler = feature_scaler
+        self.close_scaler = close_scaler
+        self.file_stats = file_stats
+        self.checksum = checksum
+        self.loaded_at = time.time()
+
+
+def _file_stats(paths):
+    return tuple((os.stat(path).st_mtime_ns, os.stat(path).st_size) for path in paths)
+
+
+def _checksum(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """Loads model directories once and hot-swaps them when their files change"""
+    def __init__(self, check_interval=30.0):
+        """
+        Parameters:
+        check_interval: Minimum seconds between file change checks for a model directory
+        """
+        self.check_interval = check_interval
+        self.bundles = {}
+        self.last_checked = {}
+        self.lock = threading.Lock()
+        self.load_locks = {}
+
+    def _load(self, paths, file_stats, checksum, backend):
+        model_path, feature_scaler_path, close_scaler_path = paths
+        model = load_backend(model_path, backend)
+        feature_scaler = joblib.load(feature_scaler_path)
+        close_scaler = joblib.load(close_scaler_path)
+
+        # Trace the predict graph and touch the scalers before the first real candle
+        dummy_batch = np.zeros((1,) + tuple(model.input_shape[1:]), dtype=np.float32)
+        model.predict(dummy_batch)
+        feature_scaler.transform(np.zeros((1, dummy_batch.shape[-1])))
+        close_scaler.inverse_transform(np.zeros((1, 1)))
+
+        return ModelBundle(model, feature_scaler, close_scaler, file_stats, checksum)
+
+    def get(self, model_dir, model_file, feature_scaler_file, close_scaler_file, backend='keras'):
+        """Return the ModelBundle for a model directory and backend, loading or reloading it when needed"""
+        key = (os.path.abspath(model_dir), backend)
+        paths = [os.path.join(model_dir, name) for name in (model_file, feature_scaler_file, close_scaler_file)]
+        # Watch the file the backend actually loads (e.g. the exported .tflite next to the .h5)
+        paths[0] = backend_model_path(paths[0], backend)
+
+        with self.lock:
+            bundle = self.bundles.get(key)
+            now = time.time()
+            if bundle is not None and now - self.last_checked.get(key, 0) < self.check_interval:
+                return bundle
+            self.last_checked[key] = now
+            load_lock = self.load_locks.setdefault(key, threading.Lock())
+
+        # One loader per directory; while it runs, other callers keep using the current bundle
+        if bundle is not None:
+            if not load_lock.acquire(blocking=False):
+                return bundle
+        else:
+            load_lock.acquire()
+
+        try:
+            with self.lock:
+                bundle = self.bundles.get(key)
+
+            try:
+                file_stats = _file_stats(paths)
+                checksum = None if bundle is not None and bundle.file_stats == file_stats else _checksum(paths)
+            except OSError as e:
+                if bundle is None:
+                    raise
+                print(f"Error checking model files in {model_dir}: {e}. Keeping the previously loaded model.")
+                return bundle
+
+            if checksum is None:
+                return bundle
+            if bundle is not None and bundle.checksum == checksum:
+                bundle.file_stats = file_stats
+                return bundle
+
+            try:
+                new_bundle = self._load(paths, file_stats, checksum, backend)
+            except Exception as e:
+                if bundle is None:
+                    raise
+                print(f"Error reloading model from {model_dir}: {e}. Keeping the previously loaded model.")
+                return bundle
+
+            with self.lock:
+                self.bundles[key] = new_bundle
+
+            action = "reloaded" if bundle is not None else "loaded"
+            print(f"LSTM model {action} from {model_dir} with the {backend} backend (checksum {checksum[:12]})")
+            return new_bundle
+        finally:
+            load_lock.release()
+
+    def clear(self):
+        with self.lock:
+            self.bundles.clear()
+            self.last_checked.clear()
+
+
+model_registry = ModelRegistry(check_interval=MODEL_RELOAD_CHECK_SECONDS)
@@ -0,0 +1,386 @@
+"""
+Vectorized Monte Carlo kernel shared by the price simulations.
+
+my_monte_carlo, ETH_my_monte_carlo and the root monte_carlo.py used to build
+every path with a Python loop and one np.random.normal call per step. Here all
+returns for all paths come from a single Generator.standard_normal draw and
+the paths are one cumulative product, so a candle costs a handful of array
+operations instead of sims x horizon interpreter round trips.
+
+The kernel draws the normals in the same order as the per-step loop (path by
+path, step by step) and multiplies in the same order, so for a given seed the
+paths are bit-identical to _reference_paths. Run this file to check that:
+    python monte_carlo_kernel.py --seed 42
+
+The normals can also come from a variance-reduced sampling scheme:
+
+- plain:      independent standard normals (the default, matches the loop)
+- antithetic: each path is paired with its mirror image (-z), which cancels
+              much of the first-order noise in means and band positions
+- sobol:      a scrambled Sobol low-discrepancy sequence over the horizon,
+              mapped through the normal inverse CDF (needs scipy)
+
+The bench command compares their standard errors against wall-clock cost:
+    python monte_carlo_kernel.py bench --simulations 1000 --repeats 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+from quantile_sketch import LogHistogramSketch
+
+SAMPLING_SCHEMES = ['plain', 'antithetic', 'sobol']
+
+
+def make_rng(seed=None):
+    """numpy Generator for a seed (None draws fresh entropy)"""
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+
+def draw_normals(rng, num_simulations, horizon, scheme='plain'):
+    """(num_simulations, horizon) standard normals drawn with the given sampling scheme"""
+    if scheme == 'plain':
+        return rng.standard_normal((num_simulations, horizon))
+
+    if scheme == 'antithetic':
+        half = rng.standard_normal(((num_simulations + 1) // 2, horizon))
+        return np.concatenate([half, -half])[:num_simulations]
+
+    if scheme == 'sobol':
+        from scipy.stats import norm, qmc
+
+        sampler = qmc.Sobol(d=horizon, scramble=True, seed=rng)
+        # Balance properties hold for powers of two, so draw the next one up and keep the first rows
+        uniforms = sampler.random_base2(int(np.ceil(np.log2(max(num_simulations, 2)))))[:num_simulations]
+        # Keep the inverse CDF finite at the edges of the unit cube
+        eps = np.finfo(float).eps
+        return norm.ppf(np.clip(uniforms, eps, 1 - eps))
+
+    raise ValueError(f"Unknown sampling scheme '{scheme}'. Choose from: {', '.join(SAMPLING_SCHEMES)}")
+
+
+def simulate_paths(last_price, mean_return, std_return, num_simulations, horizon, rng=None, scheme='plain'):
+    """
+    Simulate price paths with normally distributed per-period returns.
+
+    Returns a (num_simulations, horizon) array where row i is one path and
+    column t is the price after t + 1 periods.
+    """
+    rng = make_rng(rng)
+    normals = draw_normals(rng, num_simulations, horizon, scheme)
+    return paths_from_normals(last_price, mean_return, std_return, normals)
+
+
+def paths_from_normals(last_price, mean_return, std_return, normals):
+    """Turn a (sims, horizon) block of standard normals into price paths"""
+    growth = 1 + (mean_return + std_return * normals)
+    # Fold the starting price into the first step so the cumulative product
+    # multiplies in the same order as price = price * (1 + return)
+    growth[:, 0] = last_price * growth[:, 0]
+    return np.cumprod(growth, axis=1, out=growth)
+
+
+# prob_increase cut points between STRONG_SELL / SELL / NEUTRAL / BUY / STRONG_BUY
+SIGNAL_THRESHOLDS = (0.3, 0.4, 0.6, 0.7)
+
+
+def monte_carlo_signal(prob_increase):
+    """Trading signal for the probability that the final price ends above the current one"""
+    if prob_increase > 0.7:
+        return "STRONG_BUY"
+    elif prob_increase > 0.6:
+        return "BUY"
+    elif prob_increase < 0.3:
+        return "STRONG_SELL"
+    elif prob_increase < 0.4:
+        return "SELL"
+    return "NEUTRAL"
+
+
+def decision_settled(prob_increase, paths, z=1.96, thresholds=SIGNAL_THRESHOLDS):
+    """Whether the normal-approximation CI on prob_increase lies strictly between two signal thresholds"""
+    half_width = z * np.sqrt(prob_increase * (1 - prob_increase) / paths)
+    low, high = prob_increase - half_width, prob_increase + half_width
+    return all(high < threshold or low > threshold for threshold in thresholds)
+
+
+def simulate_adaptive(last_price, mean_return, std_return, max_simulations, horizon, rng=None, scheme='plain',
+                      chunk_size=250, min_simulations=250, z=1.96, band_tolerance=0.0005, confidence_level=90):
+    """
+    Simulate paths in chunks until the answer stops depending on more paths.
+
+    After each chunk (and at least min_simulations paths) the run stops when
+    either the z-score confidence interval on prob_increase no longer contains
+    any of the signal thresholds, so more paths cannot change the signal, or
+    the confidence bands moved by less than band_tolerance (relative) since
+    the previous chunk. max_simulations caps the run.
+
+    Returns (paths, stop_reason) where stop_reason is 'decision', 'bands' or 'max_paths'.
+    """
+    rng = make_rng(rng)
+    lower_percentile = (100 - confidence_level) / 2
+    upper_percentile = 100 - lower_percentile
+
+    chunks = []
+    paths_used = 0
+    previous_bands = None
+    while paths_used < max_simulations:
+        size = min(chunk_size, max_simulations - paths_used)
+        chunks.append(paths_from_normals(last_price, mean_return, std_return,
+                                         draw_normals(rng, size, horizon, scheme)))
+        paths_used += size
+        if paths_used < min_simulations or paths_used >= max_simulations:
+            continue
+
+        simulation_results = np.concatenate(chunks)
+        prob_increase = np.mean(simulation_results[:, -1] > last_price)
+        if decision_settled(prob_increase, paths_used, z):
+            return simulation_results, 'decision'
+
+        bands = np.percentile(simulation_results, [lower_percentile, upper_percentile], axis=0)
+        if previous_bands is not None and np.max(np.abs(bands - previous_bands) / np.abs(previous_bands)) < band_tolerance:
+            return simulation_results, 'bands'
+        previous_bands = bands
+
+    return np.concatenate(chunks), 'max_paths'
+
+
+def summarize_paths(simulation_results, last_price, confidence_level):
+    """
+    Path statistics used by get_monte_carlo_data.
+
+    confidence_level is in percent (90 -> 5th to 95th percentile bands).
+    """
+    lower_percentile = (100 - confidence_level) / 2
+    upper_percentile = 100 - lower_percentile
+
+    lower_bound, upper_bound = np.percentile(simulation_results, [lower_percentile, upper_percentile], axis=0)
+
+    final_prices = simulation_results[:, -1]
+    prob_increase = np.mean(final_prices > last_price)
+    expected_price = np.mean(final_prices)
+    expected_change = expected_price - last_price
+
+    return {
+        "mean_path": np.mean(simulation_results, axis=0),
+        "lower_bound": lower_bound,
+        "upper_bound": upper_bound,
+        "median_path": np.median(simulation_results, axis=0),
+        "prob_increase": prob_increase,
+        "expected_price": expected_price,
+        "expected_change": expected_change,
+        "expected_change_pct": (expected_change / last_price) * 100,
+        "signal": monte_carlo_signal(prob_increase)
+    }
+
+
+def max_drawdowns(simulation_results):
+    """Largest peak-to-trough drop of each path as a fraction of the running peak"""
+    running_peak = np.maximum.accumulate(simulation_results, axis=1)
+    return np.max((running_peak - simulation_results) / running_peak, axis=1)
+
+
+def risk_metrics(simulation_results, current_price, confidence_level):
+    """
+    VaR, expected shortfall, max drawdown and probability of profit.
+
+    confidence_level is a fraction (0.95 -> VaR at the 5th percentile of the
+    final-period change). Values are fractions, not percentages.
+    """
+    final_prices = simulation_results[:, -1]
+    potential_changes = (final_prices - current_price) / current_price
+
+    var = np.percentile(potential_changes, (1 - confidence_level) * 100)
+    expected_shortfall = potential_changes[potential_changes <= var].mean()
+
+    return {
+        "var": var,
+        "expected_shortfall": expected_shortfall,
+        "max_drawdown": float(np.max(max_drawdowns(simulation_results))),
+        "prob_profit": np.mean(final_prices > current_price)
+    }
+
+
+class StreamingPathStats:
+    """
+    Path statistics accumulated chunk by chunk without keeping the paths.
+
+    Means, the probability of increase and the largest drawdown are exact;
+    the percentile bands and median come from a LogHistogramSketch per
+    horizon step and are within relative_accuracy of the exact values. The
+    first keep_paths paths are kept as samples for display.
+    """
+    def __init__(self, last_price, horizon, relative_accuracy=0.0001, keep_paths=0):
+        self.last_price = last_price
+        self.horizon = horizon
+        self.keep_paths = keep_paths
+        self.sketch = LogHistogramSketch(relative_accuracy, columns=horizon)
+        self.path_sums = np.zeros(horizon)
+        self.paths = 0
+        self.above_start = 0
+        self.max_drawdown = 0.0
+        self.sample_paths = np.empty((0, horizon))
+
+    def add(self, paths):
+        """Fold a (rows, horizon) chunk of simulated paths into the statistics"""
+        self.sketch.add(paths)
+        self.path_sums += paths.sum(axis=0)
+        self.paths += len(paths)
+        self.above_start += int(np.count_nonzero(paths[:, -1] > self.last_price))
+        self.max_drawdown = max(self.max_drawdown, float(np.max(max_drawdowns(paths))))
+        if len(self.sample_paths) < self.keep_paths:
+            missing = self.keep_paths - len(self.sample_paths)
+            self.sample_paths = np.concatenate([self.sample_paths, paths[:missing]])
+
+    def merge(self, other):
+        """Fold in statistics of paths simulated elsewhere (e.g. another process)"""
+        self.sketch.merge(other.sketch)
+        self.path_sums += other.path_sums
+        self.paths += other.paths
+        self.above_start += other.above_start
+        self.max_drawdown = max(self.max_drawdown, other.max_drawdown)
+        if len(self.sample_paths) < self.keep_paths:
+            missing = self.keep_paths - len(self.sample_paths)
+            self.sample_paths = np.concatenate([self.sample_paths, other.sample_paths[:missing]])
+        return self
+
+    def summary(self, confidence_level):
+        """The summarize_paths statistics (confidence_level in percent)"""
+        lower_percentile = (100 - confidence_level) / 2
+        mean_path = self.path_sums / self.paths
+        prob_increase = self.above_start / self.paths
+        expected_price = mean_path[-1]
+        expected_change = expected_price - self.last_price
+
+        return {
+            "mean_path": mean_path,
+            "lower_bound": self.sketch.percentile(lower_percentile),
+            "upper_bound": self.sketch.percentile(100 - lower_percentile),
+            "median_path": self.sketch.quantile(0.5),
+            "prob_increase": prob_increase,
+            "expected_price": expected_price,
+            "expected_change": expected_change,
+            "expected_change_pct": (expected_change / self.last_price) * 100,
+            "signal": monte_carlo_signal(prob_increase)
+        }
+
+    def risk(self, confidence_level):
+        """The risk_metrics values (confidence_level as a fraction) for the final period"""
+        var_price = self.sketch.quantile(1 - confidence_level)[-1]
+        shortfall_price = self.sketch.lower_tail_mean(1 - confidence_level, column=self.horizon - 1)
+        return {
+            "var": var_price / self.last_price - 1,
+            "expected_shortfall": shortfall_price / self.last_price - 1,
+            "max_drawdown": self.max_drawdown,
+            "prob_profit": self.above_start / self.paths
+        }
+
+
+def simulate_streaming(last_price, mean_return, std_return, num_simulations, horizon, rng=None, scheme='plain',
+                       chunk_size=4096, relative_accuracy=0.0001, keep_paths=10):
+    """
+    Simulate paths in fixed-size chunks into a StreamingPathStats.
+
+    Memory is one chunk plus the sketch, whatever num_simulations is. With
+    the plain scheme the chunks draw the same normals as one simulate_paths
+    call on the same generator, so the kept sample paths are identical.
+    """
+    rng = make_rng(rng)
+    stats = StreamingPathStats(last_price, horizon, relative_accuracy, keep_paths)
+    remaining = num_simulations
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        stats.add(paths_from_normals(last_price, mean_return, std_return, draw_normals(rng, size, horizon, scheme)))
+        remaining -= size
+    return stats
+
+
+def _reference_paths(last_price, mean_return, std_return, num_simulations, horizon, rng):
+    """Per-step loop the kernel replaces, drawing one normal at a time"""
+    simulation_results = np.zeros((num_simulations, horizon))
+    for sim in range(num_simulations):
+        price = last_price
+        for t in range(horizon):
+            random_return = rng.normal(mean_return, std_return)
+            price = price * (1 + random_return)
+            simulation_results[sim, t] = price
+    return simulation_results
+
+
+def check_reference(seed=42, num_simulations=1000, horizon=10):
+    """Compare the kernel with the per-step loop for one seed and print whether they match bit for bit"""
+    last_price, mean_return, std_return = 60000.0, 0.00002, 0.0015
+
+    reference = _reference_paths(last_price, mean_return, std_return, num_simulations, horizon,
+                                 make_rng(seed))
+    vectorized = simulate_paths(last_price, mean_return, std_return, num_simulations, horizon,
+                                make_rng(seed))
+
+    identical = np.array_equal(reference, vectorized)
+    print(f"Kernel vs per-step loop ({num_simulations} x {horizon}, seed {seed}): "
+          f"{'bit-identical' if identical else 'max abs diff ' + str(np.max(np.abs(reference - vectorized)))}")
+    return identical
+
+
+def benchmark(schemes=SAMPLING_SCHEMES, num_simulations=1000, horizon=10, repeats=200, confidence_level=90):
+    """
+    Standard error of prob_increase and of the final-period bands per scheme.
+
+    Each scheme is run `repeats` times with independent seeds. The spread of
+    the estimates across runs is the standard error at that path count, and
+    se^2 x ms (variance times cost) is the work-normalized figure to compare:
+    a scheme with half of plain's se^2 x ms reaches the same precision with
+    half the CPU time.
+    """
+    last_price, mean_return, std_return = 60000.0, 0.00002, 0.0015
+    print(f"Sampling scheme benchmark: {num_simulations} paths x {horizon} periods, {repeats} runs each")
+    print(f"{'scheme':<11} {'ms/run':>8} {'se(prob)':>10} {'se(lower)':>10} {'se(upper)':>10} "
+          f"{'se2*ms(prob)':>13} {'se2*ms(bands)':>14}")
+
+    results = {}
+    for scheme in schemes:
+        estimates = np.empty((repeats, 3))
+        elapsed = 0.0
+        for i in range(repeats):
+            rng = make_rng(i)
+            start = time.perf_counter()
+            paths = simulate_paths(last_price, mean_return, std_return, num_simulations, horizon, rng, scheme)
+            stats = summarize_paths(paths, last_price, confidence_level)
+            elapsed += time.perf_counter() - start
+            estimates[i] = stats['prob_increase'], stats['lower_bound'][-1], stats['upper_bound'][-1]
+
+        ms_per_run = elapsed / repeats * 1000
+        se = estimates.std(axis=0, ddof=1)
+        results[scheme] = {
+            'ms_per_run': ms_per_run,
+            'se_prob_increase': float(se[0]),
+            'se_lower_bound': float(se[1]),
+            'se_upper_bound': float(se[2]),
+            'work_variance_prob': float(se[0] ** 2 * ms_per_run),
+            'work_variance_bands': float((se[1] ** 2 + se[2] ** 2) / 2 * ms_per_run)
+        }
+        r = results[scheme]
+        print(f"{scheme:<11} {ms_per_run:>8.3f} {se[0]:>10.5f} {se[1]:>10.3f} {se[2]:>10.3f} "
+              f"{r['work_variance_prob']:>13.3e} {r['work_variance_bands']:>14.3e}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check and benchmark the vectorized Monte Carlo kernel')
+    parser.add_argument('command', nargs='?', choices=['check', 'bench'], default='check')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--simulations', type=int, default=1000)
+    parser.add_argument('--horizon', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=200, help='Independent runs per scheme for bench')
+    parser.add_argument('--schemes', type=str, nargs='+', default=SAMPLING_SCHEMES, choices=SAMPLING_SCHEMES)
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        benchmark(args.schemes, args.simulations, args.horizon, args.repeats)
+        raise SystemExit(0)
+
+    raise SystemExit(0 if check_reference(args.seed, args.simulations, args.horizon) else 1)
@@ -2,6 +2,7 @@ def get_indicator_data(candles):
     import pandas as pd
     import pandas_ta as ta
     import numpy as np
+    from candle_buffer import has_column, get_column
     
     # Import configuration from main
     from main import RSI_OVERSOLD, RSI_OVERBOUGHT, EMA_SHORT, EMA_MEDIUM, EMA_LONG
@@ -9,7 +10,13 @@ def get_indicator_data(candles):
     if not candles or len(candles) == 0:
         return {"signal": "NEUTRAL", "rsi": None, "price": None, "ema_signal": None}
     
-    df = pd.DataFrame(candles)
+    df = pd.DataFrame({
+        'close': get_column(candles, 'close'),
+        'rsi': get_column(candles, 'rsi')
+    })
+    for ema_column in (f'ema{EMA_SHORT}', f'ema{EMA_MEDIUM}', f'ema{EMA_LONG}'):
+        if has_column(candles, ema_column):
+            df[ema_column] = get_column(candles, ema_column)
     
     if f'ema{EMA_SHORT}' not in df.columns:
         df[f'ema{EMA_SHORT}'] = ta.ema(df['close'], length=EMA_SHORT)
@@ -1,4 +1,5 @@
 # my_jusitification.py
+import numbers
 import os
 from dotenv import load_dotenv
 import google.generativeai as genai
@@ -12,31 +13,18 @@ GEMINI_API_KEY = os.environ.get("GOOGLE_API_KEY", "your_api_key_here")
 # Initialize the Gemini client
 genai.configure(api_key=GEMINI_API_KEY)
 
-def get_justification(lstm_data, indicator_data, monte_carlo_data, order_data):
-    from main import TRADING_SYMBOL
-  
-    print("\n============ JUSTIFICATION GENERATOR ============\n")
-    """
-    Generate trading decision justification using Google's Gemini API with the SDK
-    
-    Parameters:
-    lstm_data: Dictionary containing LSTM prediction results
-    indicator_data: Dictionary containing technical indicator results
-    monte_carlo_data: Dictionary containing Monte Carlo simulation results
-    order_data: Dictionary containing the generated order details
-    
-    Returns:
-    String with AI-generated justification for the trading decision
-    """
-    # Check if we have valid data
-    if not all([lstm_data, indicator_data, monte_carlo_data]):
-        return "Insufficient data for justification generation."
-    
-    # Create client for the model
-    client = genai.GenerativeModel("gemini-2.0-flash-lite")
-    
-    # Format the market data for the prompt
-    market_summary = {
+def _number(value, spec):
+    """format(value, spec), or 'n/a' for a missing analysis value"""
+    return format(value, spec) if isinstance(value, numbers.Real) else "n/a"
+
+def _price(value):
+    return f"${value:.2f}" if isinstance(value, numbers.Real) else "n/a"
+
+def _has_levels(order_data):
+    return all(isinstance(order_data.get(field), numbers.Real) for field in ("price", "stopLoss", "takeProfit"))
+
+def _market_summary(lstm_data, indicator_data, monte_carlo_data):
+    return {
         "current_price": indicator_data.get("price"),
         "lstm_signal": lstm_data.get("signal"),
         "lstm_trend": lstm_data.get("trend"),
@@ -49,8 +37,8 @@ def get_justification(lstm_data, indicator_data, monte_carlo_data, order_data):
         "monte_carlo_probability": monte_carlo_data.get("prob_increase"),
         "monte_carlo_expected_price": monte_carlo_data.get("expected_price")
     }
-    
-    # Format the order details for the prompt
+
+def _order_summary(order_data):
     order_summary = {
         "decision": "BUY" if order_data else "NO TRADE",
     }
@@ -63,8 +51,73 @@ def get_justification(lstm_data, indicator_data, monte_carlo_data, order_data):
             "take_profit": order_data.get("takeProfit"),
             "risk_reward_ratio": (order_data.get("takeProfit") - order_data.get("price")) / 
                                 (order_data.get("price") - order_data.get("stopLoss"))
-                                if order_data.get("price") != order_data.get("stopLoss") else 0
+                                if _has_levels(order_data) and order_data.get("price") != order_data.get("stopLoss")
+                                else 0
         })
+    return order_summary
+
+def template_justification(lstm_data, indicator_data, monte_carlo_data, order_data):
+    """
+    Build a justification from the analysis values alone, without calling Gemini.
+    
+    Used when the API is slow or failing so every order still gets an explanation.
+    """
+    from main import TRADING_SYMBOL
+    
+    if not all([lstm_data, indicator_data, monte_carlo_data]):
+        return "Insufficient data for justification generation."
+    
+    market_summary = _market_summary(lstm_data, indicator_data, monte_carlo_data)
+    order_summary = _order_summary(order_data)
+    
+    # Analyzers report None for values they could not compute (e.g. RSI during warm-up)
+    text = (
+        f"{order_summary['decision']} {TRADING_SYMBOL} at {_price(market_summary['current_price'])}. "
+        f"The LSTM model signals {market_summary['lstm_signal']} with a {market_summary['lstm_trend']} trend "
+        f"(strength {_number(market_summary['lstm_trend_strength'], '.2f')}) and a target of "
+        f"{_price(market_summary['target_price'])}. "
+        f"RSI is {_number(market_summary['rsi_value'], '.2f')} ({market_summary['rsi_signal']}), the EMA signal is "
+        f"{market_summary['ema_signal']}, and the Monte Carlo simulation gives a "
+        f"{_number(market_summary['monte_carlo_probability'], '.2%')} probability of increase "
+        f"({market_summary['monte_carlo_signal']}, expected {_price(market_summary['monte_carlo_expected_price'])})."
+    )
+    
+    if order_data:
+        text += (
+            f"\n\nThe position of {order_summary['quantity']} {TRADING_SYMBOL.replace('USDT', '')} enters at "
+            f"{_price(order_summary['entry_price'])} with a stop loss at {_price(order_summary['stop_loss'])} and a take "
+            f"profit at {_price(order_summary['take_profit'])}, a risk/reward ratio of "
+            f"1:{_number(order_summary['risk_reward_ratio'], '.2f')}."
+        )
+    
+    return text
+
+def get_justification(lstm_data, indicator_data, monte_carlo_data, order_data):
+    from main import TRADING_SYMBOL, JUSTIFICATION_TIMEOUT_SECONDS
+  
+    print("\n============ JUSTIFICATION GENERATOR ============\n")
+    """
+    Generate trading decision justification using Google's Gemini API with the SDK
+    
+    Parameters:
+    lstm_data: Dictionary containing LSTM prediction results
+    indicator_data: Dictionary containing technical indicator results
+    monte_carlo_data: Dictionary containing Monte Carlo simulation results
+    order_data: Dictionary containing the generated order details
+    
+    Returns:
+    String with AI-generated justification for the trading decision (raises if the API call fails)
+    """
+    # Check if we have valid data
+    if not all([lstm_data, indicator_data, monte_carlo_data]):
+        return "Insufficient data for justification generation."
+    
+    # Create client for the model
+    client = genai.GenerativeModel("gemini-2.0-flash-lite")
+    
+    # Format the market data and order details for the prompt
+    market_summary = _market_summary(lstm_data, indicator_data, monte_carlo_data)
+    order_summary = _order_summary(order_data)
     
     # Create the prompt for Gemini
     prompt = f"""
@@ -97,6 +150,8 @@ def get_justification(lstm_data, indicator_data, monte_carlo_data, order_data):
         
         Please provide a 2-3 paragraph justification for this trading decision that explains the technical 
         analysis behind it, the risk management approach, and the market outlook. Be concise but thorough.
+        Refer to the signals, percentages and ratios rather than exact dollar prices, since the same
+        justification is reused for similar setups.
         """
     else:
         prompt += """
@@ -115,12 +170,14 @@ def get_justification(lstm_data, indicator_data, monte_carlo_data, order_data):
         
         response = client.generate_content(
             contents=prompt,
-            generation_config=generation_config
+            generation_config=generation_config,
+            request_options={"timeout": JUSTIFICATION_TIMEOUT_SECONDS}
         )
       
         # Get the response text
         return response.text.strip()
         
     except Exception as e:
+        # JustificationWorker falls back to template_justification
         print(f"Exception when calling Gemini API: {e}")
-        return f"Failed to generate justification: {str(e)}"
\ No newline at end of file
+        raise
\ No newline at end of file
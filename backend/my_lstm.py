@@ -1,11 +1,155 @@
-import os
+import time
 import numpy as np
-import tensorflow as tf
-import joblib
 import pandas as pd
+from candle_buffer import has_column, get_column, get_columns
+from model_registry import model_registry
+from prediction_cache import prediction_cache, data_hash
+
+FEATURE_COLUMNS = ['close', 'volume', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume',
+                   'rsi', 'macd', 'macd_signal', 'upper_band', 'lower_band']
+
+TREND_NAMES = np.array(["SIDEWAYS", "STRONG_UPTREND", "UPTREND", "STRONG_DOWNTREND", "DOWNTREND",
+                        "WEAK_UPTREND", "WEAK_DOWNTREND"])
+SIGNAL_NAMES = np.array(["HOLD", "BUY", "SELL"])
+
+
+def _inverse_scale_predictions(predicted_scaled, close_scaler):
+    """(windows, horizon) prices from a 2-D or 3-D batch of scaled predictions in one inverse_transform"""
+    if predicted_scaled.ndim == 3:
+        predicted_scaled = predicted_scaled[:, :, 0]
+    windows, horizon = predicted_scaled.shape
+    prices = close_scaler.inverse_transform(predicted_scaled.reshape(-1, 1))
+    return prices.reshape(windows, horizon)
+
+
+def _summarize_forecasts(predicted_prices, last_prices):
+    """
+    Trend, signal and target post-processing for a batch of forecasts.
+
+    predicted_prices is (windows, horizon) and last_prices is (windows,). Both
+    get_lstm_output and get_lstm_outputs go through this, so a window gets the
+    same response whether it was predicted alone or in a batch.
+    """
+    predicted_prices = np.asarray(predicted_prices, dtype=float)
+    last_prices = np.asarray(last_prices, dtype=float)
+    windows, horizon = predicted_prices.shape
+    first_prices = predicted_prices[:, 0]
+
+    immediate_change = first_prices - last_prices
+    avg_predicted = predicted_prices.mean(axis=1)
+    overall_change = avg_predicted - last_prices
+    overall_percentage = overall_change / last_prices * 100
+    endpoint_change = predicted_prices[:, -1] - first_prices
+
+    # Least-squares line through each forecast (np.polyfit(x, y, 1) row by row)
+    x = np.arange(horizon, dtype=float)
+    x_centered = x - x.mean()
+    y_centered = predicted_prices - avg_predicted[:, np.newaxis]
+    slope = y_centered @ x_centered / (x_centered @ x_centered)
+    intercept = avg_predicted - slope * x.mean()
+
+    residuals = predicted_prices - (slope[:, np.newaxis] * x + intercept[:, np.newaxis])
+    ss_res = np.sum(residuals ** 2, axis=1)
+    ss_tot = np.sum(y_centered ** 2, axis=1)
+
+    flat = np.all(predicted_prices == first_prices[:, np.newaxis], axis=1)
+    slope = np.where(flat, 0.0, slope)
+    intercept = np.where(flat, first_prices, intercept)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r_squared = np.where(flat | (ss_tot == 0), np.nan, 1 - ss_res / ss_tot)
+    trend_strength = np.where(np.isnan(r_squared), 0.0, np.abs(r_squared))
+
+    strong = trend_strength > 0.7
+    trend_index = np.select(
+        [overall_percentage > 0.10, overall_percentage < -0.10, overall_percentage > 0.04, overall_percentage < -0.04],
+        [np.where(strong, 1, 2), np.where(strong, 3, 4), 5, 6],
+        default=0
+    )
+    uptrend = (trend_index == 1) | (trend_index == 2) | (trend_index == 5)
+    downtrend = (trend_index == 3) | (trend_index == 4) | (trend_index == 6)
+
+    confidence = np.minimum(trend_strength * 0.8 + 0.2, 1.0)
+    weight = 0.5 + (0.5 * confidence)
+    max_prices = predicted_prices.max(axis=1)
+    min_prices = predicted_prices.min(axis=1)
+
+    # Strong linear trends project two candles past the horizon, dampened by confidence
+    projection_point = horizon + 2
+    projected = intercept + slope * projection_point
+    final_projection = last_prices + (projected - last_prices) * (0.7 + (0.3 * confidence))
+    project_up = uptrend & (trend_strength > 0.6) & (slope > 0)
+    project_down = downtrend & (trend_strength > 0.6) & (slope < 0)
+
+    closest_idx = np.argmin(np.abs(predicted_prices - avg_predicted[:, np.newaxis]), axis=1)
+    target_price = np.select(
+        [project_up, uptrend, project_down, downtrend],
+        [np.minimum(final_projection, max_prices * 1.05),
+         weight * max_prices + (1 - weight) * avg_predicted,
+         np.maximum(final_projection, min_prices * 0.95),
+         weight * min_prices + (1 - weight) * avg_predicted],
+        default=avg_predicted
+    )
+    target_candle = np.select(
+        [project_up | project_down, uptrend, downtrend],
+        [min(horizon, projection_point), predicted_prices.argmax(axis=1) + 1, predicted_prices.argmin(axis=1) + 1],
+        default=closest_idx + 1
+    )
+
+    immediate_percentage = immediate_change / last_prices * 100
+    signal_index = np.select(
+        [(trend_index == 1) | (trend_index == 2), (trend_index == 3) | (trend_index == 4),
+         (trend_index == 5) & (immediate_percentage > 0.04), (trend_index == 6) & (immediate_percentage < -0.04)],
+        [1, 2, 1, 2],
+        default=0
+    )
+    target_change = target_price - last_prices
+
+    return {
+        'predicted_prices': predicted_prices,
+        'immediate_price_change': immediate_change,
+        'immediate_percentage_change': immediate_percentage,
+        'average_predicted_price': avg_predicted,
+        'overall_change': overall_change,
+        'overall_percentage_change': overall_percentage,
+        'endpoint_change': endpoint_change,
+        'endpoint_percentage_change': endpoint_change / first_prices * 100,
+        'trend': TREND_NAMES[trend_index],
+        'trend_strength': trend_strength,
+        'signal': SIGNAL_NAMES[signal_index],
+        'target_price': target_price,
+        'target_candle': target_candle,
+        'target_change': target_change,
+        'target_percentage': target_change / last_prices * 100,
+        'target_confidence': confidence,
+        'flat': flat,
+        'r_squared': r_squared
+    }
+
+
+def _forecast_response(summary, index):
+    """The get_lstm_output response dict for one window of a _summarize_forecasts result"""
+    return {
+        "predicted_prices": summary['predicted_prices'][index].tolist(),
+        "immediate_price_change": float(summary['immediate_price_change'][index]),
+        "immediate_percentage_change": float(summary['immediate_percentage_change'][index]),
+        "average_predicted_price": float(summary['average_predicted_price'][index]),
+        "overall_change": float(summary['overall_change'][index]),
+        "overall_percentage_change": float(summary['overall_percentage_change'][index]),
+        "endpoint_change": float(summary['endpoint_change'][index]),
+        "endpoint_percentage_change": float(summary['endpoint_percentage_change'][index]),
+        "trend": str(summary['trend'][index]),
+        "trend_strength": float(summary['trend_strength'][index]),
+        "signal": str(summary['signal'][index]),
+        "target_price": float(summary['target_price'][index]),
+        "target_candle": int(summary['target_candle'][index]),
+        "target_change": float(summary['target_change'][index]),
+        "target_percentage": float(summary['target_percentage'][index]),
+        "target_confidence": float(summary['target_confidence'][index])
+    }
+
 
 def get_lstm_output(candles):
-    from main import LSTM_INPUT_SEQUENCE, LSTM_OUTPUT_SEQUENCE, LSTM_MODEL_DIR
+    from main import LSTM_INPUT_SEQUENCE, LSTM_OUTPUT_SEQUENCE, LSTM_MODEL_DIR, LSTM_BACKEND
     
     print("LSTM Model Analysis")
     print(f"Total candles available: {len(candles)}")
@@ -39,27 +183,21 @@ def get_lstm_output(candles):
         return None
     
     try:
-        model_dir = LSTM_MODEL_DIR
-        model_path = os.path.join(model_dir, "crypto_lstm_model_multi_step.h5")
-        feature_scaler_path = os.path.join(model_dir, "feature_scaler_multi_step.save")
-        close_scaler_path = os.path.join(model_dir, "close_scaler_multi_step.save")
-        
-        model = tf.keras.models.load_model(model_path)
-        feature_scaler = joblib.load(feature_scaler_path)
-        close_scaler = joblib.load(close_scaler_path)
-        
-        print("\nLSTM Multi-Step Model Loaded Successfully")
+        bundle = model_registry.get(LSTM_MODEL_DIR,
+                                    "crypto_lstm_model_multi_step.h5",
+                                    "feature_scaler_multi_step.save",
+                                    "close_scaler_multi_step.save",
+                                    backend=LSTM_BACKEND)
+        model = bundle.model
+        feature_scaler = bundle.feature_scaler
+        close_scaler = bundle.close_scaler
         
-        df = pd.DataFrame(candles)
-        feature_columns = ['close', 'volume', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume',
-                           'rsi', 'macd', 'macd_signal', 'upper_band', 'lower_band']
-        
-        for col in feature_columns:
-            if col not in df.columns:
+        for col in FEATURE_COLUMNS:
+            if not has_column(candles, col):
                 print(f"Warning: Missing required column '{col}' for prediction")
                 return None
         
-        last_sequence = df[feature_columns].tail(LSTM_INPUT_SEQUENCE).values
+        last_sequence = get_columns(candles, FEATURE_COLUMNS)[-LSTM_INPUT_SEQUENCE:]
         
         last_sequence_scaled = feature_scaler.transform(last_sequence)
         
@@ -71,24 +209,13 @@ def get_lstm_output(candles):
         
         print(f"Prediction output shape: {predicted_scaled.shape}")
         
-        if len(predicted_scaled.shape) == 3:
+        if len(predicted_scaled.shape) in (2, 3):
             forecast_horizon = predicted_scaled.shape[1]
-            predicted_prices = np.zeros(forecast_horizon)
-            
-            for i in range(forecast_horizon):
-                step_prediction = predicted_scaled[0, i].reshape(-1, 1)
-                predicted_prices[i] = close_scaler.inverse_transform(step_prediction)[0, 0]
-                
-        elif len(predicted_scaled.shape) == 2:
-            forecast_horizon = predicted_scaled.shape[1]
-            predicted_prices = np.zeros(forecast_horizon)
-            
-            for i in range(forecast_horizon):
-                step_prediction = np.array([[predicted_scaled[0, i]]])
-                predicted_prices[i] = close_scaler.inverse_transform(step_prediction)[0, 0]
+            predicted_prices = _inverse_scale_predictions(predicted_scaled, close_scaler)[0]
                 
         else:
             print(f"Unexpected prediction shape: {predicted_scaled.shape}")
+            forecast_horizon = LSTM_OUTPUT_SEQUENCE
             predicted_prices = np.zeros(LSTM_OUTPUT_SEQUENCE)
             
             try:
@@ -98,118 +225,21 @@ def get_lstm_output(candles):
                 print(f"Using single value prediction: {single_price}")
             except Exception as reshape_error:
                 print(f"Error reshaping prediction: {reshape_error}")
-                last_known_price = df['close'].iloc[-1]
+                last_known_price = get_column(candles, 'close')[-1]
                 predicted_prices.fill(last_known_price)
                 print(f"Fallback to last known price: {last_known_price}")
         
-        last_known_price = df['close'].iloc[-1]
-        
-        immediate_change = predicted_prices[0] - last_known_price
-        immediate_percentage = (immediate_change / last_known_price) * 100
-        
-        avg_predicted_price = np.mean(predicted_prices)
-        overall_change = avg_predicted_price - last_known_price
-        overall_percentage = (overall_change / last_known_price) * 100
+        last_known_price = get_column(candles, 'close')[-1]
         
-        first_price = predicted_prices[0]
-        last_price = predicted_prices[-1]
-        endpoint_change = last_price - first_price
-        endpoint_percentage = (endpoint_change / first_price) * 100
+        summary = _summarize_forecasts(predicted_prices[np.newaxis, :], np.array([last_known_price]))
+        response = _forecast_response(summary, 0)
         
-        x = np.arange(len(predicted_prices))
-        y = predicted_prices
-        
-        if np.all(predicted_prices == predicted_prices[0]):
+        if summary['flat'][0]:
             print("All predicted prices are identical - setting trend strength to 0")
-            trend_strength = 0.0
-            slope = 0.0
-            intercept = predicted_prices[0]
-        else:
-            try:
-                slope, intercept = np.polyfit(x, y, 1)
-                
-                y_pred = slope * x + intercept
-                y_mean = np.mean(y)
-                
-                ss_res = np.sum((y - y_pred) ** 2)
-                ss_tot = np.sum((y - y_mean) ** 2)
-                
-                if ss_tot == 0:
-                    print("No variance in predicted prices - setting trend strength to 0")
-                    trend_strength = 0.0
-                else:
-                    r_squared = 1 - (ss_res / ss_tot)
-                    trend_strength = abs(r_squared)
-                    print(f"Calculated R²: {r_squared:.4f}, Trend strength: {trend_strength:.4f}")
-                    
-            except Exception as fit_error:
-                print(f"Error in trend calculation: {fit_error}")
-                trend_strength = 0.0
-                slope = 0.0
-                intercept = predicted_prices[0] if len(predicted_prices) > 0 else last_known_price
-        
-        if overall_percentage > 0.10:
-            trend = "STRONG_UPTREND" if trend_strength > 0.7 else "UPTREND"
-        elif overall_percentage < -0.10:
-            trend = "STRONG_DOWNTREND" if trend_strength > 0.7 else "DOWNTREND"
-        elif overall_percentage > 0.04:
-            trend = "WEAK_UPTREND"
-        elif overall_percentage < -0.04:
-            trend = "WEAK_DOWNTREND"
-        else:
-            trend = "SIDEWAYS"
-        
-        target_candle = 0
-        
-        confidence = min(trend_strength * 0.8 + 0.2, 1.0)
-        
-        if "UPTREND" in trend:
-            if trend_strength > 0.6 and slope > 0:
-                projection_point = forecast_horizon + 2
-                projected_price = intercept + slope * projection_point
-                dampening = 0.7 + (0.3 * confidence)
-                final_projection = last_known_price + (projected_price - last_known_price) * dampening
-                target_price = float(min(final_projection, np.max(predicted_prices) * 1.05))
-                target_candle = min(forecast_horizon, int(projection_point))
-            else:
-                max_price = np.max(predicted_prices)
-                max_idx = np.argmax(predicted_prices)
-                weight = 0.5 + (0.5 * confidence)
-                target_price = float(weight * max_price + (1-weight) * avg_predicted_price)
-                target_candle = int(max_idx) + 1
-        elif "DOWNTREND" in trend:
-            if trend_strength > 0.6 and slope < 0:
-                projection_point = forecast_horizon + 2
-                projected_price = intercept + slope * projection_point
-                dampening = 0.7 + (0.3 * confidence)
-                final_projection = last_known_price + (projected_price - last_known_price) * dampening
-                target_price = float(max(final_projection, np.min(predicted_prices) * 0.95))
-                target_candle = min(forecast_horizon, int(projection_point))
-            else:
-                min_price = np.min(predicted_prices)
-                min_idx = np.argmin(predicted_prices)
-                weight = 0.5 + (0.5 * confidence)
-                target_price = float(weight * min_price + (1-weight) * avg_predicted_price)
-                target_candle = int(min_idx) + 1
+        elif np.isnan(summary['r_squared'][0]):
+            print("No variance in predicted prices - setting trend strength to 0")
         else:
-            target_price = float(avg_predicted_price)
-            closest_idx = np.argmin(np.abs(predicted_prices - target_price))
-            target_candle = int(closest_idx) + 1
-        
-        target_change = target_price - last_known_price
-        target_percentage = (target_change / last_known_price) * 100
-        target_confidence = confidence
-        
-        if trend in ["STRONG_UPTREND", "UPTREND"]:
-            signal = "BUY"
-        elif trend in ["STRONG_DOWNTREND", "DOWNTREND"]:
-            signal = "SELL"
-        elif trend == "WEAK_UPTREND" and immediate_percentage > 0.04:
-            signal = "BUY"
-        elif trend == "WEAK_DOWNTREND" and immediate_percentage < -0.04:
-            signal = "SELL"
-        else:
-            signal = "HOLD"
+            print(f"Calculated R²: {summary['r_squared'][0]:.4f}, Trend strength: {response['trend_strength']:.4f}")
         
         print("\n=======LSTM Multi-Step Price Prediction=======")
         print(f"Last known price: ${last_known_price:.2f}")
@@ -217,39 +247,110 @@ def get_lstm_output(candles):
         for i, price in enumerate(predicted_prices):
             print(f"  Candle {i+1}: ${price:.2f}")
         
-        print(f"\nImmediate change (next candle): ${immediate_change:.2f} ({immediate_percentage:.2f}%)")
-        print(f"Average predicted price: ${avg_predicted_price:.2f}")
-        print(f"Overall change (avg vs last known): ${overall_change:.2f} ({overall_percentage:.2f}%)")
-        print(f"Endpoint change (candle {forecast_horizon} vs candle 1): ${endpoint_change:.2f} ({endpoint_percentage:.2f}%)")
-        print(f"Overall trend: {trend}")
-        print(f"Trend strength: {trend_strength:.2f}")
-        print(f"Trading signal: {signal}")
-        print(f"Target price: ${target_price:.2f} (Candle {target_candle})")
-        print(f"Target change: ${target_change:.2f} ({target_percentage:.2f}%)")
-        print(f"Target confidence: {target_confidence:.2f}")
-        
-        return {
-            "predicted_prices": predicted_prices.tolist(),
-            "immediate_price_change": float(immediate_change),
-            "immediate_percentage_change": float(immediate_percentage),
-            "average_predicted_price": float(avg_predicted_price),
-            "overall_change": float(overall_change),
-            "overall_percentage_change": float(overall_percentage),
-            "endpoint_change": float(endpoint_change),
-            "endpoint_percentage_change": float(endpoint_percentage),
-            "trend": trend,
-            "trend_strength": float(trend_strength),
-            "signal": signal,
-            "target_price": target_price,
-            "target_candle": target_candle,
-            "target_change": float(target_change),
-            "target_percentage": float(target_percentage),
-            "target_confidence": target_confidence
-        }
+        print(f"\nImmediate change (next candle): ${response['immediate_price_change']:.2f} ({response['immediate_percentage_change']:.2f}%)")
+        print(f"Average predicted price: ${response['average_predicted_price']:.2f}")
+        print(f"Overall change (avg vs last known): ${response['overall_change']:.2f} ({response['overall_percentage_change']:.2f}%)")
+        print(f"Endpoint change (candle {forecast_horizon} vs candle 1): ${response['endpoint_change']:.2f} ({response['endpoint_percentage_change']:.2f}%)")
+        print(f"Overall trend: {response['trend']}")
+        print(f"Trend strength: {response['trend_strength']:.2f}")
+        print(f"Trading signal: {response['signal']}")
+        print(f"Target price: ${response['target_price']:.2f} (Candle {response['target_candle']})")
+        print(f"Target change: ${response['target_change']:.2f} ({response['target_percentage']:.2f}%)")
+        print(f"Target confidence: {response['target_confidence']:.2f}")
+        
+        return response
         
     except Exception as e:
         print(f"Error making LSTM prediction: {e}")
         import traceback
         traceback.print_exc()
 
-        return None
\ No newline at end of file
+        return None
+
+
+def get_lstm_outputs(data, end_indices=None, batch_size=None, use_cache=True):
+    """
+    Batched get_lstm_output for backtests.
+
+    data is a DataFrame (or candle window / list of candle dicts) holding the
+    LSTM feature columns. Every input window is a strided view over the scaled
+    feature matrix, scaled once, predicted in batches of batch_size and
+    post-processed together. Returns {end_index: response}, where a window
+    ending at row end_index gets the same response get_lstm_output would give
+    for the candles up to and including that row.
+
+    With use_cache, forecasts are read from and written to the on-disk
+    prediction cache, so rerunning a backtest over the same data skips
+    inference for every window it has already seen.
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+    from main import LSTM_INPUT_SEQUENCE, LSTM_MODEL_DIR, LSTM_BACKEND, LSTM_BATCH_SIZE
+
+    batch_size = batch_size or LSTM_BATCH_SIZE
+
+    if isinstance(data, pd.DataFrame):
+        missing = [col for col in FEATURE_COLUMNS if col not in data.columns]
+        features = data[[col for col in FEATURE_COLUMNS if col not in missing]].to_numpy(dtype=float)
+        closes = data['close'].to_numpy(dtype=float)
+    else:
+        missing = [col for col in FEATURE_COLUMNS if not has_column(data, col)]
+        features = get_columns(data, FEATURE_COLUMNS) if not missing else None
+        closes = get_column(data, 'close')
+
+    if missing:
+        print(f"Warning: Missing required columns {missing} for prediction")
+        return {}
+
+    if end_indices is None:
+        end_indices = np.arange(LSTM_INPUT_SEQUENCE - 1, len(features))
+    end_indices = np.asarray(end_indices, dtype=int)
+    end_indices = end_indices[(end_indices >= LSTM_INPUT_SEQUENCE - 1) & (end_indices < len(features))]
+    if len(end_indices) == 0:
+        print(f"Not enough candles for LSTM prediction (need at least {LSTM_INPUT_SEQUENCE})")
+        return {}
+
+    bundle = model_registry.get(LSTM_MODEL_DIR,
+                                "crypto_lstm_model_multi_step.h5",
+                                "feature_scaler_multi_step.save",
+                                "close_scaler_multi_step.save",
+                                backend=LSTM_BACKEND)
+
+    # Scaling is per-column, so scaling the whole matrix once equals scaling every window
+    scaled = bundle.feature_scaler.transform(features)
+    # (windows, timesteps, features) view; window i covers rows i .. i + LSTM_INPUT_SEQUENCE - 1
+    windows = sliding_window_view(scaled, LSTM_INPUT_SEQUENCE, axis=0).transpose(0, 2, 1)
+
+    hit_mask = np.zeros(len(end_indices), dtype=bool)
+    if use_cache:
+        cache_key = prediction_cache.key(bundle.checksum, LSTM_BACKEND, data_hash(features), LSTM_INPUT_SEQUENCE)
+        hit_mask, cached_prices = prediction_cache.lookup(cache_key, end_indices)
+    missing = end_indices[~hit_mask]
+
+    print(f"LSTM batch prediction for {len(missing)} windows (batch size {batch_size}), "
+          f"{int(hit_mask.sum())} read from the prediction cache")
+    start_time = time.time()
+
+    predicted_prices = []
+    starts = missing - (LSTM_INPUT_SEQUENCE - 1)
+    for offset in range(0, len(starts), batch_size):
+        batch = np.ascontiguousarray(windows[starts[offset:offset + batch_size]], dtype=np.float32)
+        predicted_scaled = bundle.model.predict(batch)
+        predicted_prices.append(_inverse_scale_predictions(predicted_scaled, bundle.close_scaler))
+
+    if predicted_prices:
+        predicted_prices = np.concatenate(predicted_prices)
+        if use_cache:
+            prediction_cache.store(cache_key, missing, predicted_prices)
+
+    if hit_mask.all():
+        all_prices = cached_prices
+    else:
+        all_prices = np.empty((len(end_indices), predicted_prices.shape[1]))
+        all_prices[~hit_mask] = predicted_prices
+        if hit_mask.any():
+            all_prices[hit_mask] = cached_prices
+
+    summary = _summarize_forecasts(all_prices, closes[end_indices])
+    print(f"LSTM batch prediction completed in {time.time() - start_time:.2f} seconds")
+
+    return {int(end_index): _forecast_response(summary, i) for i, end_index in enumerate(end_indices)}
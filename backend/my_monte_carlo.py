@@ -1,9 +1,14 @@
 import numpy as np
-import pandas as pd
+from candle_buffer import get_column
+from monte_carlo_kernel import (make_rng, paths_from_normals, simulate_paths, simulate_adaptive, simulate_streaming,
+                                summarize_paths)
+from mc_rng_pool import normal_pool
 import time
 
 def get_monte_carlo_data(candles):
-    from main import MC_SIMULATIONS, MC_FORECAST_PERIODS, MC_CONFIDENCE_LEVEL
+    from main import (MC_SIMULATIONS, MC_FORECAST_PERIODS, MC_CONFIDENCE_LEVEL, MC_SEED, MC_SAMPLING,
+                      MC_ADAPTIVE, MC_CHUNK_SIZE, MC_MIN_SIMULATIONS, MC_ADAPTIVE_Z, MC_BAND_TOLERANCE,
+                      MC_STREAMING, MC_STREAM_CHUNK_SIZE, MC_SKETCH_ACCURACY)
     
     print("\n============ MONTE CARLO SIMULATION ============\n")
     
@@ -11,8 +16,7 @@ def get_monte_carlo_data(candles):
         print("Not enough candles for Monte Carlo simulation (need at least 30)")
         return None
     
-    df = pd.DataFrame(candles)
-    close_prices = np.array(df['close'])
+    close_prices = get_column(candles, 'close')
     
     returns = np.diff(close_prices) / close_prices[:-1]
     
@@ -28,53 +32,53 @@ def get_monte_carlo_data(candles):
     num_simulations = MC_SIMULATIONS
     forecast_horizon = MC_FORECAST_PERIODS
     
-    simulation_results = np.zeros((num_simulations, forecast_horizon))
-    
-    print(f"Running {num_simulations} simulations for {forecast_horizon} periods...")
     start_time = time.time()
     
-    for sim in range(num_simulations):
-        price = last_price
-        prices = np.zeros(forecast_horizon)
-        
-        for t in range(forecast_horizon):
-            random_return = np.random.normal(mean_return, std_return)
-            price = price * (1 + random_return)
-            prices[t] = price
-        
-        simulation_results[sim] = prices
-    
-    end_time = time.time()
-    print(f"Simulation completed in {end_time - start_time:.2f} seconds")
-    
-    mean_path = np.mean(simulation_results, axis=0)
-    
-    lower_percentile = (100 - MC_CONFIDENCE_LEVEL) / 2
-    upper_percentile = 100 - lower_percentile
-    
-    lower_bound = np.percentile(simulation_results, lower_percentile, axis=0)
-    upper_bound = np.percentile(simulation_results, upper_percentile, axis=0)
-    
-    median_path = np.median(simulation_results, axis=0)
-    
-    final_prices = simulation_results[:, -1]
-    
-    prob_increase = np.mean(final_prices > last_price)
-    
-    expected_price = np.mean(final_prices)
-    expected_change = expected_price - last_price
-    expected_change_pct = (expected_change / last_price) * 100
-    
-    if prob_increase > 0.7:
-        signal = "STRONG_BUY"
-    elif prob_increase > 0.6:
-        signal = "BUY"
-    elif prob_increase < 0.3:
-        signal = "STRONG_SELL"
-    elif prob_increase < 0.4:
-        signal = "SELL"
+    if MC_ADAPTIVE:
+        print(f"Running up to {num_simulations} {MC_SAMPLING} simulations for {forecast_horizon} periods "
+              f"in chunks of {MC_CHUNK_SIZE}...")
+        simulation_results, stop_reason = simulate_adaptive(
+            last_price, mean_return, std_return, num_simulations, forecast_horizon, make_rng(MC_SEED),
+            MC_SAMPLING, chunk_size=MC_CHUNK_SIZE, min_simulations=MC_MIN_SIMULATIONS, z=MC_ADAPTIVE_Z,
+            band_tolerance=MC_BAND_TOLERANCE, confidence_level=MC_CONFIDENCE_LEVEL)
+    elif MC_STREAMING:
+        print(f"Streaming {num_simulations} {MC_SAMPLING} simulations for {forecast_horizon} periods "
+              f"in chunks of {MC_STREAM_CHUNK_SIZE}...")
+        streamed = simulate_streaming(last_price, mean_return, std_return, num_simulations, forecast_horizon,
+                                      make_rng(MC_SEED), MC_SAMPLING, chunk_size=MC_STREAM_CHUNK_SIZE,
+                                      relative_accuracy=MC_SKETCH_ACCURACY, keep_paths=10)
+        stop_reason = 'fixed'
+    elif normal_pool.running and normal_pool.shape == (num_simulations, forecast_horizon):
+        print(f"Running {num_simulations} {MC_SAMPLING} simulations for {forecast_horizon} periods from the normal pool...")
+        with normal_pool.block() as normals:
+            simulation_results = paths_from_normals(last_price, mean_return, std_return, normals)
+        stop_reason = 'fixed'
+    else:
+        print(f"Running {num_simulations} {MC_SAMPLING} simulations for {forecast_horizon} periods...")
+        simulation_results = simulate_paths(last_price, mean_return, std_return,
+                                            num_simulations, forecast_horizon, make_rng(MC_SEED), MC_SAMPLING)
+        stop_reason = 'fixed'
+    
+    if MC_STREAMING and not MC_ADAPTIVE:
+        paths_used = streamed.paths
+        stats = streamed.summary(MC_CONFIDENCE_LEVEL)
+        sample_paths = streamed.sample_paths
     else:
-        signal = "NEUTRAL"
+        paths_used = len(simulation_results)
+        stats = summarize_paths(simulation_results, last_price, MC_CONFIDENCE_LEVEL)
+        sample_paths = simulation_results[:10]
+    end_time = time.time()
+    print(f"Simulation completed in {end_time - start_time:.2f} seconds ({paths_used} paths, stop: {stop_reason})")
+    
+    mean_path = stats["mean_path"]
+    lower_bound = stats["lower_bound"]
+    upper_bound = stats["upper_bound"]
+    median_path = stats["median_path"]
+    prob_increase = stats["prob_increase"]
+    expected_price = stats["expected_price"]
+    expected_change = stats["expected_change"]
+    expected_change_pct = stats["expected_change_pct"]
+    signal = stats["signal"]
     
     print("\nMonte Carlo Simulation Results:")
     print(f"Current price: ${last_price:.2f}")
@@ -85,8 +89,8 @@ def get_monte_carlo_data(candles):
     print(f"\nTrading signal: {signal}")
     
     print("\nSample of simulated price paths:")
-    for i in range(5):
-        print(f"Simulation {i+1}: {[f'${price:.2f}' for price in simulation_results[i]]}")
+    for i, path in enumerate(sample_paths[:5]):
+        print(f"Simulation {i+1}: {[f'${price:.2f}' for price in path]}")
     
     return {
         "signal": signal,
@@ -100,6 +104,9 @@ def get_monte_carlo_data(candles):
         "median_path": median_path.tolist(),
         "prob_increase": float(prob_increase),
         "forecast_horizon": forecast_horizon,
-        "sample_paths": simulation_results[:10].tolist(),
-        "confidence_level": MC_CONFIDENCE_LEVEL
+        "sample_paths": sample_paths.tolist(),
+        "confidence_level": MC_CONFIDENCE_LEVEL,
+        "sampling": MC_SAMPLING,
+        "paths_used": paths_used,
+        "stop_reason": stop_reason
     }
\ No newline at end of file
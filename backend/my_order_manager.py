@@ -1,70 +1,147 @@
 #my order manager.py
 import numpy as np
 import json
-from my_justification import get_justification
 import math
 
-def generate_order(lstm_data, indicator_data, monte_carlo_data):
-    # Import configuration from main module
-    from main import TRADING_AMOUNT, MAX_RISK_PERCENT, TRADING_SYMBOL
+SIGNAL_SCORES = {
+    'STRONG_BUY': 2,
+    'BUY': 1,
+    'HOLD': 0,
+    'NEUTRAL': 0,
+    'SELL': -1,
+    'STRONG_SELL': -2,
+    'OVERSOLD': 0.5,
+    'OVERBOUGHT': -0.5
+}
+
+ORDER_SCORE_THRESHOLD = 0.1  # Combined score a buy needs to exceed
+
+class SignalSource:
+    """One weighted input to the combined score and what it costs to obtain"""
+    def __init__(self, name, analysis, field, weight, cost, score_range):
+        """
+        Parameters:
+        name: Key used in decision_factors
+        analysis: Which analyzer response holds the signal ('indicators', 'monte_carlo' or 'lstm')
+        field: Key of the signal label in that response
+        weight: Weight of the signal's score in the combined score
+        cost: Relative cost of producing the analyzer response (cheapest sources are evaluated first)
+        score_range: (lowest, highest) score the source's labels can map to
+        """
+        self.name = name
+        self.analysis = analysis
+        self.field = field
+        self.weight = weight
+        self.cost = cost
+        self.score_range = score_range
+
+SIGNAL_SOURCES = [
+    SignalSource('rsi', 'indicators', 'rsi_signal', weight=0.25, cost=1, score_range=(-1, 1)),
+    SignalSource('ema', 'indicators', 'ema_signal', weight=0.20, cost=1, score_range=(-2, 2)),
+    SignalSource('monte_carlo', 'monte_carlo', 'signal', weight=0.20, cost=10, score_range=(-2, 2)),
+    SignalSource('lstm', 'lstm', 'signal', weight=0.35, cost=100, score_range=(-1, 1)),
+]
+
+def evaluate_signals(analyses, sources=SIGNAL_SOURCES, threshold=ORDER_SCORE_THRESHOLD):
+    """
+    Combine source signals cheapest first, stopping once a buy is out of reach.
     
-    if not all([lstm_data, indicator_data, monte_carlo_data]):
-        print("\n============ ORDER MANAGER ============")
-        print("Missing data from one or more analysis sources. Cannot generate order.")
-        return None
+    analyses maps analyzer names to their response, or to a zero-argument
+    callable that produces it on demand (AnalysisStage.lazy). Before each
+    source the best score the remaining sources could still add is checked;
+    if even that cannot lift the total over the threshold, the rest are never
+    evaluated. Only the no-trade side short-circuits, so every source has been
+    evaluated whenever an order is placed.
     
-    current_price = indicator_data.get('price')
+    Returns (total_score, signals, skipped, responses) where signals maps
+    evaluated source names to their labels, skipped lists the sources that
+    were not needed and responses holds the analyzer responses that were
+    produced. A missing response (None) stops the evaluation.
+    """
+    ordered = sorted(sources, key=lambda source: source.cost)
+    responses = {}
+    total_score = 0
+    signals = {}
+    
+    for i, source in enumerate(ordered):
+        best_remaining = sum(s.weight * s.score_range[1] for s in ordered[i:])
+        # The small margin keeps exact ties on the fully evaluated path
+        if total_score + best_remaining < threshold - 1e-9:
+            return total_score, signals, [s.name for s in ordered[i:]], responses
+        
+        if source.analysis not in responses:
+            response = analyses.get(source.analysis)
+            responses[source.analysis] = response() if callable(response) else response
+        response = responses[source.analysis]
+        if not response:
+            break
+        
+        signals[source.name] = response.get(source.field)
+        total_score += source.weight * SIGNAL_SCORES.get(signals[source.name], 0)
     
-    lstm_signal = lstm_data.get('signal')
-    rsi_signal = indicator_data.get('rsi_signal')
-    ema_signal = indicator_data.get('ema_signal')
-    monte_carlo_signal = monte_carlo_data.get('signal')
+    return total_score, signals, [], responses
+
+def generate_order(lstm_data, indicator_data, monte_carlo_data, decision_factors=None):
+    """
+    Score the analyzer signals and build a buy order when the combined score is high enough.
     
-    lstm_target_price = lstm_data.get('target_price')
-    lstm_trend = lstm_data.get('trend')
-    lstm_trend_strength = lstm_data.get('trend_strength')
+    Each analyzer argument is its response or a callable producing it, so
+    expensive analyzers are only run when their signal can change the
+    decision. decision_factors, when given, is filled with the score, the
+    evaluated signals and the skipped sources for every candle, including
+    those that do not produce an order.
+    """
+    # Import configuration from main module
+    from main import TRADING_AMOUNT, MAX_RISK_PERCENT, TRADING_SYMBOL
     
-    mc_lower_bound = monte_carlo_data.get('lower_bound')[-1] if monte_carlo_data.get('lower_bound') else None
+    analyses = {'indicators': indicator_data, 'monte_carlo': monte_carlo_data, 'lstm': lstm_data}
+    total_score, signals, skipped, responses = evaluate_signals(analyses)
     
-    signal_scores = {
-        'STRONG_BUY': 2,
-        'BUY': 1,
-        'HOLD': 0,
-        'NEUTRAL': 0,
-        'SELL': -1,
-        'STRONG_SELL': -2,
-        'OVERSOLD': 0.5,
-        'OVERBOUGHT': -0.5
-    }
+    if decision_factors is not None:
+        decision_factors.update({
+            'combined_score': round(total_score, 2),
+            'evaluated_sources': list(signals),
+            'skipped_sources': skipped,
+            **{f"{name}_signal": signal for name, signal in signals.items()}
+        })
     
-    weights = {
-        'lstm': 0.35,
-        'rsi': 0.25,
-        'ema': 0.20,
-        'monte_carlo': 0.20
-    }
+    if not all(responses.values()):
+        print("\n============ ORDER MANAGER ============")
+        print("Missing data from one or more analysis sources. Cannot generate order.")
+        return None
     
-    total_score = (
-        weights['lstm'] * signal_scores.get(lstm_signal, 0) +
-        weights['rsi'] * signal_scores.get(rsi_signal, 0) +
-        weights['ema'] * signal_scores.get(ema_signal, 0) +
-        weights['monte_carlo'] * signal_scores.get(monte_carlo_signal, 0)
-    )
+    lstm_signal = signals.get('lstm')
+    rsi_signal = signals.get('rsi')
+    ema_signal = signals.get('ema')
+    monte_carlo_signal = signals.get('monte_carlo')
     
     should_place_order = False
     order_type = "BUY"
     
-    if total_score > 0.1:
+    if total_score > ORDER_SCORE_THRESHOLD:
         should_place_order = True
     
     print("\n============ ORDER MANAGER ============")
     print(f"LSTM Signal: {lstm_signal} | RSI Signal: {rsi_signal}")
     print(f"EMA Signal: {ema_signal} | Monte Carlo Signal: {monte_carlo_signal}")
     print(f"Combined Signal Score: {total_score:.2f}")
+    if skipped:
+        print(f"Skipped sources (cannot reach the {ORDER_SCORE_THRESHOLD} threshold): {', '.join(skipped)}")
     
     order = None
     
     if should_place_order:
+        # A buy is only reachable after every source was evaluated
+        lstm_data = responses['lstm']
+        indicator_data = responses['indicators']
+        monte_carlo_data = responses['monte_carlo']
+        
+        current_price = indicator_data.get('price')
+        lstm_target_price = lstm_data.get('target_price')
+        lstm_trend = lstm_data.get('trend')
+        lstm_trend_strength = lstm_data.get('trend_strength')
+        mc_lower_bound = monte_carlo_data.get('lower_bound')[-1] if monte_carlo_data.get('lower_bound') else None
+        
         if mc_lower_bound:
             potential_loss_pct = (current_price - mc_lower_bound) / current_price * 100
             stop_loss_pct = min(potential_loss_pct, MAX_RISK_PERCENT)
@@ -114,6 +191,7 @@ def generate_order(lstm_data, indicator_data, monte_carlo_data):
                 "combined_score": round(total_score, 2),
                 "lstm_trend": lstm_trend,
                 "lstm_trend_strength": round(lstm_trend_strength, 2),
+                "skipped_sources": skipped,
             }
         }
         
@@ -130,12 +208,6 @@ def generate_order(lstm_data, indicator_data, monte_carlo_data):
         print(f"TAKE PROFIT: ${order['takeProfit']:.2f} ({(take_profit_price - current_price) / current_price * 100:.2f}%)")
         print(f"RISK/REWARD RATIO: 1:{risk_reward_ratio:.2f}")
         print(f"MAX RISK AMOUNT: ${risk_amount:.2f}")
-        
-        justification = get_justification(lstm_data, indicator_data, monte_carlo_data, order)
-        print("\n============ TRADE JUSTIFICATION ============")
-        print(justification)
-        
-        order["justification"] = justification
     else:
         print("Decision: NO ORDER - Combined signals are not strong enough for a buy")
     
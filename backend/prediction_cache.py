@@ -0,0 +1,143 @@
+"""
+On-disk cache of LSTM forecasts for backtests.
+
+Backtests are rerun over the same candle files many times while tuning
+generate_order, and every run used to recompute identical forecasts. The
+cache stores the inverse-scaled predicted prices per window end index in one
+.npz file per (model bundle checksum, feature data hash, window length). The
+bundle checksum already covers the model file and both scalers, so retraining
+or re-exporting the model starts a fresh cache entry.
+
+Entries are evicted least-recently-used first once the cache directory grows
+past its size limit.
+"""
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+from config import PREDICTION_CACHE_DIR, PREDICTION_CACHE_MAX_MB
+
+
+def data_hash(array):
+    """Content hash of a feature matrix (shape, dtype and values)"""
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256()
+    digest.update(str((array.shape, array.dtype.str)).encode())
+    digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """Directory of .npz files mapping window end indices to predicted prices"""
+    def __init__(self, directory, max_bytes):
+        """
+        Parameters:
+        directory: Where the .npz files are kept (created on first write)
+        max_bytes: Total size the directory may reach before the least recently used entries are removed
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, *parts):
+        return hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def load(self, key):
+        """Return (end_indices, predicted_prices) for a key, or None when nothing is cached"""
+        path = self._path(key)
+        try:
+            with np.load(path) as cached:
+                entry = cached['end_indices'], cached['predicted_prices']
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Ignoring unreadable prediction cache entry {path}: {e}")
+            return None
+
+        # Reading counts as a use for the LRU eviction
+        os.utime(path)
+        return entry
+
+    def lookup(self, key, end_indices):
+        """
+        Split the requested end indices into cached and missing ones.
+
+        Returns (hit_mask, cached_prices) where cached_prices holds the rows for
+        end_indices[hit_mask] in order.
+        """
+        end_indices = np.asarray(end_indices, dtype=np.int64)
+        entry = self.load(key)
+        if entry is None or len(entry[0]) == 0:
+            self.misses += len(end_indices)
+            return np.zeros(len(end_indices), dtype=bool), None
+
+        cached_indices, cached_prices = entry
+        positions = np.minimum(np.searchsorted(cached_indices, end_indices), len(cached_indices) - 1)
+        hit_mask = cached_indices[positions] == end_indices
+
+        self.hits += int(hit_mask.sum())
+        self.misses += int((~hit_mask).sum())
+        return hit_mask, cached_prices[positions[hit_mask]]
+
+    def store(self, key, end_indices, predicted_prices):
+        """Merge new rows into a key's entry, then evict old entries if the directory is over its limit"""
+        end_indices = np.asarray(end_indices, dtype=np.int64)
+        predicted_prices = np.asarray(predicted_prices, dtype=float)
+
+        with self.lock:
+            entry = self.load(key)
+            if entry is not None and entry[1].shape[1:] == predicted_prices.shape[1:]:
+                end_indices = np.concatenate([entry[0], end_indices])
+                predicted_prices = np.concatenate([entry[1], predicted_prices])
+
+            end_indices, unique_positions = np.unique(end_indices, return_index=True)
+            predicted_prices = predicted_prices[unique_positions]
+
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                np.savez(f, end_indices=end_indices, predicted_prices=predicted_prices)
+            os.replace(temp_path, path)
+
+            self._evict(keep=path)
+
+    def _evict(self, keep=None):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npz'):
+                continue
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size
+            print(f"Evicted prediction cache entry {os.path.basename(path)} ({size / 1e6:.1f} MB)")
+
+    def clear(self):
+        with self.lock:
+            if not os.path.isdir(self.directory):
+                return
+            for name in os.listdir(self.directory):
+                if name.endswith('.npz'):
+                    os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+prediction_cache = PredictionCache(PREDICTION_CACHE_DIR, PREDICTION_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,183 @@
+"""
+Mergeable log-bucket histogram for quantiles of positive values.
+
+A DDSketch-style sketch: a value x lands in bucket ceil(log(x) / log(gamma))
+with gamma = (1 + a) / (1 - a), so every quantile it reports is within a
+relative error a of a value that really sits at that rank. Buckets are plain
+integer counts, which makes sketches from separate chunks or worker processes
+merge exactly, and memory depends on the spread of the values and on a, not
+on how many values were added.
+
+One sketch tracks several columns at once (e.g. every step of a price path
+horizon) over a shared bucket range, and also keeps per-bucket sums so tail
+means such as expected shortfall can be read off the buckets.
+
+    python quantile_sketch.py check
+"""
+import argparse
+import math
+
+import numpy as np
+
+
+class LogHistogramSketch:
+    """Per-column log-bucket histograms with a guaranteed relative accuracy"""
+    def __init__(self, relative_accuracy=0.0001, columns=1):
+        """
+        Parameters:
+        relative_accuracy: Maximum relative error of reported quantiles (a)
+        columns: Number of independent columns tracked side by side
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.columns = columns
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.offset = 0
+        self.counts = np.zeros((columns, 0), dtype=np.int64)
+        self.sums = np.zeros((columns, 0))
+        self.count = 0
+
+    @property
+    def width(self):
+        return self.counts.shape[1]
+
+    def _bucket(self, values):
+        return np.ceil(np.log(values) / self.log_gamma).astype(np.int64)
+
+    def _grow(self, low, high):
+        """Extend the bucket range to cover indices low..high"""
+        if self.width == 0:
+            self.offset = low
+            self.counts = np.zeros((self.columns, high - low + 1), dtype=np.int64)
+            self.sums = np.zeros((self.columns, high - low + 1))
+            return
+
+        new_offset = min(self.offset, low)
+        new_end = max(self.offset + self.width, high + 1)
+        if new_offset == self.offset and new_end == self.offset + self.width:
+            return
+
+        pad = ((0, 0), (self.offset - new_offset, new_end - self.offset - self.width))
+        self.counts = np.pad(self.counts, pad)
+        self.sums = np.pad(self.sums, pad)
+        self.offset = new_offset
+
+    def add(self, values):
+        """Add a (rows, columns) block of positive values (a 1-D array for a single column)"""
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 1:
+            values = values[:, np.newaxis]
+        if values.shape[1] != self.columns:
+            raise ValueError(f"Expected {self.columns} columns, got {values.shape[1]}")
+        if values.size == 0:
+            return
+        if np.any(values <= 0):
+            raise ValueError("LogHistogramSketch only accepts positive values")
+
+        buckets = self._bucket(values)
+        self._grow(int(buckets.min()), int(buckets.max()))
+
+        flat = (buckets - self.offset) + (np.arange(self.columns) * self.width)[np.newaxis, :]
+        size = self.columns * self.width
+        self.counts += np.bincount(flat.ravel(), minlength=size).reshape(self.columns, self.width)
+        self.sums += np.bincount(flat.ravel(), weights=values.ravel(), minlength=size).reshape(self.columns, self.width)
+        self.count += values.shape[0]
+
+    def merge(self, other):
+        """Fold another sketch with the same accuracy and columns into this one"""
+        if other.columns != self.columns or other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Can only merge sketches with the same columns and relative accuracy")
+        if other.width == 0:
+            return self
+
+        self._grow(other.offset, other.offset + other.width - 1)
+        start = other.offset - self.offset
+        self.counts[:, start:start + other.width] += other.counts
+        self.sums[:, start:start + other.width] += other.sums
+        self.count += other.count
+        return self
+
+    def _value(self, bucket):
+        """Representative value of a bucket (within relative_accuracy of anything in it)"""
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def quantile(self, q):
+        """Per-column value at quantile q (0..1) as an array of length columns"""
+        if self.count == 0:
+            return np.full(self.columns, np.nan)
+        rank = q * (self.count - 1)
+        cumulative = np.cumsum(self.counts, axis=1)
+        positions = np.argmax(cumulative > rank, axis=1)
+        return self._value(positions + self.offset)
+
+    def percentile(self, p):
+        """Per-column value at percentile p (0..100), like np.percentile(..., axis=0)"""
+        return self.quantile(p / 100)
+
+    def lower_tail_mean(self, q, column=0):
+        """
+        Mean of the lowest values of one column up to quantile q (e.g. expected shortfall).
+
+        Whole buckets below the quantile's bucket count in full and the
+        quantile's own bucket contributes only as many values as the rank
+        needs, at that bucket's mean.
+        """
+        if self.count == 0:
+            return np.nan
+        needed = int(math.floor(q * (self.count - 1))) + 1
+        counts = self.counts[column]
+        sums = self.sums[column]
+        cumulative = np.cumsum(counts)
+        position = int(np.argmax(cumulative >= needed))
+
+        below = cumulative[position] - counts[position]
+        total = sums[:position].sum() + (needed - below) * sums[position] / counts[position]
+        return total / needed
+
+
+def check_accuracy(num_values=200000, columns=10, relative_accuracy=0.0001, chunk_size=4096, seed=42):
+    """
+    Compare sketch percentiles of simulated price paths with np.percentile.
+
+    The paths are added in chunks as the streaming Monte Carlo does. Exact
+    percentiles interpolate between neighbouring values while the sketch
+    reports one value at the rank, so the check allows the guaranteed
+    relative accuracy plus the gap between those neighbours.
+    """
+    from monte_carlo_kernel import simulate_paths
+
+    paths = simulate_paths(60000.0, 0.0, 0.0015, num_values, columns, np.random.default_rng(seed))
+    sketch = LogHistogramSketch(relative_accuracy, columns)
+    for start in range(0, num_values, chunk_size):
+        sketch.add(paths[start:start + chunk_size])
+
+    ordered = np.sort(paths, axis=0)
+    passed = True
+    for p in (1, 5, 25, 50, 75, 95, 99):
+        exact = np.percentile(paths, p, axis=0)
+        estimate = sketch.percentile(p)
+        error = np.max(np.abs(estimate - exact) / exact)
+        rank = int(math.floor(p / 100 * (num_values - 1)))
+        gap = np.max((ordered[min(rank + 1, num_values - 1)] - ordered[rank]) / exact)
+        ok = error <= relative_accuracy + gap
+        passed = passed and ok
+        print(f"p{p:<3} max relative error {error:.2e} (allowed {relative_accuracy + gap:.2e}) {'ok' if ok else 'FAIL'}")
+
+    print(f"{sketch.width} buckets x {columns} columns for {num_values} values")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check sketch percentiles against exact percentiles')
+    parser.add_argument('command', nargs='?', choices=['check'], default='check',
+                        help='check: sketch percentiles against np.percentile')
+    parser.add_argument('--values', type=int, default=200000, help='Simulated paths')
+    parser.add_argument('--columns', type=int, default=10, help='Horizon steps per path')
+    parser.add_argument('--accuracy', type=float, default=0.0001, help='Relative accuracy of the sketch')
+    parser.add_argument('--chunk-size', type=int, default=4096, help='Paths added to the sketch at once')
+    args = parser.parse_args()
+
+    if not check_accuracy(args.values, args.columns, args.accuracy, args.chunk_size):
+        raise SystemExit(1)
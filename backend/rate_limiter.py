@@ -0,0 +1,385 @@
+"""
+Client-side Binance rate limiter with priority lanes.
+
+Binance counts request weight per minute and orders per 10 seconds and per
+day. Going over them returns 429, and ignoring the 429s earns a 418 IP ban
+that stops trading completely. RateLimiter keeps one token bucket per limit
+window. The buckets are seeded from exchangeInfo rateLimits and corrected
+from the X-MBX-USED-WEIGHT-* / X-MBX-ORDER-COUNT-* headers of every
+response, so they also account for weight used by other processes on the
+same IP.
+
+Every request is classified into a lane:
+
+- orders:  order placement and cancels (may use the whole budget)
+- account: balances, order status, ticker, listenKeys
+- history: klines, trade history, exchangeInfo
+
+A lane must leave a reserve of the weight budget to the lanes above it and
+also yields while a higher lane is waiting. A request that cannot go now is
+deferred until tokens refill. It is shed (RequestShed) if that would take
+longer than its lane's max wait, so history calls give way long before an
+order would be refused. A 429/418 blocks all lanes until its Retry-After
+has passed. usage() reports live weight usage.
+
+Binance limits are per IP, so every client in a process should use the one
+limiter returned by shared_limiter().
+
+    python rate_limiter.py check
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+ORDERS = 'orders'
+ACCOUNT = 'account'
+HISTORY = 'history'
+LANES = (ORDERS, ACCOUNT, HISTORY)  # highest priority first
+
+# (method, endpoint) -> (lane, request weight, orders counted)
+ENDPOINTS = {
+    ('POST', '/v3/order'): (ORDERS, 1, 1),
+    ('POST', '/v3/order/oco'): (ORDERS, 1, 2),
+    ('DELETE', '/v3/order'): (ORDERS, 1, 0),
+    ('GET', '/v3/order'): (ACCOUNT, 4, 0),
+    ('GET', '/v3/openOrders'): (ACCOUNT, 6, 0),
+    ('GET', '/v3/account'): (ACCOUNT, 20, 0),
+    ('GET', '/v3/ticker/price'): (ACCOUNT, 2, 0),
+    ('POST', '/v3/userDataStream'): (ACCOUNT, 2, 0),
+    ('PUT', '/v3/userDataStream'): (ACCOUNT, 2, 0),
+    ('DELETE', '/v3/userDataStream'): (ACCOUNT, 2, 0),
+    ('GET', '/v3/klines'): (HISTORY, 2, 0),
+    ('GET', '/v3/myTrades'): (HISTORY, 20, 0),
+    ('GET', '/v3/exchangeInfo'): (HISTORY, 20, 0),
+}
+DEFAULT_ENDPOINT = (ACCOUNT, 1, 0)
+
+INTERVAL_SECONDS = {'S': 1, 'M': 60, 'H': 3600, 'D': 86400}
+
+
+class RequestShed(Exception):
+    """A low-priority request was dropped because the rate limit budget is nearly used up"""
+    def __init__(self, lane, method, endpoint, wait):
+        super().__init__(f"{lane} request {method} {endpoint} shed (would wait {wait:.1f}s for rate limit budget)")
+        self.lane = lane
+        self.wait = wait
+
+
+class TokenBucket:
+    """capacity tokens refilled evenly over interval_seconds"""
+    def __init__(self, capacity, interval_seconds):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / interval_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount, floor=0.0):
+        """Seconds until amount can be taken while leaving floor tokens"""
+        missing = amount + floor - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def take(self, amount):
+        self.tokens -= amount
+
+    def correct(self, used):
+        """Align with the exchange's count of what was used in the current window"""
+        self.tokens = min(self.capacity, self.capacity - used)
+
+    def used(self):
+        return max(0.0, self.capacity - self.tokens)
+
+
+def _window_key(interval_num, interval):
+    """'1M', '10S', '1D' as used in the X-MBX-* header suffixes"""
+    return f"{interval_num}{interval[0].upper()}"
+
+
+class RateLimiter:
+    """Token buckets per Binance limit window, shared by every request of a client"""
+    def __init__(self, reserves=None, max_waits=None):
+        """
+        Parameters:
+        reserves: {lane: fraction of the weight budget the lane must leave for higher lanes}
+        max_waits: {lane: seconds a request may be deferred before it is shed}
+        """
+        self.reserves = {ORDERS: 0.0, ACCOUNT: 0.1, HISTORY: 0.3}
+        self.reserves.update(reserves or {})
+        self.max_waits = {ORDERS: 30.0, ACCOUNT: 10.0, HISTORY: 2.0}
+        self.max_waits.update(max_waits or {})
+
+        # Binance Spot defaults until exchangeInfo says otherwise
+        self.weight_buckets = {'1M': TokenBucket(6000, 60)}
+        self.order_buckets = {'10S': TokenBucket(100, 10), '1D': TokenBucket(200000, 86400)}
+
+        self.condition = threading.Condition()
+        self.waiting = {lane: 0 for lane in LANES}
+        self.blocked_until = 0.0
+        self.requests = {lane: 0 for lane in LANES}
+        self.deferred = {lane: 0 for lane in LANES}
+        self.shed = {lane: 0 for lane in LANES}
+        self.wait_seconds = 0.0
+        self.rate_limited = 0
+        self.header_weight = None
+
+    def configure(self, rate_limits):
+        """Rebuild the buckets from exchangeInfo rateLimits, keeping what is already used"""
+        weight_buckets, order_buckets = {}, {}
+        for rate_limit in rate_limits or []:
+            key = _window_key(rate_limit['intervalNum'], rate_limit['interval'])
+            seconds = rate_limit['intervalNum'] * INTERVAL_SECONDS[rate_limit['interval'][0].upper()]
+            bucket = TokenBucket(rate_limit['limit'], seconds)
+            if rate_limit['rateLimitType'] == 'REQUEST_WEIGHT':
+                weight_buckets[key] = bucket
+            elif rate_limit['rateLimitType'] == 'ORDERS':
+                order_buckets[key] = bucket
+
+        with self.condition:
+            now = time.monotonic()
+            for old, new in ((self.weight_buckets, weight_buckets), (self.order_buckets, order_buckets)):
+                for key, bucket in new.items():
+                    if key in old:
+                        old[key].refill(now)
+                        bucket.correct(old[key].used())
+                if new:
+                    old.clear()
+                    old.update(new)
+            self.condition.notify_all()
+
+    @staticmethod
+    def classify(method, endpoint):
+        return ENDPOINTS.get((method.upper(), endpoint), DEFAULT_ENDPOINT)
+
+    def _wait_time(self, lane, weight, orders, now):
+        """Seconds this request has to wait (0 when it can go now); caller holds the lock"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if any(self.waiting[higher] for higher in LANES[:LANES.index(lane)]):
+            return 0.05
+        wait = 0.0
+        for bucket in self.weight_buckets.values():
+            bucket.refill(now)
+            wait = max(wait, bucket.time_until(weight, self.reserves[lane] * bucket.capacity))
+        if orders:
+            for bucket in self.order_buckets.values():
+                bucket.refill(now)
+                wait = max(wait, bucket.time_until(orders))
+        return wait
+
+    def _take(self, lane, weight, orders, waited=None):
+        for bucket in self.weight_buckets.values():
+            bucket.take(weight)
+        if orders:
+            for bucket in self.order_buckets.values():
+                bucket.take(orders)
+        self.requests[lane] += 1
+        if waited is not None:
+            self.deferred[lane] += 1
+            self.wait_seconds += waited
+
+    def _shed(self, lane, method, endpoint, wait):
+        self.shed[lane] += 1
+        return RequestShed(lane, method, endpoint, wait)
+
+    def acquire(self, method, endpoint):
+        """Block until the request fits in its lane's budget; raises RequestShed past the lane's max wait"""
+        lane, weight, orders = self.classify(method, endpoint)
+        start = time.monotonic()
+        deadline = start + self.max_waits[lane]
+        deferred = False
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                wait = self._wait_time(lane, weight, orders, now)
+                if wait <= 0:
+                    self._take(lane, weight, orders, now - start if deferred else None)
+                    return lane
+                if now + wait > deadline:
+                    raise self._shed(lane, method, endpoint, wait)
+                self.waiting[lane] += 1
+                deferred = True
+                try:
+                    self.condition.wait(min(wait, deadline - now))
+                finally:
+                    self.waiting[lane] -= 1
+
+    async def acquire_async(self, method, endpoint):
+        """acquire for coroutines: waits with asyncio.sleep instead of blocking the event loop"""
+        lane, weight, orders = self.classify(method, endpoint)
+        start = time.monotonic()
+        deadline = start + self.max_waits[lane]
+        registered = deferred = False
+        try:
+            while True:
+                with self.condition:
+                    now = time.monotonic()
+                    if registered:
+                        self.waiting[lane] -= 1
+                        registered = False
+                    wait = self._wait_time(lane, weight, orders, now)
+                    if wait <= 0:
+                        self._take(lane, weight, orders, now - start if deferred else None)
+                        return lane
+                    if now + wait > deadline:
+                        raise self._shed(lane, method, endpoint, wait)
+                    self.waiting[lane] += 1
+                    registered = deferred = True
+                await asyncio.sleep(min(wait, deadline - now))
+        finally:
+            if registered:
+                with self.condition:
+                    self.waiting[lane] -= 1
+
+    def record(self, status_code, headers):
+        """Correct the buckets from a response's X-MBX-* headers and honour 429/418 Retry-After"""
+        with self.condition:
+            now = time.monotonic()
+            for name, value in headers.items():
+                name = name.upper()
+                if name.startswith('X-MBX-USED-WEIGHT-'):
+                    bucket = self.weight_buckets.get(name[len('X-MBX-USED-WEIGHT-'):])
+                    used = float(value)
+                    if name.endswith('-1M'):
+                        self.header_weight = used
+                elif name.startswith('X-MBX-ORDER-COUNT-'):
+                    bucket = self.order_buckets.get(name[len('X-MBX-ORDER-COUNT-'):])
+                    used = float(value)
+                else:
+                    continue
+                if bucket is not None:
+                    bucket.refill(now)
+                    bucket.correct(used)
+
+            if status_code in (418, 429):
+                self.rate_limited += 1
+                retry_after = headers.get('Retry-After')
+                block = float(retry_after) if retry_after else 60.0
+                self.blocked_until = max(self.blocked_until, now + block)
+                print(f"Rate limited by the exchange ({status_code}); holding all requests for {block:.0f}s")
+            self.condition.notify_all()
+
+    def usage(self):
+        """Live weight usage and lane counters (for logs and the dashboard)"""
+        with self.condition:
+            now = time.monotonic()
+            weight = {}
+            for key, bucket in self.weight_buckets.items():
+                bucket.refill(now)
+                weight[key] = {'used': round(bucket.used(), 1), 'limit': int(bucket.capacity),
+                               'pct': round(bucket.used() / bucket.capacity * 100, 1)}
+            orders = {}
+            for key, bucket in self.order_buckets.items():
+                bucket.refill(now)
+                orders[key] = {'used': round(bucket.used(), 1), 'limit': int(bucket.capacity)}
+            return {
+                'weight': weight,
+                'orders': orders,
+                'header_weight_1m': self.header_weight,
+                'requests': dict(self.requests),
+                'deferred': dict(self.deferred),
+                'shed': dict(self.shed),
+                'wait_seconds': round(self.wait_seconds, 2),
+                'rate_limited': self.rate_limited,
+                'blocked_for': max(0.0, self.blocked_until - now)
+            }
+
+    def weight_pct(self):
+        """Largest weight-window usage in percent"""
+        return max((entry['pct'] for entry in self.usage()['weight'].values()), default=0.0)
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def shared_limiter(reserves=None, max_waits=None):
+    """The process-wide RateLimiter; reserves and max_waits only apply on the first call"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(reserves, max_waits)
+        return _shared_limiter
+
+
+def check(seconds=3.0):
+    """
+    Flood a small budget from three lanes at once and check the priorities.
+
+    The weight bucket is seeded (as from exchangeInfo) with 200 per 2 seconds
+    and threads keep requesting klines (history), account snapshots and order
+    status (account) and new orders. Orders must never be shed and should
+    barely wait, history must be shed first, and the total weight must stay
+    within the budget. A header correction and a 429 Retry-After are then
+    applied.
+    """
+    limiter = RateLimiter(max_waits={ORDERS: 5.0, ACCOUNT: 1.0, HISTORY: 0.2})
+    limiter.configure([
+        {'rateLimitType': 'REQUEST_WEIGHT', 'interval': 'SECOND', 'intervalNum': 2, 'limit': 200},
+        {'rateLimitType': 'ORDERS', 'interval': 'SECOND', 'intervalNum': 10, 'limit': 50},
+    ])
+    stop = threading.Event()
+    order_waits = []
+    sent_weight = [0]
+    lock = threading.Lock()
+
+    def worker(method, endpoint, pause):
+        while not stop.is_set():
+            start = time.monotonic()
+            try:
+                lane = limiter.acquire(method, endpoint)
+            except RequestShed:
+                time.sleep(pause)
+                continue
+            with lock:
+                sent_weight[0] += limiter.classify(method, endpoint)[1]
+            if lane == ORDERS:
+                order_waits.append(time.monotonic() - start)
+            time.sleep(pause)
+
+    threads = [threading.Thread(target=worker, args=('GET', '/v3/klines', 0.001), daemon=True) for _ in range(4)]
+    threads += [threading.Thread(target=worker, args=('GET', '/v3/account', 0.01), daemon=True)]
+    threads += [threading.Thread(target=worker, args=('GET', '/v3/order', 0.01), daemon=True)]
+    threads += [threading.Thread(target=worker, args=('POST', '/v3/order', 0.1), daemon=True)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=6)
+    elapsed = time.monotonic() - start
+
+    usage = limiter.usage()
+    budget = 200 + 200 / 2 * elapsed
+    order_waits.sort()
+    print(f"{elapsed:.1f}s flood: weight sent {sent_weight[0]} of a {budget:.0f} budget")
+    print(f"Requests {usage['requests']} | deferred {usage['deferred']} | shed {usage['shed']}")
+    if order_waits:
+        print(f"Order wait p50 {order_waits[len(order_waits) // 2] * 1000:.1f} ms, max {order_waits[-1] * 1000:.1f} ms")
+
+    limiter.record(200, {'x-mbx-used-weight-2s': '150'})
+    corrected = limiter.usage()['weight']['2S']['used']
+    limiter.record(429, {'Retry-After': '1'})
+    start = time.monotonic()
+    limiter.acquire('POST', '/v3/order')
+    blocked = time.monotonic() - start
+    print(f"Header correction: used weight {corrected:.0f} | after 429 Retry-After 1s the next order waited {blocked:.2f}s")
+
+    passed = (usage['shed'][ORDERS] == 0 and usage['shed'][HISTORY] > 0 and sent_weight[0] <= budget + 1
+              and order_waits and order_waits[-1] < 1.0 and 149 <= corrected <= 152 and 0.9 <= blocked <= 1.2)
+    print("Rate limiter check passed" if passed else "Rate limiter check FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Rate limiter utilities')
+    parser.add_argument('command', choices=['check'], help='check: lane priorities under a flood')
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+
+    if not check(args.seconds):
+        raise SystemExit(1)
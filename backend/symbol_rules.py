@@ -0,0 +1,257 @@
+"""
+Cached exchange trading rules with precompiled Decimal quantizers.
+
+BinanceTestnetClient used to download exchangeInfo for every format_price,
+format_quantity and notional check, so a single LIMIT order fetched it three
+times before it was sent. SymbolRules compiles a symbol's PRICE_FILTER,
+LOT_SIZE and NOTIONAL / MIN_NOTIONAL filters once into Decimal tick and step
+sizes, which makes price/quantity formatting and notional validation pure
+local calls. SymbolRulesCache loads the rules once, refreshes them on a
+background timer, and reloads a symbol when the exchange rejects an order
+with a filter error.
+
+    python symbol_rules.py check
+"""
+import argparse
+import threading
+import time
+from decimal import Decimal, ROUND_CEILING, ROUND_DOWN, ROUND_HALF_UP
+
+# Order rejections that mean our copy of the filters may be out of date
+FILTER_ERROR_CODES = (
+    -1013,  # Filter failure (PRICE_FILTER, LOT_SIZE, NOTIONAL, ...)
+    -1111,  # Precision is over the maximum defined for this asset
+)
+
+
+def _decimal(value, default=None):
+    if value is None:
+        return default
+    value = Decimal(str(value))
+    return value if value > 0 else default
+
+
+class SymbolRules:
+    """One symbol's exchangeInfo filters compiled into Decimal quantizers"""
+    def __init__(self, symbol, filters):
+        self.symbol = symbol
+        self.tick_size = None
+        self.min_price = None
+        self.max_price = None
+        self.step_size = None
+        self.min_qty = None
+        self.max_qty = None
+        self.min_notional = None
+        self.max_notional = None
+        self.min_notional_applies_to_market = True
+
+        for rule in filters:
+            filter_type = rule.get('filterType')
+            if filter_type == 'PRICE_FILTER':
+                self.tick_size = _decimal(rule.get('tickSize'))
+                self.min_price = _decimal(rule.get('minPrice'))
+                self.max_price = _decimal(rule.get('maxPrice'))
+            elif filter_type == 'LOT_SIZE':
+                self.step_size = _decimal(rule.get('stepSize'))
+                self.min_qty = _decimal(rule.get('minQty'))
+                self.max_qty = _decimal(rule.get('maxQty'))
+            elif filter_type == 'MIN_NOTIONAL':
+                self.min_notional = _decimal(rule.get('minNotional'))
+                self.min_notional_applies_to_market = rule.get('applyToMarket', True)
+            elif filter_type == 'NOTIONAL':
+                # NOTIONAL replaced MIN_NOTIONAL on Spot and also carries an upper bound
+                self.min_notional = _decimal(rule.get('minNotional'))
+                self.max_notional = _decimal(rule.get('maxNotional'))
+                self.min_notional_applies_to_market = rule.get('applyMinToMarket', True)
+
+        # Quantizing to the normalized step also fixes the number of decimals in the output
+        self.price_exponent = self.tick_size.normalize() if self.tick_size else Decimal('0.01')
+        self.quantity_exponent = self.step_size.normalize() if self.step_size else Decimal('0.00001')
+
+    @staticmethod
+    def _to_step(value, step, rounding):
+        return (value / step).to_integral_value(rounding=rounding) * step
+
+    def quantize_price(self, price, rounding=ROUND_HALF_UP):
+        """Price clamped to the PRICE_FILTER bounds and rounded to the tick size"""
+        price = Decimal(str(price))
+        if self.min_price is not None:
+            price = max(self.min_price, price)
+        if self.max_price is not None:
+            price = min(self.max_price, price)
+        if self.tick_size is not None:
+            price = self._to_step(price, self.tick_size, rounding)
+        return price.quantize(self.price_exponent)
+
+    def quantize_quantity(self, quantity, rounding=ROUND_DOWN):
+        """Quantity clamped to the LOT_SIZE bounds and floored to the step size"""
+        quantity = Decimal(str(quantity))
+        if self.max_qty is not None:
+            quantity = min(self.max_qty, quantity)
+        if self.step_size is not None:
+            quantity = self._to_step(quantity, self.step_size, rounding)
+        if self.min_qty is not None:
+            quantity = max(self.min_qty, quantity)
+        return quantity.quantize(self.quantity_exponent)
+
+    def format_price(self, price):
+        # 'f' keeps steps of 10 or more in plain notation (str() would give '1.2E+2')
+        return format(self.quantize_price(price), 'f')
+
+    def format_quantity(self, quantity):
+        return format(self.quantize_quantity(quantity), 'f')
+
+    def notional_shortfall(self, quantity, price, market=False):
+        """Minimum notional the order misses by (None when it passes)"""
+        if self.min_notional is None or (market and not self.min_notional_applies_to_market):
+            return None
+        notional = Decimal(str(quantity)) * Decimal(str(price))
+        return self.min_notional if notional < self.min_notional else None
+
+    def min_quantity_for_notional(self, price):
+        """Smallest valid quantity whose value at this price meets the minimum notional"""
+        required = self.min_qty or Decimal(0)
+        if self.min_notional is not None:
+            required = max(required, self.min_notional / Decimal(str(price)))
+        return self.quantize_quantity(required, rounding=ROUND_CEILING)
+
+
+class SymbolRulesCache:
+    """SymbolRules per symbol, loaded once and kept fresh off the order path"""
+    def __init__(self, client, refresh_seconds=3600):
+        """
+        Parameters:
+        client: BinanceTestnetClient used to download exchangeInfo
+        refresh_seconds: Interval between background refreshes of the loaded symbols
+        """
+        self.client = client
+        self.refresh_seconds = refresh_seconds
+        self.rules = {}
+        self.loaded_at = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.loads = 0
+
+    def load(self, symbol):
+        """Download and compile a symbol's rules (network I/O)"""
+        exchange_info = self.client.get_exchange_info(symbol, force_refresh=True)
+        for info in exchange_info.get('symbols', []):
+            if info.get('symbol') == symbol:
+                rules = SymbolRules(symbol, info.get('filters', []))
+                with self.lock:
+                    self.rules[symbol] = rules
+                    self.loaded_at[symbol] = time.time()
+                    self.loads += 1
+                return rules
+        raise ValueError(f"No exchangeInfo for {symbol}: {exchange_info}")
+
+    def get(self, symbol):
+        """Cached rules; only a symbol that was never loaded is fetched here"""
+        rules = self.rules.get(symbol)
+        if rules is None:
+            print(f"Loading trading rules for {symbol}")
+            rules = self.load(symbol)
+        return rules
+
+    def invalidate(self, symbol):
+        """Reload a symbol after the exchange rejected an order on one of its filters"""
+        print(f"Reloading trading rules for {symbol} after a filter rejection")
+        try:
+            return self.load(symbol)
+        except Exception as e:
+            print(f"Could not reload trading rules for {symbol}: {e}")
+            return self.rules.get(symbol)
+
+    def _refresh_loop(self):
+        while not self.stop_event.wait(self.refresh_seconds):
+            for symbol in list(self.rules):
+                try:
+                    self.load(symbol)
+                except Exception as e:
+                    print(f"Trading rules refresh for {symbol} failed, keeping the cached rules: {e}")
+
+    def start(self, symbols=()):
+        """Load the given symbols now and refresh every loaded symbol on a timer"""
+        for symbol in symbols:
+            self.get(symbol)
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._refresh_loop, name="symbol-rules-refresh", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def stats(self):
+        now = time.time()
+        return {'loads': self.loads, 'age': {symbol: now - loaded_at for symbol, loaded_at in self.loaded_at.items()}}
+
+
+def check():
+    """Compare the Decimal quantizers with the float formatting they replace on testnet-style filters"""
+    import math
+    import random
+
+    filters = [
+        {'filterType': 'PRICE_FILTER', 'minPrice': '0.01000000', 'maxPrice': '1000000.00000000', 'tickSize': '0.01000000'},
+        {'filterType': 'LOT_SIZE', 'minQty': '0.00001000', 'maxQty': '9000.00000000', 'stepSize': '0.00001000'},
+        {'filterType': 'NOTIONAL', 'minNotional': '5.00000000', 'applyMinToMarket': True,
+         'maxNotional': '9000000.00000000', 'applyMaxToMarket': False, 'avgPriceMins': 5},
+    ]
+    rules = SymbolRules('BTCUSDT', filters)
+    rng = random.Random(7)
+
+    def old_quantity(quantity):
+        return f"{max(math.floor(quantity / 0.00001) * 0.00001, 0.00001):.5f}"
+
+    random_mismatches = 0
+    for _ in range(100000):
+        price = rng.uniform(1000, 120000)
+        quantity = rng.uniform(0.00001, 2)
+        old_price = f"{round(price / 0.01) * 0.01:.2f}"
+        if rules.format_price(price) != old_price or rules.format_quantity(quantity) != old_quantity(quantity):
+            random_mismatches += 1
+
+    # Float flooring is off by one step when quantity / step lands just below an integer,
+    # which random quantities almost never hit but round ones like 0.29 do
+    round_quantities = [i / 100 for i in range(1, 1001)]
+    round_mismatches = [q for q in round_quantities if rules.format_quantity(q) != old_quantity(q)]
+    print(f"Float vs Decimal formatting differences: {random_mismatches} of 100000 random orders, "
+          f"{len(round_mismatches)} of {len(round_quantities)} round quantities "
+          f"(e.g. 0.29 BTC -> float {old_quantity(0.29)}, decimal {rules.format_quantity(0.29)})")
+
+    # Steps of 10 or more must still render in plain notation
+    coarse = SymbolRules('COARSE', [
+        {'filterType': 'PRICE_FILTER', 'minPrice': '10.00000000', 'maxPrice': '0', 'tickSize': '10.00000000'},
+        {'filterType': 'LOT_SIZE', 'minQty': '100.00000000', 'maxQty': '0', 'stepSize': '100.00000000'},
+    ])
+    coarse_price, coarse_quantity = coarse.format_price(123), coarse.format_quantity(1234)
+    print(f"Tick 10 / step 100: price 123 -> {coarse_price}, quantity 1234 -> {coarse_quantity}")
+
+    minimum = rules.min_quantity_for_notional(60000)
+    passed = (rules.format_quantity(0.29) == '0.29000'
+              and coarse_price == '120' and coarse_quantity == '1200'
+              and rules.notional_shortfall(minimum, 60000) is None
+              and rules.notional_shortfall(Decimal(minimum) - rules.step_size, 60000) == Decimal('5'))
+    print(f"Minimum quantity at $60000: {minimum} (${Decimal(minimum) * 60000:.2f})")
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        rules.format_price(60123.456)
+        rules.format_quantity(0.0123456)
+    print(f"format_price + format_quantity: {(time.perf_counter() - start) / 10000 * 1e6:.1f} us per order")
+    print("Symbol rules check passed" if passed else "Symbol rules check FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Symbol rules utilities')
+    parser.add_argument('command', choices=['check'], help='check: quantizers against the old float formatting')
+    args = parser.parse_args()
+
+    if not check():
+        raise SystemExit(1)
@@ -0,0 +1,165 @@
+"""
+Price-indexed take-profit / stop-loss trigger book.
+
+The trade monitor used to rescan every open trade on every price update and
+compare it with both of its levels, which is O(n) per tick. The book keeps
+take-profit levels in a min-heap and stop-loss levels in a max-heap, so a
+price update only looks at the heap tops and pops the k positions that
+actually triggered, O(k log n). Removing a position (exit, cancel, re-arm) is
+O(1): its heap items are left in place and skipped when they surface, and
+the heaps are rebuilt once dead items far outnumber live ones.
+
+    python trigger_book.py bench --positions 10000
+"""
+import argparse
+import heapq
+import threading
+import time
+
+import numpy as np
+
+TAKE_PROFIT = 'TAKE_PROFIT'
+STOP_LOSS = 'STOP_LOSS'
+
+
+class TriggerBook:
+    """Armed positions of one symbol indexed by their take-profit and stop-loss prices"""
+    def __init__(self):
+        self.take_profits = []  # (take_profit, version, key), lowest first
+        self.stop_losses = []  # (-stop_loss, version, key), highest stop first
+        self.entries = {}  # key -> (version, take_profit, stop_loss, payload)
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def add(self, key, take_profit, stop_loss, payload=None):
+        """Arm (or re-arm with new levels) a position; payload is returned when it triggers"""
+        with self.lock:
+            self.version += 1
+            self.entries[key] = (self.version, take_profit, stop_loss, payload)
+            heapq.heappush(self.take_profits, (take_profit, self.version, key))
+            heapq.heappush(self.stop_losses, (-stop_loss, self.version, key))
+
+    def remove(self, key):
+        """Disarm a position; its heap items are dropped lazily"""
+        with self.lock:
+            removed = self.entries.pop(key, None)
+            self._maybe_compact()
+            return removed is not None
+
+    def _live(self, item):
+        entry = self.entries.get(item[2])
+        return entry is not None and entry[0] == item[1]
+
+    def _maybe_compact(self):
+        if len(self.take_profits) + len(self.stop_losses) > 4 * len(self.entries) + 64:
+            self.take_profits = [item for item in self.take_profits if self._live(item)]
+            self.stop_losses = [item for item in self.stop_losses if self._live(item)]
+            heapq.heapify(self.take_profits)
+            heapq.heapify(self.stop_losses)
+
+    def pop_triggered(self, price):
+        """
+        Remove and return the positions triggered at this price.
+
+        Returns a list of (key, exit_type, payload): take profits at or below
+        the price first, then stop losses at or above it.
+        """
+        triggered = []
+        with self.lock:
+            while self.take_profits and self.take_profits[0][0] <= price:
+                item = heapq.heappop(self.take_profits)
+                if self._live(item):
+                    triggered.append((item[2], TAKE_PROFIT, self.entries.pop(item[2])[3]))
+
+            while self.stop_losses and -self.stop_losses[0][0] >= price:
+                item = heapq.heappop(self.stop_losses)
+                if self._live(item):
+                    triggered.append((item[2], STOP_LOSS, self.entries.pop(item[2])[3]))
+
+            if triggered:
+                self._maybe_compact()
+        return triggered
+
+    def nearest(self):
+        """(lowest take profit, highest stop loss) among armed positions, None when empty"""
+        with self.lock:
+            while self.take_profits and not self._live(self.take_profits[0]):
+                heapq.heappop(self.take_profits)
+            while self.stop_losses and not self._live(self.stop_losses[0]):
+                heapq.heappop(self.stop_losses)
+            take_profit = self.take_profits[0][0] if self.take_profits else None
+            stop_loss = -self.stop_losses[0][0] if self.stop_losses else None
+            return take_profit, stop_loss
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+
+def benchmark(positions=10000, ticks=1000, seed=42):
+    """
+    Compare the book with a linear rescan on a random-walk price.
+
+    Positions are laddered around the start price and re-armed around the
+    current price as soon as they trigger, so the book stays at full size.
+    Both methods must trigger the same (key, exit_type) pairs on every tick.
+    """
+    rng = np.random.default_rng(seed)
+    price = 60000.0
+    steps = price * (1 + rng.normal(0, 0.0005, ticks)).cumprod()
+
+    def levels(around):
+        entry = around * (1 + rng.uniform(-0.005, 0.005))
+        return entry * (1 + rng.uniform(0.002, 0.02)), entry * (1 - rng.uniform(0.002, 0.02))
+
+    initial = {key: levels(price) for key in range(positions)}
+    book = TriggerBook()
+    linear = dict(initial)
+    for key, (take_profit, stop_loss) in initial.items():
+        book.add(key, take_profit, stop_loss)
+
+    book_time = linear_time = 0.0
+    triggered_total = 0
+    mismatches = 0
+    for tick_price in steps:
+        start = time.perf_counter()
+        book_hits = [(key, exit_type) for key, exit_type, _ in book.pop_triggered(tick_price)]
+        book_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        linear_hits = []
+        for key, (take_profit, stop_loss) in list(linear.items()):
+            if tick_price >= take_profit:
+                linear_hits.append((key, TAKE_PROFIT))
+                del linear[key]
+            elif tick_price <= stop_loss:
+                linear_hits.append((key, STOP_LOSS))
+                del linear[key]
+        linear_time += time.perf_counter() - start
+
+        if sorted(book_hits) != sorted(linear_hits):
+            mismatches += 1
+        triggered_total += len(book_hits)
+        for key, _ in book_hits:
+            take_profit, stop_loss = levels(tick_price)
+            book.add(key, take_profit, stop_loss)
+            linear[key] = (take_profit, stop_loss)
+
+    print(f"{positions} positions, {ticks} ticks, {triggered_total} triggers")
+    print(f"Trigger book: {book_time / ticks * 1e6:.1f} us/tick | linear rescan: {linear_time / ticks * 1e6:.1f} us/tick "
+          f"({linear_time / book_time:.0f}x)")
+    print("Triggers identical" if mismatches == 0 else f"MISMATCH on {mismatches} ticks")
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Trigger book utilities')
+    parser.add_argument('command', choices=['bench'], help='bench: compare with a linear rescan')
+    parser.add_argument('--positions', type=int, default=10000)
+    parser.add_argument('--ticks', type=int, default=1000)
+    args = parser.parse_args()
+
+    if not benchmark(args.positions, args.ticks):
+        raise SystemExit(1)
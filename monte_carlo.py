@@ -1,16 +1,24 @@
+import os
+import sys
 import numpy as np
 import pandas as pd
 from scipy.stats import norm
 import matplotlib.pyplot as plt
 from datetime import datetime
 
+# The vectorized simulation kernel is shared with the trading backend
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from monte_carlo_kernel import make_rng, simulate_paths, risk_metrics
+from mc_parallel import run_parallel_simulation
+
 def calculate_returns(prices):
     """Calculate percentage returns from a list of prices"""
     prices = np.array(prices)
     returns = (prices[1:] / prices[:-1]) - 1
     return returns
 
-def run_monte_carlo_simulation(prices, num_simulations=1000, forecast_periods=5, confidence_level=0.95):
+def run_monte_carlo_simulation(prices, num_simulations=1000, forecast_periods=5, confidence_level=0.95, seed=None,
+                               workers=None):
     """
     Run Monte Carlo simulation to predict price movement risk
     
@@ -19,6 +27,9 @@ def run_monte_carlo_simulation(prices, num_simulations=1000, forecast_periods=5,
         num_simulations: Number of simulation paths to generate
         forecast_periods: Number of future periods to forecast (30 min)
         confidence_level: Confidence level for risk metrics
+        seed: Seed for the random generator (None for fresh randomness)
+        workers: Worker processes for very large runs (None simulates in this process).
+                 Percentiles then come from a sketch and the paths are never held in memory.
         
     Returns:
         Dictionary containing risk metrics
@@ -33,43 +44,30 @@ def run_monte_carlo_simulation(prices, num_simulations=1000, forecast_periods=5,
     # Current price (most recent)
     current_price = prices[-1]
     
-    # Generate random paths
-    simulation_results = np.zeros((forecast_periods, num_simulations))
-    
-    for sim in range(num_simulations):
-        # Generate random returns
-        random_returns = np.random.normal(mu, sigma, forecast_periods)
-        
-        # Generate price path
-        price_path = [current_price]
-        for ret in random_returns:
-            price_path.append(price_path[-1] * (1 + ret))
-        
-        simulation_results[:, sim] = price_path[1:]  # Exclude the starting price
-    
-    # Calculate risk metrics
-    final_prices = simulation_results[-1, :]
-    
-    # Calculate potential losses
-    potential_changes = (final_prices - current_price) / current_price
-    
-    # Value at Risk (VaR)
-    VaR = np.percentile(potential_changes, (1 - confidence_level) * 100)
-    
-    # Expected Shortfall (ES) / Conditional VaR
-    ES = potential_changes[potential_changes <= VaR].mean()
-    
-    # Maximum Drawdown across all simulations
-    max_drawdown = 0
-    for sim in range(num_simulations):
-        path = simulation_results[:, sim]
-        drawdowns = np.maximum.accumulate(path) - path
-        drawdown_pcts = drawdowns / np.maximum.accumulate(path)
-        path_max_drawdown = np.max(drawdown_pcts)
-        max_drawdown = max(max_drawdown, path_max_drawdown)
-    
-    # Probability of profit
-    prob_profit = np.mean(final_prices > current_price)
+    if workers:
+        metrics = run_parallel_simulation(current_price, mu, sigma, num_simulations, forecast_periods,
+                                          workers=workers, seed=seed, var_confidence=confidence_level)
+        return {
+            "current_price": current_price,
+            "var_95": metrics["var"] * 100,
+            "expected_shortfall": metrics["expected_shortfall"] * 100,
+            "max_drawdown": metrics["max_drawdown"] * 100,
+            "probability_of_profit": metrics["prob_profit"] * 100,
+            "forecast_periods": forecast_periods,
+            "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+    
+    # Generate random paths (one row per simulation, one column per period)
+    paths = simulate_paths(current_price, mu, sigma, num_simulations, forecast_periods, make_rng(seed))
+    simulation_results = paths.T  # period x simulation layout used by save_simulation_chart
+    
+    # Calculate risk metrics: VaR, Expected Shortfall / Conditional VaR,
+    # maximum drawdown across all simulations and probability of profit
+    metrics = risk_metrics(paths, current_price, confidence_level)
+    VaR = metrics["var"]
+    ES = metrics["expected_shortfall"]
+    max_drawdown = metrics["max_drawdown"]
+    prob_profit = metrics["prob_profit"]
     
     # Create visualization (optional - uncomment to save chart)
     # save_simulation_chart(simulation_results, current_price, VaR, ES)